@@ -7,6 +7,7 @@ Maya 打包包装脚本 - 供 Electron 调用
 
 import sys
 import json
+import multiprocessing
 import os
 import tempfile
 import shutil
@@ -152,6 +153,7 @@ else:
 try:
     from core.processor import MayaSceneProcessor
     from core.logger import Logger, LogLevel
+    from utils.stat_cache import get_stat_cache
 except ImportError as e:
     error_msg = f'导入 get_maya_plug4 模块失败: {e}\n'
     error_msg += f'  请确保已安装依赖包。在 conda 环境中运行：\n'
@@ -223,6 +225,7 @@ def _compute_dependency_stats(upload_json_path: str) -> dict:
         return stats
     
     assets = data.get('asset') or data.get('assets') or []
+    stat_cache = get_stat_cache()
     
     for item in assets:
         local_path = item.get('local')
@@ -230,12 +233,9 @@ def _compute_dependency_stats(upload_json_path: str) -> dict:
             continue
         
         category = _categorize_dependency(local_path)
-        size = 0
-        try:
-            if os.path.exists(local_path):
-                size = os.path.getsize(local_path)
-        except OSError:
-            size = 0
+        # 与打包过程共用文件状态缓存，已检查过的资源不再重复访问磁盘
+        result = stat_cache.stat(local_path)
+        size = result.st_size if result is not None else 0
         
         stats[f'{category}_count'] += 1
         stats[f'{category}_size'] += size
@@ -340,7 +340,8 @@ def main():
                 'server_root': server_root,
                 'temp_work_dir': temp_work_dir,
                 'log_file': log_file,
-                'stats': stats
+                'stats': stats,
+                'dependency_report': processor.dependency_report
             }
             
             print(json.dumps(result, ensure_ascii=False))
@@ -367,5 +368,7 @@ def main():
 
 
 if __name__ == '__main__':
+    # 打包为可执行文件时，场景并行扫描的子进程需要它才能正常启动
+    multiprocessing.freeze_support()
     main()
 
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cacheFile 节点基准：原实现的 DOTALL 正则与按节点上下文配对（parsers.ma_scanner + parsers.file_path_extractor）
+
+原实现用 'createNode cacheFile[^;]*;.*?cachePath.*?cacheName' 的 DOTALL 正则配对 cachePath 和 cacheName，
+再在每个 cachePath 之前500个字符内查找 createNode cacheFile。场景中的 cacheFile 节点只有 cachePath、
+没有 cacheName 时（如缓存尚未写出），每个 cacheFile 节点都会让正则扫描到文件末尾再回溯，耗时随节点数超线性增长。
+现在的实现只在同一个节点块内配对，耗时与场景大小成正比。同时检查两种实现提取到的路径是否相同
+
+用法:
+    python benchmarks/bench_cache_file_nodes.py [--nodes 100 200 400] [--repeat 1]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from typing import Callable, List, Set
+
+import scene_fixtures  # noqa: F401  把 get_maya_plug4 目录加入模块搜索路径
+
+from parsers.file_path_extractor import _extract_cache_file_paths
+from parsers.ma_scanner import scan_ma_text
+
+
+def pathological_scene(node_count: int) -> str:
+    """node_count 个只有 cachePath、没有 cacheName 的 cacheFile 节点，与 transform 节点交替出现"""
+    lines: List[str] = ['//Maya ASCII 2022 scene\n', 'requires maya "2022";\n']
+    for index in range(node_count):
+        lines.extend((
+            f'createNode cacheFile -n "cacheFile{index}";\n',
+            f'\tsetAttr ".cachePath" -type "string" "/projects/镜头_010/cache/nCache/fluid_{index}";\n',
+            f'createNode transform -n "group{index}";\n',
+            f'\tsetAttr ".t" -type "double3" {index} 0 0 ;\n',
+        ))
+    return ''.join(lines)
+
+
+def legacy_cache_file_paths(content: str) -> Set[str]:
+    """原实现中与 cacheFile 相关的两次扫描（正则与原 file_path_extractor 相同）"""
+    file_paths: Set[str] = set()
+    cache_file_pattern = (r'createNode\s+cacheFile[^;]*;.*?setAttr\s+"\.cachePath"\s+-type\s+"string"\s+"([^"]+)"'
+                          r'[^;]*;.*?setAttr\s+"\.cacheName"\s+-type\s+"string"\s+"([^"]+)"')
+    for match in re.finditer(cache_file_pattern, content, re.DOTALL):
+        cache_path, cache_name = match.group(1).strip(), match.group(2).strip()
+        if cache_path and cache_name:
+            file_paths.add(os.path.join(cache_path, cache_name + ".xml"))
+    for match in re.finditer(r'setAttr\s+"\.cachePath"\s+-type\s+"string"\s+"([^"]+)"', content):
+        if 'createNode cacheFile' in content[max(0, match.start() - 500):match.start()]:
+            path = match.group(1).strip()
+            if path:
+                file_paths.add(path)
+    return file_paths
+
+
+def node_context_cache_file_paths(content: str) -> Set[str]:
+    """现在的实现：单次扫描，按节点块配对"""
+    records = {}
+    for record in scan_ma_text(content):
+        records.setdefault(record.kind, []).append(record)
+    file_paths: Set[str] = set()
+    _extract_cache_file_paths(records, file_paths)
+    return file_paths
+
+
+def _best_of(repeat: int, func: Callable[[], object]) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--nodes', type=int, nargs='+', default=[100, 200, 400])
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    identical = True
+    print(f"  {'节点数':>6} {'大小':>8} {'DOTALL正则':>12} {'节点上下文':>12}")
+    for node_count in args.nodes:
+        content = pathological_scene(node_count)
+        legacy_time = _best_of(args.repeat, lambda: legacy_cache_file_paths(content))
+        context_time = _best_of(args.repeat, lambda: node_context_cache_file_paths(content))
+        same = legacy_cache_file_paths(content) == node_context_cache_file_paths(content)
+        identical = identical and same
+        size_kb = len(content.encode('utf-8')) / 1024
+        print(f"  {node_count:>6} {size_kb:>6.0f}KB {legacy_time:>11.3f}s {context_time:>11.3f}s"
+              f"{'' if same else '  路径不同'}")
+    print(f"  路径集合相同: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+依赖收集基准：去重方式与 expand_external_files 的目录预读取
+
+1. 去重：原实现在 list 中用 'path not in existing_paths' 去重（整体为平方复杂度），现在使用 PathStore；
+   按路径数给出耗时和每个路径的平均耗时，检查 PathStore 随路径数线性增长
+   （list 超过 --list-limit 个路径时耗时过长，不再运行）；
+   同时给出内置 set 每个路径的耗时作为参照（数据超出 CPU 缓存后 set 每个路径的耗时也会增加）
+2. expand_external_files：mayapy 检查结果中的贴图（每个贴图出现两次，另有一部分不存在的路径），
+   比较按父目录预读取（prefetch）与逐个 stat 的耗时和系统调用次数（可用 --latency-ms 模拟网络共享），
+   并检查两种方式收集到的文件相同
+
+用法:
+    python benchmarks/bench_expand_external_files.py [--dedup-sizes 1000 10000 100000 500000 1000000]
+                                                     [--list-limit 30000] [--dirs 50] [--files 40] [--latency-ms 1]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+from fs_fixtures import SlowFs, write_texture_tree
+
+from builders.package_builder import expand_external_files
+from utils.path_store import PathStore
+from utils.stat_cache import DEFAULT_STAT_WORKERS, set_stat_cache
+from utils.walk_cache import DirectoryWalkCache, set_walk_cache
+
+
+def _synthetic_paths(count: int) -> List[str]:
+    return [f'/projects/镜头_010/sourceimages/角色_{index % 500:03d}/diffuse_{index}.tx' for index in range(count)]
+
+
+def list_dedup(paths: List[str]) -> int:
+    """原实现：列表 + 线性查找"""
+    existing_paths: List[str] = []
+    for path in paths:
+        if path not in existing_paths:
+            existing_paths.append(path)
+    return len(existing_paths)
+
+
+def set_dedup(paths: List[str]) -> int:
+    existing_paths = set()
+    for path in paths:
+        existing_paths.add(path)
+    return len(existing_paths)
+
+
+def store_dedup(paths: List[str]) -> int:
+    store = PathStore()
+    for path in paths:
+        store.add(path)
+    return len(store)
+
+
+def _mayapy_json(texture_paths: List[str], missing_count: int) -> Dict[str, Any]:
+    missing = [os.path.join(os.path.dirname(texture_paths[index]), f'missing_{index}.tx')
+               for index in range(0, len(texture_paths), max(1, len(texture_paths) // max(1, missing_count)))]
+    return {
+        'project': {'workspace': ''},
+        'file_textures': texture_paths + missing,
+        # 同一贴图也出现在外部文件分类中（与 mayapy 检查脚本的输出相同）
+        'external_files': {'textures': list(texture_paths)},
+    }
+
+
+class _NoPrefetch(SlowFs):
+    """不按目录预读取（每个路径单独 stat）"""
+
+    def cache(self, workers: int):
+        cache = super().cache(workers)
+        cache.prefetch = lambda paths, min_group_size=2: 0
+        return cache
+
+
+def run_expand(fs: SlowFs, mayapy_json: Dict[str, Any], scene_path: str, workers: int):
+    set_stat_cache(fs.cache(workers))
+    set_walk_cache(DirectoryWalkCache())
+    start = time.perf_counter()
+    result = expand_external_files(scene_path, mayapy_json)
+    return time.perf_counter() - start, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dedup-sizes', type=int, nargs='+', default=[1000, 10000, 30000, 100000, 500000, 1000000])
+    parser.add_argument('--list-limit', type=int, default=30000, help='list 去重只运行到此路径数（平方复杂度）')
+    parser.add_argument('--dirs', type=int, default=50)
+    parser.add_argument('--files', type=int, default=40)
+    parser.add_argument('--missing', type=int, default=100, help='不存在的贴图路径数')
+    parser.add_argument('--latency-ms', type=float, default=1.0, help='每次 stat / scandir 的模拟延迟')
+    parser.add_argument('--workers', type=int, default=DEFAULT_STAT_WORKERS)
+    args = parser.parse_args()
+
+    print("去重（每个路径添加两次）")
+    per_path_times = []
+    set_per_path_times = []
+    for size in args.dedup_sizes:
+        paths = _synthetic_paths(size) * 2
+        start = time.perf_counter()
+        store_count = store_dedup(paths)
+        store_time = time.perf_counter() - start
+        assert store_count == size
+        per_path_times.append(store_time / size)
+        start = time.perf_counter()
+        assert set_dedup(paths) == size
+        set_per_path_times.append((time.perf_counter() - start) / size)
+        if size <= args.list_limit:
+            start = time.perf_counter()
+            assert list_dedup(paths) == size
+            list_text = f"{time.perf_counter() - start:8.3f} s"
+        else:
+            list_text = f"{'跳过':>8}  "
+        print(f"  {size:>8} 个路径  list {list_text}  PathStore {store_time:8.3f} s"
+              f"（每个路径 {store_time / size * 1e6:.2f} us，set {set_per_path_times[-1] * 1e6:.2f} us）")
+    if args.list_limit < max(args.dedup_sizes):
+        print(f"  list 去重为平方复杂度，超过 {args.list_limit} 个路径时跳过")
+    # 线性增长：每个路径的平均耗时不随路径数明显增加
+    growth = max(per_path_times) / min(per_path_times)
+    set_growth = max(set_per_path_times) / min(set_per_path_times)
+    print(f"  每个路径耗时的最大/最小比: PathStore {growth:.2f}，set {set_growth:.2f}")
+    if len(args.dedup_sizes) >= 2:
+        # 最大的两个规模：数据都已超出 CPU 缓存，每个路径的耗时应基本相同
+        print(f"  {args.dedup_sizes[-2]} -> {args.dedup_sizes[-1]} 个路径，PathStore 每个路径耗时变化 "
+              f"{per_path_times[-1] / per_path_times[-2]:.2f}x")
+
+    texture_paths = write_texture_tree(args.dirs, args.files)
+    mayapy_json = _mayapy_json(texture_paths, args.missing)
+    scene_path = os.path.join(os.path.dirname(os.path.dirname(texture_paths[0])), 'scenes', 'shot.ma')
+    candidate_count = len(mayapy_json['file_textures']) + len(mayapy_json['external_files']['textures'])
+    print(f"expand_external_files（{candidate_count} 个候选路径，{args.dirs} 个目录，"
+          f"延迟 {args.latency_ms:g} ms，并发 {args.workers}）")
+
+    results = []
+    for label, fs in (('逐个 stat', _NoPrefetch(args.latency_ms)), ('按目录预读取', SlowFs(args.latency_ms))):
+        elapsed, result = run_expand(fs, mayapy_json, scene_path, args.workers)
+        results.append(result['all_files'])
+        print(f"  {label:<8} {elapsed:8.3f} s  stat {fs.stat_calls:>6}  scandir {fs.scandir_calls:>4}  "
+              f"收集 {len(result['all_files'])} 个文件")
+
+    identical = results[0] == results[1] and len(results[0]) == len(texture_paths)
+    print(f"  收集结果相同: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
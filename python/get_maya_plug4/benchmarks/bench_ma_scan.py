@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MA路径扫描基准：逐类型多次正则扫描（原实现）与单次多分支扫描（parsers.ma_scanner）
+
+原实现对整个场景文本依次运行13个提取函数（每个一次 re.finditer），这里保留其正则作为对照。
+两种实现都扫描同一份已读入内存的文本，只比较扫描本身；同时检查提取到的路径集合是否相同。
+合成场景写出属性长名（原实现只按长名匹配），见 benchmarks.scene_fixtures
+
+用法:
+    python benchmarks/bench_ma_scan.py [--size-mb 64] [--profile data|paths] [--repeat 3]
+"""
+
+import argparse
+import os
+import platform
+import re
+import sys
+import time
+from typing import Callable, Set
+
+from scene_fixtures import PROFILES, default_scene_path, write_scene
+
+from parsers.file_path_extractor import extract_file_paths_from_ma
+from parsers.ma_scanner import scan_ma_text
+
+
+def _legacy_finditer(pattern: str, content: str, file_paths: Set[str], flags: int = 0) -> None:
+    for match in re.finditer(pattern, content, flags):
+        path = match.group(1).strip()
+        if path:
+            file_paths.add(path)
+
+
+def legacy_extract(content: str) -> Set[str]:
+    """原实现的13次扫描（正则与过滤条件与原 file_path_extractor 相同）"""
+    file_paths: Set[str] = set()
+    for attribute in ('fileTextureName', 'abc_File', 'filePath', 'cacheFileName', 'dso', 'filename', 'cachePath'):
+        _legacy_finditer(rf'setAttr\s+"\.{attribute}"\s+-type\s+"string"\s+"([^"]+)"', content, file_paths)
+    _legacy_finditer(r'file\s+-r[^"]*"\s*"([^"]+)"', content, file_paths)
+
+    cache_file_pattern = (r'createNode\s+cacheFile[^;]*;.*?setAttr\s+"\.cachePath"\s+-type\s+"string"\s+"([^"]+)"'
+                          r'[^;]*;.*?setAttr\s+"\.cacheName"\s+-type\s+"string"\s+"([^"]+)"')
+    for match in re.finditer(cache_file_pattern, content, re.DOTALL):
+        cache_path, cache_name = match.group(1).strip(), match.group(2).strip()
+        if cache_path and cache_name:
+            file_paths.add(os.path.join(cache_path, cache_name + ".xml"))
+    for match in re.finditer(r'setAttr\s+"\.cachePath"\s+-type\s+"string"\s+"([^"]+)"', content):
+        if 'createNode cacheFile' in content[max(0, match.start() - 500):match.start()]:
+            path = match.group(1).strip()
+            if path:
+                file_paths.add(path)
+
+    _legacy_finditer(r'setAttr\s+"\.cacheName"\s+-type\s+"string"\s+"([^"]+\.(?:dc|diskCache))',
+                     content, file_paths, re.IGNORECASE)
+    _legacy_finditer(r'setAttr\s+"\.filename"\s+-type\s+"string"\s+"([^"]+\.(?:wav|mp3|aac|ogg|flac))',
+                     content, file_paths, re.IGNORECASE)
+    _legacy_finditer(r'setAttr\s+"\.(?:colorManagementPrefs|ocioConfig)"\s+-type\s+"string"\s+"([^"]+)"',
+                     content, file_paths)
+
+    general = r'"([A-Za-z]:[^"]+)"' if platform.system() == 'Windows' else r'"(/[^"]+)"'
+    for match in re.finditer(general, content):
+        path = match.group(1).strip()
+        if path and ('/' in path or '\\' in path) and not path.startswith('.') and len(path) > 3:
+            file_paths.add(path)
+    return file_paths
+
+
+def _best_of(repeat: int, func: Callable[[], object]) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=64)
+    parser.add_argument('--profile', choices=PROFILES, default='data')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scene', help='使用已有的MA场景（默认生成合成场景）')
+    args = parser.parse_args()
+
+    scene = args.scene or write_scene(default_scene_path(args.size_mb, args.profile, long_names=True),
+                                      args.size_mb, args.profile, long_names=True)
+    with open(scene, 'r', encoding='utf-8', errors='ignore') as f:
+        content = f.read()
+    print(f"场景: {scene} ({os.path.getsize(scene) / 2 ** 20:.1f} MB)")
+
+    legacy_time = _best_of(args.repeat, lambda: legacy_extract(content))
+    single_time = _best_of(args.repeat, lambda: scan_ma_text(content))
+    print(f"  13次正则扫描   {legacy_time:8.2f} s")
+    print(f"  单次多分支扫描 {single_time:8.2f} s  ({legacy_time / single_time:.1f}x)")
+
+    legacy_paths = legacy_extract(content)
+    current_paths = extract_file_paths_from_ma(scene)
+    identical = legacy_paths == current_paths
+    print(f"  路径集合相同: {identical}（{len(current_paths)} 个路径）")
+    if not identical:
+        print(f"    只在原实现中: {sorted(legacy_paths - current_paths)[:5]}")
+        print(f"    只在新实现中: {sorted(current_paths - legacy_paths)[:5]}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
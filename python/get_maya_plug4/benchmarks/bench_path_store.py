@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PathStore 内存与耗时基准：合成依赖路径集合，比较 set[str] 与 PathStore
+
+内存用 tracemalloc 统计（构建后保留的大小与构建过程中的峰值，包括集合引用的路径字符串）：
+路径在统计范围内逐个生成并直接加入集合（模拟从场景中逐个解析出来的字符串），
+峰值中没有输入列表，只有集合本身和构建过程中的临时数据。
+另外比较构建、成员检查和排序遍历的耗时，并检查两者排序遍历的结果相同
+
+用法:
+    python benchmarks/bench_path_store.py [--dirs 4000] [--files 250]
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+import scene_fixtures  # noqa: F401
+
+from utils.path_store import PathStore
+
+
+def _path(dir_index: int, file_index: int) -> str:
+    # 与群集/毛发场景相近的路径：约90个字符，按目录集中
+    return (f'//nas01/projects/show_2026/assets/crowd/agent_{dir_index:05d}/textures/v003/'
+            f'agent_diffuse_{file_index:05d}.1001.exr')
+
+
+def _shuffled_indices(dir_count: int, files_per_dir: int) -> List[Tuple[int, int]]:
+    indices = [(dir_index, file_index) for dir_index in range(dir_count) for file_index in range(files_per_dir)]
+    random.Random(0).shuffle(indices)
+    return indices
+
+
+def _generate(indices: List[Tuple[int, int]]) -> Iterator[str]:
+    """逐个生成新的路径字符串"""
+    return (_path(dir_index, file_index) for dir_index, file_index in indices)
+
+
+def _measure_memory(build: Callable[[Iterable[str]], object],
+                    indices: List[Tuple[int, int]]) -> Tuple[object, float, float]:
+    """
+    返回 (集合, 保留的MB, 峰值MB)
+
+    顺序列表在统计开始前建立；路径字符串在统计范围内逐个生成并加入集合，
+    集合仍然引用的字符串计入保留的内存
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        container = build(_generate(indices))
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return container, retained / 2 ** 20, peak / 2 ** 20
+
+
+def _timed(func: Callable[[], object]) -> Tuple[object, float]:
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def build_set(paths: Iterable[str]) -> set:
+    return set(paths)
+
+
+def build_store(paths: Iterable[str]) -> PathStore:
+    store = PathStore()
+    for path in paths:
+        store.add(path)
+    return store
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dirs', type=int, default=4000)
+    parser.add_argument('--files', type=int, default=250)
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    indices = _shuffled_indices(args.dirs, args.files)
+    average_length = sum(len(_path(*index)) for index in indices[:1000]) / min(1000, len(indices))
+    print(f"{len(indices)} 个路径（{args.dirs} 个目录 x {args.files} 个文件，平均 {average_length:.0f} 个字符）")
+    probes = [_path(*index) for index in random.Random(1).sample(indices, min(args.lookups, len(indices)))]
+    # 不存在的路径：已有目录中的新文件名
+    absent = [path.replace('diffuse', 'normal') for path in probes]
+
+    results = {}
+    peaks = {}
+    for label, build in (('set[str]', build_set), ('PathStore', build_store)):
+        container, retained, peaks[label] = _measure_memory(build, indices)
+        _, build_time = _timed(lambda: build(_generate(indices)))
+        _, lookup_time = _timed(lambda: all(path in container for path in probes))
+        _, absent_time = _timed(lambda: any(path in container for path in absent))
+        ordered, iterate_time = _timed(lambda: sorted(container) if isinstance(container, set) else list(container))
+        results[label] = ordered
+        print(f"  {label:<10} 保留 {retained:7.1f} MB  峰值 {peaks[label]:7.1f} MB  构建 {build_time:6.2f} s  "
+              f"成员检查 {lookup_time / len(probes) * 1e6:5.2f} us（不存在 {absent_time / len(absent) * 1e6:5.2f} us）"
+              f"  排序遍历 {iterate_time:5.2f} s")
+        del container, ordered
+
+    print(f"峰值内存 set[str] / PathStore: {peaks['set[str]'] / peaks['PathStore']:.2f}x")
+    identical = results['set[str]'] == results['PathStore']
+    print(f"排序遍历结果相同: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+场景读取基准：整体读入文本与流式 / 内存映射 SceneDocument 的耗时和峰值内存
+
+- legacy：原实现，整个场景读入并解码为 str 后做13次正则扫描（见 bench_ma_scan），hash 时再以 bytes 读入一遍
+- text：同样整体读入两遍，但使用单次多分支扫描（只比较读取方式的差别）
+- stream / mmap：SceneDocument 在一次读取中同时完成扫描和 hash 计算（见 parsers.scene_document）
+- parallel：SceneDocument 多进程并行扫描（--scan-workers 个进程，场景需超过 PARALLEL_SIZE_THRESHOLD），
+  峰值内存只统计主进程
+每种方式在单独的子进程中运行，峰值内存为子进程的最大常驻内存（ru_maxrss，Windows 上不统计）；
+同时检查 text / stream / mmap / parallel 的扫描记录和 hash 是否相同（legacy 只提取路径，只比较 hash）
+
+用法:
+    python benchmarks/bench_scene_load.py [--size-mb 256] [--profile data|paths]
+                                          [--modes legacy text stream mmap parallel] [--scan-workers 4]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Set
+
+from bench_ma_scan import legacy_extract
+from scene_fixtures import PROFILES, default_scene_path, write_scene
+
+import xxhash
+
+from builders.package_builder import SCENE_HASH_FACTORIES
+from parsers.ma_scanner import scan_ma_text
+from parsers.scene_document import SceneDocument
+
+MODES = ('legacy', 'text', 'stream', 'mmap', 'parallel')
+
+
+def _max_rss_mb() -> float:
+    """当前进程的最大常驻内存（MB），无法获取时返回-1"""
+    try:
+        import resource
+    except ImportError:
+        return -1.0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return max_rss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+
+
+def _paths_digest(paths: Set[str]) -> str:
+    return hashlib.sha256('\n'.join(sorted(paths)).encode('utf-8')).hexdigest()
+
+
+def run_mode(scene: str, mode: str, workers: int) -> Dict[str, Any]:
+    """在当前进程中按指定方式读取场景，返回耗时、峰值内存、路径集合摘要和 hash"""
+    start = time.perf_counter()
+    if mode in ('legacy', 'text'):
+        with open(scene, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        paths = legacy_extract(content) if mode == 'legacy' else {record.value for record in scan_ma_text(content)}
+        del content
+        with open(scene, 'rb') as f:
+            data = f.read()
+        md5 = hashlib.md5(data).hexdigest()
+        xxh = xxhash.xxh64(data).intdigest()
+        del data
+    else:
+        document = SceneDocument(scene, hash_factories=SCENE_HASH_FACTORIES, use_mmap=mode == 'mmap',
+                                 workers=workers if mode == 'parallel' else 1)
+        paths = {record.value for records in document.scan_records().values() for record in records}
+        md5 = document.hash_object('md5').hexdigest()
+        xxh = document.hash_object('xxhash').intdigest()
+    elapsed = time.perf_counter() - start
+    return {
+        'mode': mode,
+        'seconds': elapsed,
+        'max_rss_mb': _max_rss_mb(),
+        'paths': len(paths),
+        'paths_digest': None if mode == 'legacy' else _paths_digest(paths),
+        'md5': md5,
+        'xxhash': xxh,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=256)
+    parser.add_argument('--profile', choices=PROFILES, default='data')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--scene', help='使用已有的MA场景（默认生成合成场景）')
+    parser.add_argument('--scan-workers', type=int, default=os.cpu_count() or 1, help='parallel 方式的进程数')
+    parser.add_argument('--run-mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        # 子进程：只运行一种方式，结果以JSON输出
+        print(json.dumps(run_mode(args.scene, args.run_mode, args.scan_workers)))
+        return 0
+
+    # 写出属性长名，原实现的提取规则也能找到路径（见 bench_ma_scan）
+    scene = args.scene or write_scene(default_scene_path(args.size_mb, args.profile, long_names=True),
+                                      args.size_mb, args.profile, long_names=True)
+    print(f"场景: {scene} ({os.path.getsize(scene) / 2 ** 20:.1f} MB)")
+
+    results = []
+    for mode in args.modes:
+        command = [sys.executable, os.path.abspath(__file__), '--scene', scene, '--run-mode', mode,
+                   '--scan-workers', str(args.scan_workers)]
+        output = subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        rss = f"{result['max_rss_mb']:8.0f} MB" if result['max_rss_mb'] >= 0 else '     n/a'
+        print(f"  {mode:<8} {result['seconds']:8.2f} s  峰值内存 {rss}  ({result['paths']} 个记录值)")
+
+    digests = {result['paths_digest'] for result in results if result['paths_digest']}
+    hashes = {(result['md5'], result['xxhash']) for result in results}
+    identical = len(digests) <= 1 and len(hashes) == 1
+    print(f"  扫描记录和hash相同: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FileStatCache.prefetch 并发数基准：注入延迟的 stat / scandir 模拟网络共享，比较不同 workers 的耗时
+
+候选路径由两部分组成：只有一个候选路径的目录（直接 stat）和有多个候选路径的目录（读取目录列表），
+每个并发数都使用新的缓存，并检查 prefetch 之后所有候选路径的存在性与串行执行相同
+
+用法:
+    python benchmarks/bench_stat_prefetch.py [--latency-ms 4] [--single-dirs 200]
+                                             [--dirs 40] [--files 55] [--workers 1 4 8 16 32]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+from fs_fixtures import SlowFs, write_texture_tree
+
+from utils.stat_cache import DEFAULT_STAT_WORKERS
+
+
+def _best_of(func, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _candidates(single_dirs: int, dir_count: int, files_per_dir: int) -> List[str]:
+    # 单个候选的目录：每个目录中只引用一个贴图
+    singles = write_texture_tree(single_dirs, 1)
+    grouped = write_texture_tree(dir_count, files_per_dir)
+    # 每个多候选目录中再加一个不存在的路径（从目录列表中判断为不存在）
+    missing = [os.path.join(os.path.dirname(grouped[index]), 'missing.tx')
+               for index in range(0, len(grouped), files_per_dir)]
+    return singles + grouped + missing
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency-ms', type=float, default=4.0, help='每次 stat / scandir 的模拟延迟')
+    parser.add_argument('--single-dirs', type=int, default=200, help='只有一个候选路径的目录数')
+    parser.add_argument('--dirs', type=int, default=40, help='有多个候选路径的目录数')
+    parser.add_argument('--files', type=int, default=55, help='每个目录中的候选路径数')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, DEFAULT_STAT_WORKERS, 16, 32])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    candidates = _candidates(args.single_dirs, args.dirs, args.files)
+    print(f"{len(candidates)} 个候选路径（{args.single_dirs} 个单候选目录 + {args.dirs} x {args.files}），"
+          f"延迟 {args.latency_ms:g} ms")
+
+    expected = None
+    identical = True
+    for workers in args.workers:
+        fs = SlowFs(args.latency_ms)
+        caches = []
+
+        def run():
+            cache = fs.cache(workers)
+            cache.prefetch(candidates)
+            caches.append(cache)
+
+        elapsed = _best_of(run, args.repeat)
+        cache = caches[-1]
+        calls_before = (fs.stat_calls, fs.scandir_calls)
+        existence = [cache.exists(path) for path in candidates]
+        # prefetch 之后的检查不再有系统调用
+        identical &= (fs.stat_calls, fs.scandir_calls) == calls_before
+        if expected is None:
+            expected = existence
+        identical &= existence == expected
+        print(f"  workers {workers:>3}: {elapsed:7.3f} s  "
+              f"stat {cache.stat_calls:>5}  scandir {cache.scandir_calls:>4}")
+
+    print(f"结果相同: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+XGen 缺失贴图重定位基准：原实现的逐个 os.walk 与按文件名索引（utils.relocation.RelocationIndex）
+
+xgen 数据目录中有 描述数 x 每描述贴图数 个绘制贴图，palette 中的 MapTexture 指向旧位置（已不存在）。
+原实现对每个不存在的绝对路径都从头 os.walk 整个数据目录，按遍历顺序返回第一个同名文件；
+现在经过 _resolve_xgen_path -> Relocator，每个数据目录只遍历一次，之后按文件名查字典。
+另有一个在两个描述中同名的贴图，用来比较有多个候选时的选择（原实现取决于目录遍历顺序）。
+每轮都使用新的状态缓存、目录缓存和重定位器，并检查唯一文件名的重定位结果相同
+
+用法:
+    python benchmarks/bench_xgen_relocation.py [--descriptions 200] [--maps 30] [--moved 500] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import scene_fixtures  # noqa: F401  把 get_maya_plug4 目录加入模块搜索路径
+
+from parsers.xgen_parser import _resolve_xgen_path
+from utils.path_utils import normalize_path_separators
+from utils.relocation import Relocator, set_relocator
+from utils.stat_cache import FileStatCache, set_stat_cache
+from utils.walk_cache import DirectoryWalkCache, set_walk_cache
+
+_AMBIGUOUS_NAME = 'shared.ptx'
+
+
+def _best_of(func: Callable[[], Dict[str, Optional[str]]], repeat: int):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _map_path(root: str, description: int, index: int) -> str:
+    return f'{root}/desc{description:03d}/paintmaps/density/map_{description:03d}_{index:03d}.ptx'
+
+
+def write_data_root(description_count: int, maps_per_description: int) -> str:
+    """生成 xgen 数据目录（空文件，已存在时直接复用）"""
+    root = normalize_path_separators(os.path.join(
+        tempfile.gettempdir(), 'get_maya_plug4_bench', f'xgen_{description_count}x{maps_per_description}',
+        'xgen', 'collections', 'hair_coll'))
+    ambiguous = [f'{root}/desc{description:03d}/paintmaps/density/{_AMBIGUOUS_NAME}'
+                 for description in (5, min(150, description_count - 1))]
+    for description in range(description_count):
+        for index in range(maps_per_description):
+            path = _map_path(root, description, index)
+            if index == 0:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+    for path in ambiguous:
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+    return root
+
+
+def moved_paths(description_count: int, maps_per_description: int, moved_count: int) -> List[str]:
+    """palette 中指向旧数据目录的贴图路径（均匀分布在各描述中）"""
+    old_root = '/old_server/projects/show/xgen/collections/hair_coll'
+    total = description_count * maps_per_description
+    step = max(1, total // moved_count)
+    paths = [_map_path(old_root, flat // maps_per_description, flat % maps_per_description)
+             for flat in range(0, total, step)][:moved_count]
+    return paths
+
+
+def walk_relocate(paths: List[str], data_root: str) -> Dict[str, Optional[str]]:
+    """原实现：每个缺失路径都从头遍历数据目录"""
+    results = {}
+    for path in paths:
+        file_name = os.path.basename(path)
+        found = None
+        for root_dir, dirs, files in os.walk(data_root):
+            if file_name in files:
+                found = normalize_path_separators(os.path.join(root_dir, file_name))
+                break
+        results[path] = found
+    return results
+
+
+def index_relocate(paths: List[str], data_root: str) -> Dict[str, Optional[str]]:
+    """现在的实现：_resolve_xgen_path 经过本次处理的重定位器"""
+    set_stat_cache(FileStatCache())
+    set_walk_cache(DirectoryWalkCache())
+    set_relocator(Relocator())
+    return {path: _resolve_xgen_path(path, data_root, '', '') or None for path in paths}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--descriptions', type=int, default=200)
+    parser.add_argument('--maps', type=int, default=30, help='每个描述中的贴图数')
+    parser.add_argument('--moved', type=int, default=500, help='指向旧位置的贴图数')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    data_root = write_data_root(args.descriptions, args.maps)
+    unique_paths = moved_paths(args.descriptions, args.maps, args.moved)
+    ambiguous_path = (f'/old_server/projects/show/xgen/collections/hair_coll/'
+                      f'desc{min(150, args.descriptions - 1):03d}/paintmaps/density/{_AMBIGUOUS_NAME}')
+    paths = unique_paths + [ambiguous_path]
+    print(f"数据目录 {args.descriptions * args.maps + 2} 个贴图（{args.descriptions} 个描述），"
+          f"{len(unique_paths)} 个已移动的贴图 + 1 个同名贴图")
+
+    walk_time, walk_results = _best_of(lambda: walk_relocate(paths, data_root), args.repeat)
+    index_time, index_results = _best_of(lambda: index_relocate(paths, data_root), args.repeat)
+    print(f"  逐个 os.walk  {walk_time * 1000:9.1f} ms")
+    print(f"  文件名索引    {index_time * 1000:9.1f} ms")
+
+    identical = all(walk_results[path] == index_results[path] is not None for path in unique_paths)
+    print(f"  唯一文件名的重定位结果相同: {identical}")
+    print(f"  同名贴图 {ambiguous_path}")
+    print(f"    逐个 os.walk -> {walk_results[ambiguous_path]}")
+    print(f"    文件名索引   -> {index_results[ambiguous_path]}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试用的合成资源目录与文件系统调用
+- write_texture_tree：生成 目录数 x 每目录文件数 的贴图目录树（空文件），已存在时直接复用
+- SlowFs：统计 stat / scandir 调用次数，并按指定延迟模拟网络共享（每次调用 sleep，期间释放GIL，与网络往返相同）
+"""
+
+import os
+import tempfile
+import threading
+import time
+from typing import Iterator, List
+
+import scene_fixtures  # noqa: F401  把 get_maya_plug4 目录加入模块搜索路径
+
+from utils.stat_cache import FileStatCache
+
+
+def write_texture_tree(dir_count: int, files_per_dir: int, root: str = None) -> List[str]:
+    """
+    生成贴图目录树，返回所有文件路径（按目录顺序）
+
+    Args:
+        dir_count: 目录数
+        files_per_dir: 每个目录中的文件数
+        root: 根目录（默认在系统临时目录中，多个基准脚本共用）
+    """
+    root = root or os.path.join(tempfile.gettempdir(), 'get_maya_plug4_bench',
+                                f'textures_{dir_count}x{files_per_dir}')
+    paths = []
+    for dir_index in range(dir_count):
+        directory = os.path.join(root, f'角色_{dir_index:04d}')
+        os.makedirs(directory, exist_ok=True)
+        for file_index in range(files_per_dir):
+            path = os.path.join(directory, f'diffuse_{file_index:04d}.tx')
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+            paths.append(path)
+    return paths
+
+
+class SlowFs:
+    """统计调用次数并模拟延迟的 stat / scandir（作为 FileStatCache 的 stat_func / scandir_func）"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.stat_calls = 0
+        self.scandir_calls = 0
+        self._lock = threading.Lock()
+
+    def stat(self, path: str) -> os.stat_result:
+        with self._lock:
+            self.stat_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return os.stat(path)
+
+    def scandir(self, path: str) -> Iterator[os.DirEntry]:
+        with self._lock:
+            self.scandir_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return os.scandir(path)
+
+    def cache(self, workers: int) -> FileStatCache:
+        return FileStatCache(stat_func=self.stat, scandir_func=self.scandir, workers=workers)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试用的合成场景
+生成指定大小的MA场景文件，两种内容分布：
+- data：以网格顶点数组等数值数据为主，每隔几十个节点才有一个贴图路径（常见的大场景）
+- paths：几乎每个节点都带有路径（file / AlembicNode / cacheFile / gpuCache / aiStandIn / 引用），
+  用于衡量记录构建的开销
+路径中包含中文目录名，覆盖非ASCII解码
+"""
+
+import os
+import random
+import sys
+import tempfile
+from typing import Iterator, List
+
+# 基准脚本直接运行时，把 get_maya_plug4 目录加入模块搜索路径（与 main.py 的导入方式相同）
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PACKAGE_ROOT not in sys.path:
+    sys.path.insert(0, PACKAGE_ROOT)
+
+PROFILES = ('data', 'paths')
+
+_HEADER = (
+    '//Maya ASCII 2022 scene\n'
+    '//Name: bench.ma\n'
+    'requires maya "2022";\n'
+    'requires -nodeType "aiStandIn" "mtoa" "5.1.0";\n'
+    'fileInfo "application" "maya";\n'
+    'fileInfo "product" "Maya 2022";\n'
+)
+
+
+def _project_root() -> str:
+    return 'D:/projects/镜头_010' if os.name == 'nt' else '/projects/镜头_010'
+
+
+def _mesh_node(index: int, rng: random.Random, vertex_count: int) -> List[str]:
+    lines = [
+        f'createNode transform -n "mesh{index}";\n',
+        f'\tsetAttr ".t" -type "double3" {rng.random():.4f} {rng.random():.4f} {rng.random():.4f} ;\n',
+        f'createNode mesh -n "meshShape{index}" -p "mesh{index}";\n',
+        f'\tsetAttr -s {vertex_count} ".vt[0:{vertex_count - 1}]"',
+    ]
+    for start in range(0, vertex_count, 3):
+        values = ' '.join(f'{rng.uniform(-10, 10):.6f}' for _ in range(9))
+        lines.append(f'\n\t\t {values}')
+    lines.append(';\n')
+    return lines
+
+
+# Maya 写出的属性短名 -> 长名（long_names=True 时写出长名，旧版按长名匹配的提取规则也能找到路径）
+_LONG_NAMES = {'ftn': 'fileTextureName', 'fn': 'abc_File', 'cp': 'cachePath', 'cn': 'cacheName',
+               'cfn': 'cacheFileName'}
+
+
+def _path_nodes(index: int, root: str, long_names: bool = False) -> List[str]:
+    textures = f'{root}/sourceimages/角色_{index % 97}'
+    lines = [
+        f'createNode file -n "file{index}";\n',
+        f'\tsetAttr ".ftn" -type "string" "{textures}/diffuse_{index}.<UDIM>.tx";\n',
+        f'\tsetAttr ".cs" -type "string" "sRGB";\n',
+        f'createNode AlembicNode -n "abc{index}";\n',
+        f'\tsetAttr ".fn" -type "string" "{root}/cache/alembic/shot_{index}.abc";\n',
+        f'createNode cacheFile -n "cacheFile{index}";\n',
+        f'\tsetAttr ".cp" -type "string" "{root}/cache/nCache/fluid_{index}";\n',
+        f'\tsetAttr ".cn" -type "string" "fluidShape{index}";\n',
+        f'createNode gpuCache -n "gpu{index}";\n',
+        f'\tsetAttr ".cfn" -type "string" "{root}/cache/gpu/set_{index}.abc";\n',
+        f'createNode aiStandIn -n "standIn{index}";\n',
+        f'\tsetAttr ".dso" -type "string" "{root}/ass/prop_{index}.ass";\n',
+        f'\tsetAttr ".notes" -type "string" "{root}/notes/说明_{index}.txt";\n',
+    ]
+    if long_names:
+        for short_name, long_name in _LONG_NAMES.items():
+            lines = [line.replace(f'".{short_name}"', f'".{long_name}"') for line in lines]
+    return lines
+
+
+def iter_scene_lines(size_bytes: int, profile: str = 'data', seed: int = 0,
+                     long_names: bool = False) -> Iterator[str]:
+    """逐段产出场景文本，直到（按UTF-8编码计算）达到 size_bytes"""
+    if profile not in PROFILES:
+        raise ValueError(f"未知的场景内容分布: {profile}")
+    rng = random.Random(seed)
+    root = _project_root()
+    written = 0
+    index = 0
+
+    def emit(lines: List[str]) -> Iterator[str]:
+        nonlocal written
+        for line in lines:
+            written += len(line.encode('utf-8'))
+            yield line
+
+    yield from emit([_HEADER])
+    for reference in range(4):
+        yield from emit([f'file -rdi 1 -ns "ref{reference}" -rfn "ref{reference}RN" '
+                         f'-typ "mayaAscii" "{root}/scenes/assets/asset_{reference}.ma";\n'])
+    while written < size_bytes:
+        if profile == 'paths':
+            yield from emit(_path_nodes(index, root, long_names))
+        else:
+            yield from emit(_mesh_node(index, rng, vertex_count=600))
+            if index % 40 == 0:
+                yield from emit(_path_nodes(index, root, long_names)[:3])
+        index += 1
+    yield from emit([
+        'select -ne :defaultRenderGlobals;\n',
+        '\tsetAttr ".ren" -type "string" "arnold";\n',
+        '\tsetAttr ".ifp" -type "string" "<Scene>/<RenderLayer>/<RenderPass>";\n',
+        'connectAttr "file0.oc" "lambert1.c";\n',
+        '// End of bench.ma\n',
+    ])
+
+
+def write_scene(path: str, size_mb: float, profile: str = 'data', seed: int = 0,
+                long_names: bool = False) -> str:
+    """生成场景文件（已存在且大小相同的场景直接复用），返回文件路径"""
+    size_bytes = int(size_mb * 1024 * 1024)
+    if os.path.isfile(path) and abs(os.path.getsize(path) - size_bytes) < 256 * 1024:
+        return path
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+        for text in iter_scene_lines(size_bytes, profile, seed, long_names):
+            f.write(text)
+    os.replace(temp_path, path)
+    return path
+
+
+def default_scene_path(size_mb: float, profile: str, long_names: bool = False) -> str:
+    """基准场景的默认路径（放在系统临时目录中，多个基准脚本共用）"""
+    suffix = '_long' if long_names else ''
+    return os.path.join(tempfile.gettempdir(), 'get_maya_plug4_bench', f'{profile}_{size_mb:g}mb{suffix}.ma')
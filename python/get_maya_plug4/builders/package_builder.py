@@ -10,16 +10,41 @@ import json
 import zipfile
 import tempfile
 import hashlib
-from typing import Optional, Dict, Any, Set
+from typing import Optional, Dict, Any, List, Set
 
-from utils.path_utils import normalize_path_separators
-from parsers.file_path_extractor import collect_existing_absolute_paths
+from utils.path_utils import normalize_path_separators, canonical_path
+from utils.path_store import PathStore
+from utils.stat_cache import get_stat_cache
+from utils.walk_cache import cached_walk
+from utils.relocation import get_relocator
+from parsers.file_path_extractor import collect_existing_absolute_paths, _get_ocio_extensions
+from parsers.scene_document import SceneDocument, DEFAULT_SCAN_WORKERS
+from parsers.reference_graph import resolve_reference_graph
 # 导入全局logger
 from core.logger import logger
-from parsers.xgen_parser import collect_xgen_dependencies
+from parsers.xgen_parser import collect_xgen_dependencies, record_skipped_files
 import xxhash
 
 
+# 读取场景文件时同时计算的hash（对应upload.json中scene的 hash / xxhash 字段）
+SCENE_HASH_FACTORIES = {
+    'md5': hashlib.md5,
+    'xxhash': xxhash.xxh64,
+}
+
+
+def open_scene_document(scene_path: str, use_mmap: bool = False,
+                        workers: int = DEFAULT_SCAN_WORKERS) -> SceneDocument:
+    """创建场景文档（读取时同时计算upload.json需要的hash，整个处理流程只读取一次场景文件）
+    
+    Args:
+        scene_path: 场景文件路径（MA文件）
+        use_mmap: 使用内存映射扫描（只解码匹配到的路径，适合超大场景）
+        workers: 并行扫描的进程数（1 表示不并行，见 SceneDocument）
+    """
+    return SceneDocument(scene_path, hash_factories=SCENE_HASH_FACTORIES, use_mmap=use_mmap, workers=workers)
+
+
 def to_server_path(local_path: str, server_root: str) -> str:
     """将本地路径转换为服务器路径
     
@@ -52,9 +77,8 @@ def normalize_path(path: str, workspace: str) -> Optional[str]:
         normalized = os.path.normpath(expanded_path)
         return normalize_path_separators(normalized)
     else:
-        joined_path = os.path.normpath(os.path.join(workspace, expanded_path))
-        normalized = normalize_path_separators(joined_path)
-        return normalized if os.path.exists(normalized) else None
+        normalized = canonical_path(expanded_path, workspace)
+        return normalized if get_stat_cache().exists(normalized) else None
 
 
 def create_upload_package(scene_path: str, upload_json_path: str, server_root: str, 
@@ -126,7 +150,7 @@ def create_upload_package(scene_path: str, upload_json_path: str, server_root: s
         if total_files > 0:
             success_count = 0
             fail_count = 0
-            added_to_zip = set()  # 记录已添加到zip的文件路径，避免重复
+            added_to_zip = PathStore()  # 记录已添加到zip的文件路径，避免重复
             
             # 获取场景文件的basename（用于过滤用户原有的.xgen文件）
             scene_basename_with_timestamp = None
@@ -158,7 +182,7 @@ def create_upload_package(scene_path: str, upload_json_path: str, server_root: s
                 if zip_path in added_to_zip:
                     continue
                 
-                if os.path.exists(local_path):
+                if get_stat_cache().exists(local_path):
                     try:
                         zf.write(local_path, zip_path)
                         added_to_zip.add(zip_path)
@@ -175,12 +199,14 @@ def create_upload_package(scene_path: str, upload_json_path: str, server_root: s
         pass
 
 
-def expand_external_files(scene_path: str, mayapy_json: Dict[str, Any]) -> Dict[str, Any]:
+def expand_external_files(scene_path: str, mayapy_json: Dict[str, Any],
+                          xgen_targeted: bool = False) -> Dict[str, Any]:
     """扩展外部文件
     
     Args:
         scene_path: 场景文件路径
         mayapy_json: Maya场景数据
+        xgen_targeted: XGen 依赖按引用收集（见 parsers.xgen_parser.parse_xgen_file）
     """
     scene_dir = os.path.dirname(os.path.abspath(scene_path))
     mb_workspace = (mayapy_json.get('project') or {}).get('workspace')
@@ -195,28 +221,46 @@ def expand_external_files(scene_path: str, mayapy_json: Dict[str, Any]) -> Dict[
         workspace = mb_workspace or project_root
     
     external_file_categories = mayapy_json.get('external_files') or {}
-    collected: Set[str] = set()
-    categorized: Dict[str, Set[str]] = {key: set(value if isinstance(value, list) else []) for key, value in external_file_categories.items() if not isinstance(value, dict)}
+    
+    # 按父目录批量读取目录列表，之后的存在性检查直接从目录列表中回答
+    candidate_paths: List[str] = list(mayapy_json.get('file_textures') or []) + list(mayapy_json.get('references') or [])
+    for category, file_list in external_file_categories.items():
+        if category == 'xgen_data_dirs':
+            continue
+        if isinstance(file_list, list):
+            candidate_paths.extend(file_list)
+        elif isinstance(file_list, dict):
+            for sub_list in file_list.values():
+                candidate_paths.extend(sub_list or [])
+    get_stat_cache().prefetch(
+        os.path.normpath(os.path.join(workspace, os.path.expandvars(path)))
+        for path in candidate_paths if isinstance(path, str) and path
+    )
+    
+    collected = PathStore()
+    categorized: Dict[str, PathStore] = {key: PathStore(value if isinstance(value, list) else []) for key, value in external_file_categories.items() if not isinstance(value, dict)}
     
     def add_file_path(file_path: str, category: str = 'others'):
         if not file_path:
             return
         normalized_file_path = normalize_path(file_path, workspace)
-        if normalized_file_path and os.path.exists(normalized_file_path):
+        if normalized_file_path and get_stat_cache().exists(normalized_file_path):
             collected.add(normalized_file_path)
-            categorized.setdefault(category, set()).add(normalized_file_path)
+            categorized.setdefault(category, PathStore()).add(normalized_file_path)
     
-    def add_directory_recursive(directory_path: str, category: str = 'others'):
-        """递归添加目录中的所有文件"""
-        if not directory_path or not os.path.exists(directory_path):
+    def add_directory_recursive(directory_path: str, category: str = 'others', extensions: Optional[tuple] = None):
+        """递归添加目录中的所有文件（指定 extensions 时只添加匹配的文件）"""
+        if not directory_path or not get_stat_cache().exists(directory_path):
             return
         
         try:
-            for root, dirs, files in os.walk(directory_path):
+            for root, dirs, files in cached_walk(directory_path):
                 for file_name in files:
+                    if extensions is not None and not file_name.lower().endswith(extensions):
+                        continue
                     file_path = normalize_path_separators(os.path.join(root, file_name))
                     collected.add(file_path)
-                    categorized.setdefault(category, set()).add(file_path)
+                    categorized.setdefault(category, PathStore()).add(file_path)
         except Exception as e:
             logger.warning(f"递归收集目录失败: {directory_path}, 错误: {e}")
     
@@ -242,9 +286,14 @@ def expand_external_files(scene_path: str, mayapy_json: Dict[str, Any]) -> Dict[
     color_mgmt_files = external_file_categories.get('color_management', [])
     if color_mgmt_files:
         logger.print_with_time(f"    正在收集色彩管理文件...")
+        collected_before = len(collected)
         for file_path in color_mgmt_files:
             add_file_path(file_path, 'color_management')
-        logger.print_with_time(f"      收集了 {len(color_mgmt_files)} 个OCIO配置/LUT文件")
+            # OCIO配置目录中的LUT等文件（mayapy检查脚本只报告配置文件本身，目录在这里通过遍历缓存收集）
+            config_file = normalize_path(file_path, workspace)
+            if config_file and config_file.lower().endswith('.ocio'):
+                add_directory_recursive(os.path.dirname(config_file), 'color_management', _get_ocio_extensions())
+        logger.print_with_time(f"      收集了 {len(collected) - collected_before} 个OCIO配置/LUT文件")
     
     # 智能收集 XGen 依赖文件（优先使用 Maya API 收集的详细文件）
     xgen_files = external_file_categories.get('xgen', [])
@@ -260,9 +309,9 @@ def expand_external_files(scene_path: str, mayapy_json: Dict[str, Any]) -> Dict[
             detailed_count = 0
             for detail_file in xgen_detailed_files:
                 detail_abs = normalize_path(detail_file, workspace)
-                if detail_abs and os.path.exists(detail_abs):
+                if detail_abs and get_stat_cache().exists(detail_abs):
                     collected.add(detail_abs)
-                    categorized.setdefault('xgen_data', set()).add(detail_abs)
+                    categorized.setdefault('xgen_data', PathStore()).add(detail_abs)
                     detailed_count += 1
             logger.print_with_time(f"      从Maya API收集: {detailed_count} 个文件")
         
@@ -271,38 +320,46 @@ def expand_external_files(scene_path: str, mayapy_json: Dict[str, Any]) -> Dict[
             logger.print_with_time(f"      解析.xgen文件获取额外依赖...")
             
             xgen_parsed_count = 0
+            xgen_skipped: Set[str] = set()
             for xgen_file in xgen_files:
                 xgen_file_abs = normalize_path(xgen_file, workspace)
-                if not xgen_file_abs or not os.path.exists(xgen_file_abs):
+                if not xgen_file_abs or not get_stat_cache().exists(xgen_file_abs):
                     continue
                 
                 # 找到对应的 xgen 数据目录
                 for xgen_data_dir in xgen_data_dirs:
                     xgen_dir_abs = normalize_path(xgen_data_dir, workspace)
-                    if not xgen_dir_abs or not os.path.exists(xgen_dir_abs):
+                    if not xgen_dir_abs or not get_stat_cache().exists(xgen_dir_abs):
                         continue
                     
                     # 解析 XGen 文件，获取依赖列表
-                    dependencies = collect_xgen_dependencies(xgen_file_abs, xgen_dir_abs)
+                    dependencies = collect_xgen_dependencies(xgen_file_abs, xgen_dir_abs, targeted=xgen_targeted,
+                                                             skipped=xgen_skipped)
                     
                     if dependencies:
                         xgen_parsed_count += len(dependencies)
                         for dep_file in dependencies:
                             collected.add(dep_file)
-                            categorized.setdefault('xgen_data', set()).add(dep_file)
+                            categorized.setdefault('xgen_data', PathStore()).add(dep_file)
                     else:
-                        # 如果解析失败，回退到递归收集整个目录
+                        # 如果解析失败，回退到递归收集整个目录（按引用收集时也只有解析不到任何依赖时才收集整个目录）
                         add_directory_recursive(xgen_dir_abs, 'xgen_data')
                     
                     break  # 找到匹配的目录后退出
             
             if xgen_parsed_count > 0:
                 logger.print_with_time(f"      从.xgen解析收集: {xgen_parsed_count} 个文件")
+            
+            skipped_count, skipped_bytes = record_skipped_files(xgen_skipped, collected)
+            if skipped_count > 0:
+                logger.print_with_time(f"      按引用收集: 跳过 {skipped_count} 个未引用的文件"
+                                       f"（{skipped_bytes / (1024 * 1024):.1f} MB）")
         
         logger.print_with_time(f"      XGen收集完成")
     
-    all_files = sorted(list(collected))
-    by_type = {key: sorted(list(value)) for key, value in categorized.items()}
+    # PathStore 按字母顺序迭代
+    all_files = list(collected)
+    by_type = {key: list(value) for key, value in categorized.items()}
     
     return {
         'all_files': all_files,
@@ -310,12 +367,21 @@ def expand_external_files(scene_path: str, mayapy_json: Dict[str, Any]) -> Dict[
     }
 
 
-def build_upload_mapping(scene_path: str, server_root: str) -> Dict[str, Any]:
+def build_upload_mapping(scene_path: str, server_root: str,
+                         document: Optional[SceneDocument] = None,
+                         include_general: bool = True,
+                         follow_references: bool = True,
+                         xgen_targeted: bool = False) -> Dict[str, Any]:
     """构建场景文件的上传映射（直接从MA文件读取）
     
     Args:
         scene_path: 场景文件路径（MA文件）
         server_root: 服务器根路径
+        document: 场景文档（由 open_scene_document 创建；为None时临时创建）。
+                  路径提取和hash计算共用同一次读取
+        include_general: 是否包含通用模式提取的路径（关闭后只收集具名属性引用的文件）
+        follow_references: 递归解析引用的MA/MB文件，收集其中的依赖（见 parsers.reference_graph）
+        xgen_targeted: XGen 依赖按引用收集，不收集数据目录中未引用的贴图（见 parsers.xgen_parser）
     """
     # 确保是MA文件
     if not scene_path.lower().endswith('.ma'):
@@ -325,56 +391,101 @@ def build_upload_mapping(scene_path: str, server_root: str) -> Dict[str, Any]:
     # 使用scene_path的目录作为相对路径拼接的基准
     scene_dir = os.path.dirname(os.path.abspath(scene_path))
     
+    if document is None:
+        document = open_scene_document(scene_path)
+    
+    # 引用文件中的依赖（主场景自身的路径由 collect_existing_absolute_paths 提取）
+    reference_paths = None
+    if follow_references:
+        reference_graph = resolve_reference_graph(scene_path, document=document, include_general=include_general)
+        reference_paths = reference_graph.dependencies
+        for missing_path in reference_graph.missing:
+            logger.warning(f"引用文件不存在: {missing_path}")
+            get_relocator().record_missing(missing_path)
+    
     # 从MA文件中提取所有存在的文件（包括绝对路径和相对路径）
-    existing_files = collect_existing_absolute_paths(scene_path, scene_dir)
+    existing_files = collect_existing_absolute_paths(scene_path, scene_dir, document=document,
+                                                     include_general=include_general,
+                                                     extra_paths=reference_paths,
+                                                     xgen_targeted=xgen_targeted)
     
     logger.print_with_time("  [2/3] 构建asset映射...")
     
     asset = []
-    added_paths = set()  # 用于去重，记录已添加的local路径
+    added_paths = PathStore()  # 用于去重，记录已添加的local路径
     
     # 确定场景文件在upload.json中的路径（直接使用scene_path，因为已经是转换后的MA文件）
     scene_local = normalize_path_separators(os.path.abspath(scene_path))
     scene_basename_with_timestamp = os.path.splitext(os.path.basename(scene_path))[0]
     
     # 注意：场景文件不添加到asset列表，只在scene列表中
-    # 添加其他文件（去重）
-    for file_path in existing_files:
+    # 添加其他文件（去重）；服务器路径按目录转换，每个目录只调用一次 to_server_path
+    for file_path, server_path in existing_files.mapped(lambda prefix: to_server_path(prefix, server_root)):
         normalized_path = normalize_path_separators(file_path)
-        # 跳过场景文件（MA文件，只在scene列表中）
-        if normalized_path == scene_local:
+        if not should_upload_asset(normalized_path, scene_local, scene_basename_with_timestamp):
             continue
-        # 跳过MA文件（场景文件，只在scene列表中）
-        if normalized_path.lower().endswith('.ma'):
-            continue
-        # 过滤.xgen文件：只保留以场景文件名开头的.xgen文件
-        # 如果用户输入MB文件，场景文件名包含时间戳，则只包含Maya自动生成的.xgen文件
-        # 如果用户输入MA文件，场景文件名不包含时间戳，则包含用户原有的.xgen文件
-        if normalized_path.lower().endswith('.xgen'):
-            xgen_basename = os.path.splitext(os.path.basename(normalized_path))[0]
-            # 如果.xgen文件名不是以场景文件名开头，跳过
-            if not xgen_basename.startswith(scene_basename_with_timestamp):
-                continue
         # 去重：如果路径已存在，跳过
         if normalized_path not in added_paths:
             asset.append({
                 'local': normalized_path,
-                'server': to_server_path(file_path, server_root)
+                'server': server_path
             })
             added_paths.add(normalized_path)
     
+    # 打包的重定位文件：场景中引用的是原路径，上传到原路径对应的服务器位置
+    for original_path, relocated_path in sorted(get_relocator().packaged.items()):
+        if should_upload_asset(relocated_path, scene_local, scene_basename_with_timestamp):
+            asset.append({
+                'local': relocated_path,
+                'server': to_server_path(original_path, server_root)
+            })
+    
     logger.print_with_time("  [3/3] 计算场景文件hash...")
     
+    return {
+        'asset': asset,
+        'scene': build_scene_entry(scene_path, server_root, document)
+    }
+
+
+def should_upload_asset(normalized_path: str, scene_local: str, scene_basename_with_timestamp: str) -> bool:
+    """
+    依赖文件是否写入upload.json的asset列表
+    
+    Args:
+        normalized_path: 依赖文件路径（已用 normalize_path_separators 规范化）
+        scene_local: 场景文件的规范化绝对路径
+        scene_basename_with_timestamp: 场景文件名（不含扩展名，MB转换的场景包含时间戳）
+    """
+    # 跳过场景文件（MA文件，只在scene列表中）
+    if normalized_path == scene_local:
+        return False
+    # 跳过MA文件（场景文件，只在scene列表中）
+    if normalized_path.lower().endswith('.ma'):
+        return False
+    # 过滤.xgen文件：只保留以场景文件名开头的.xgen文件
+    # 如果用户输入MB文件，场景文件名包含时间戳，则只包含Maya自动生成的.xgen文件
+    # 如果用户输入MA文件，场景文件名不包含时间戳，则包含用户原有的.xgen文件
+    if normalized_path.lower().endswith('.xgen'):
+        xgen_basename = os.path.splitext(os.path.basename(normalized_path))[0]
+        # 如果.xgen文件名不是以场景文件名开头，跳过
+        if not xgen_basename.startswith(scene_basename_with_timestamp):
+            return False
+    return True
+
+
+def build_scene_entry(scene_path: str, server_root: str, document: SceneDocument) -> List[Dict[str, str]]:
+    """upload.json 的 scene 列表（hash 在读取场景文档时已同时算好）"""
+    # 确定场景文件在upload.json中的路径（直接使用scene_path，因为已经是转换后的MA文件）
+    scene_local = normalize_path_separators(os.path.abspath(scene_path))
     scene_hash = ''
     xxhash_value = ''
-    # 使用实际的scene_path文件计算hash（可能是临时文件）
+    # 使用实际的scene_path文件计算hash（可能是临时文件），hash在读取场景文档时已同时算好
     try:
-        with open(scene_path, 'rb') as f:
-            content = f.read()
-            scene_hash = hashlib.md5(content).hexdigest()
-            
-            # 使用xxhash库计算hash
-            xxhash_value = str(xxhash.xxh64(content).intdigest())
+        scene_hash = document.hash_object('md5').hexdigest()
+        
+        # 使用xxhash库计算hash
+        xxhash_value = str(document.hash_object('xxhash').intdigest())
     except Exception as e:
         logger.warning(f"无法计算场景文件hash: {e}")
         scene_hash = '0' * 32
@@ -382,17 +493,12 @@ def build_upload_mapping(scene_path: str, server_root: str) -> Dict[str, Any]:
     
     # scene字段顺序与test/upload.json保持一致：hash, local, server, xxhash
     # 注意：local和server路径使用scene_local（原始MB目录下的路径），而不是临时文件路径
-    scene = [{
+    return [{
         'hash': scene_hash,
         'local': scene_local,
         'server': to_server_path(scene_local, server_root),
         'xxhash': xxhash_value
     }]
-    
-    return {
-        'asset': asset,
-        'scene': scene
-    }
 
 
 def save_upload_json(obj: Dict[str, Any], out_path: str) -> None:
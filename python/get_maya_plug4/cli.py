@@ -17,7 +17,11 @@ import sys
 from typing import Any, Dict, Optional
 
 from core.processor import MayaSceneProcessor
+from core.scene_watcher import SceneWatchSession, WatchUpdate, MODE_INITIAL, MODE_REBUILD
 from core.logger import Logger, LogLevel
+from utils.stat_cache import get_stat_cache, DEFAULT_STAT_WORKERS
+from parsers.scene_document import DEFAULT_SCAN_WORKERS, PARALLEL_SIZE_THRESHOLD
+from utils.file_watcher import create_watcher, DEFAULT_POLL_INTERVAL
 
 
 TEXTURE_EXTS = {
@@ -83,6 +87,7 @@ def _compute_dependency_stats(upload_json_path: Optional[str]) -> Dict[str, Any]
         return stats
 
     assets = data.get('asset') or data.get('assets') or []
+    stat_cache = get_stat_cache()
 
     for item in assets:
         local_path = item.get('local')
@@ -90,12 +95,9 @@ def _compute_dependency_stats(upload_json_path: Optional[str]) -> Dict[str, Any]
             continue
 
         category = _categorize_dependency(local_path)
-        size = 0
-        try:
-            if os.path.exists(local_path):
-                size = os.path.getsize(local_path)
-        except OSError:
-            size = 0
+        # 与打包过程共用文件状态缓存，已检查过的资源不再重复访问磁盘
+        result = stat_cache.stat(local_path)
+        size = result.st_size if result is not None else 0
 
         stats[f'{category}_count'] += 1
         stats[f'{category}_size'] += size
@@ -146,6 +148,16 @@ def cmd_package(args: argparse.Namespace) -> int:
         output_dir=output_dir,
         server_root=server_root,
         logger=logger,
+        use_mmap=args.mmap,
+        include_general_paths=not args.no_general_scan,
+        fast_mode=args.fast,
+        stat_workers=args.stat_workers,
+        use_walk_cache=not args.no_walk_cache,
+        relocate_missing=not args.no_relocate,
+        package_relocated=args.package_relocated,
+        xgen_targeted=args.xgen_targeted,
+        use_xgen_cache=not args.no_xgen_cache,
+        scan_workers=args.scan_workers,
     )
 
     try:
@@ -187,6 +199,7 @@ def cmd_package(args: argparse.Namespace) -> int:
         'render_settings': render_settings_path,
         'server_root': server_root,
         'stats': stats,
+        'dependency_report': processor.dependency_report,
     }
 
     if log_file:
@@ -196,6 +209,54 @@ def cmd_package(args: argparse.Namespace) -> int:
     return 0
 
 
+def cmd_watch(args: argparse.Namespace) -> int:
+    scene = args.scene
+    if not os.path.exists(scene):
+        _print_json({'error': f'scene not found: {scene}'})
+        return 2
+    if not scene.lower().endswith('.ma'):
+        _print_json({'error': f'watch 模式只支持 MA 场景: {scene}'})
+        return 2
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(scene))
+    os.makedirs(output_dir, exist_ok=True)
+
+    session = SceneWatchSession(
+        scene_path=scene,
+        output_dir=output_dir,
+        server_root=args.server_root or '',
+        include_general_paths=not args.no_general_scan,
+        stat_workers=args.stat_workers,
+        use_walk_cache=not args.no_walk_cache,
+        relocate_missing=not args.no_relocate,
+        package_relocated=args.package_relocated,
+        use_xgen_cache=not args.no_xgen_cache,
+    )
+
+    def on_update(update: WatchUpdate) -> None:
+        # 每次更新输出一行 JSON（依赖集合重新生成时附带缺失/重定位报告）
+        result = {
+            'event': 'update',
+            'mode': update.mode,
+            'upload_json': session.upload_path,
+            'asset_count': update.asset_count,
+            'changed': update.changed,
+            'elapsed_ms': round(update.elapsed * 1000, 1),
+        }
+        if update.mode in (MODE_INITIAL, MODE_REBUILD):
+            result['dependency_report'] = session.dependency_report
+        _print_json(result)
+
+    try:
+        session.run(create_watcher(use_polling=args.polling, poll_interval=args.poll_interval), on_update)
+    except KeyboardInterrupt:
+        _print_json({'event': 'stopped'})
+    except Exception as exc:
+        _print_json({'error': str(exc)})
+        return 2
+    return 0
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog='get_maya_plug4',
@@ -210,8 +271,52 @@ def build_parser() -> argparse.ArgumentParser:
     package_parser.add_argument('--out-zip', required=False, help='zip 输出路径（可选）')
     package_parser.add_argument('--maya-bin', required=False, help='兼容参数：目前版本会自动探测 Maya，无需手动设置')
     package_parser.add_argument('--log-file', required=False, help='日志输出文件（可选）')
+    package_parser.add_argument('--mmap', action='store_true', help='使用内存映射扫描 MA 文件（超大场景可降低内存占用）')
+    package_parser.add_argument('--no-general-scan', action='store_true',
+                                help='不收集通用模式匹配到的绝对路径（场景依赖都由具名属性引用时可减少文件检查）')
+    package_parser.add_argument('--fast', action='store_true',
+                                help='快速模式：直接从 MA 文件读取渲染参数，参数齐全时不启动 mayapy')
+    package_parser.add_argument('--stat-workers', type=int, default=DEFAULT_STAT_WORKERS,
+                                help=f'并发检查资源文件的线程数（网络共享延迟高时可调大，1 为串行，默认 {DEFAULT_STAT_WORKERS}）')
+    package_parser.add_argument('--no-walk-cache', action='store_true',
+                                help='不使用目录遍历缓存，每次都重新遍历 XGen/OCIO 等目录')
+    package_parser.add_argument('--no-relocate', action='store_true',
+                                help='不查找缺失的依赖文件（默认按文件名在项目目录中查找同名文件，候选见输出的 dependency_report）')
+    package_parser.add_argument('--package-relocated', action='store_true',
+                                help='打包项目目录中找到的同名文件，上传到原路径对应的服务器位置'
+                                     '（默认只报告，同名文件不一定是原来的文件）')
+    package_parser.add_argument('--xgen-targeted', action='store_true',
+                                help='XGen 依赖按引用收集：只打包 map() 实际引用的 ptex/绘制贴图，'
+                                     '不打包数据目录中未引用的贴图（节省的大小见 dependency_report）')
+    package_parser.add_argument('--no-xgen-cache', action='store_true',
+                                help='不使用 XGen 依赖缓存，每次都重新解析 .xgen 文件')
+    package_parser.add_argument('--scan-workers', type=int, default=DEFAULT_SCAN_WORKERS,
+                                help=f'并行扫描 MA 文件的进程数（只有超过 {PARALLEL_SIZE_THRESHOLD // (1024 * 1024)}MB 的场景才切分，'
+                                     f'默认 {DEFAULT_SCAN_WORKERS} 为不并行）')
     package_parser.set_defaults(func=cmd_package)
 
+    watch_parser = sub.add_parser('watch', help='监视场景及依赖文件，变化时增量更新 upload.json')
+    watch_parser.add_argument('--scene', required=True, help='.ma 场景文件路径')
+    watch_parser.add_argument('--output-dir', required=False, help='upload.json 输出目录，缺省为场景所在目录')
+    watch_parser.add_argument('--server-root', required=False, default='', help='服务器根路径，例如 /input/LOCAL/<job>/cfg')
+    watch_parser.add_argument('--no-general-scan', action='store_true',
+                              help='不收集通用模式匹配到的绝对路径')
+    watch_parser.add_argument('--stat-workers', type=int, default=DEFAULT_STAT_WORKERS,
+                              help=f'并发检查资源文件的线程数（默认 {DEFAULT_STAT_WORKERS}）')
+    watch_parser.add_argument('--no-walk-cache', action='store_true',
+                              help='不使用磁盘上的目录遍历缓存')
+    watch_parser.add_argument('--no-relocate', action='store_true',
+                              help='不查找缺失的依赖文件')
+    watch_parser.add_argument('--package-relocated', action='store_true',
+                              help='打包项目目录中找到的同名文件，上传到原路径对应的服务器位置')
+    watch_parser.add_argument('--no-xgen-cache', action='store_true',
+                              help='不使用 XGen 依赖缓存')
+    watch_parser.add_argument('--polling', action='store_true',
+                              help='定期检查文件修改时间（网络共享上 inotify 收不到其他机器的修改时使用）')
+    watch_parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                              help=f'轮询间隔秒数（默认 {DEFAULT_POLL_INTERVAL}）')
+    watch_parser.set_defaults(func=cmd_watch)
+
     return parser
 
 
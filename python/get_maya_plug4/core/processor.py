@@ -10,7 +10,7 @@ import re
 import json
 from datetime import datetime
 from contextlib import contextmanager
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from utils.maya_version import MayaPathFinder, get_scene_maya_year
 from parsers.scene_inspector import (
@@ -22,8 +22,16 @@ from parsers.scene_inspector import (
 from builders.package_builder import (
     build_upload_mapping,
     save_upload_json,
-    create_upload_package
+    create_upload_package,
+    open_scene_document
 )
+from parsers.scene_document import SceneDocument, DEFAULT_SCAN_WORKERS
+from parsers.render_settings_reader import read_render_settings
+from utils.stat_cache import FileStatCache, set_stat_cache, DEFAULT_STAT_WORKERS
+from utils.walk_cache import DirectoryWalkCache, set_walk_cache, default_walk_cache_dir
+from utils.xgen_cache import XGenDependencyCache, set_xgen_cache, default_xgen_cache_dir
+from utils.path_utils import clear_path_caches
+from utils.relocation import Relocator, set_relocator, get_relocator, find_project_root
 from core.logger import Logger
 
 
@@ -35,7 +43,17 @@ class MayaSceneProcessor:
         scene_path: str,
         output_dir: str,
         server_root: str = "",
-        logger: Optional[Logger] = None
+        logger: Optional[Logger] = None,
+        use_mmap: bool = False,
+        include_general_paths: bool = True,
+        fast_mode: bool = False,
+        stat_workers: int = DEFAULT_STAT_WORKERS,
+        use_walk_cache: bool = True,
+        relocate_missing: bool = True,
+        package_relocated: bool = False,
+        xgen_targeted: bool = False,
+        use_xgen_cache: bool = True,
+        scan_workers: int = DEFAULT_SCAN_WORKERS
     ):
         """
         初始化处理器
@@ -45,16 +63,39 @@ class MayaSceneProcessor:
             output_dir: 输出目录
             server_root: 服务器根路径（空字符串=简洁路径格式）
             logger: 日志管理器（如果为None，则创建默认日志管理器）
+            use_mmap: 使用内存映射扫描MA文件（只解码匹配到的路径，适合超大场景）
+            include_general_paths: 收集通用模式（引号中的任意绝对路径）匹配到的文件
+            fast_mode: 快速模式，直接从MA文本读取渲染参数，参数齐全时不启动mayapy
+            stat_workers: 检查资源文件是否存在的并发数（资源在高延迟的网络共享上时可调大，1 表示串行）
+            use_walk_cache: 使用磁盘上的目录遍历缓存（重复提交时未变化的目录不再重新读取）
+            relocate_missing: 不存在的依赖文件按文件名在项目目录中查找同名文件，结果写入 dependency_report（见 utils.relocation）
+            package_relocated: 打包项目目录中找到的同名文件（上传到原路径对应的服务器位置）；
+                               默认不打包，同名文件不一定是原来的文件
+            xgen_targeted: XGen 依赖按引用收集，只收集 map() 实际引用的 ptex/绘制贴图，
+                           不收集数据目录中的旧版本贴图（跳过的文件数和大小见 dependency_report）
+            use_xgen_cache: 使用磁盘上的XGen依赖缓存（palette 和数据目录列表未变化时不再解析，见 utils.xgen_cache）
+            scan_workers: 并行扫描MA文件的进程数（1 表示不并行，超大场景才会切分，见 parsers.scene_document）
         """
         self.scene_path = scene_path
         self.output_dir = output_dir
         self.server_root = server_root
+        self.use_mmap = use_mmap
+        self.include_general_paths = include_general_paths
+        self.fast_mode = fast_mode
+        self.stat_workers = stat_workers
+        self.use_walk_cache = use_walk_cache
+        self.relocate_missing = relocate_missing
+        self.package_relocated = package_relocated
+        self.xgen_targeted = xgen_targeted
+        self.use_xgen_cache = use_xgen_cache
+        self.scan_workers = scan_workers
         self.is_mb = False
         self.maya_bin_dir = None
         self.mayapy_path = None
         self.render_json_path = None
         self.upload_path = None
         self.zip_path = None
+        self.dependency_report = None
         
         # 日志管理器
         if logger is None:
@@ -395,6 +436,16 @@ class MayaSceneProcessor:
         self.logger.separator("=")
         self.logger.print_with_time("")
         
+        # 本次处理的文件状态缓存：同一资源路径只检查一次
+        set_stat_cache(FileStatCache(workers=self.stat_workers))
+        clear_path_caches()
+        walk_cache = DirectoryWalkCache(default_walk_cache_dir() if self.use_walk_cache else None)
+        set_walk_cache(walk_cache)
+        set_xgen_cache(XGenDependencyCache(default_xgen_cache_dir() if self.use_xgen_cache else None))
+        scene_dir = os.path.dirname(os.path.abspath(self.scene_path))
+        set_relocator(Relocator(find_project_root(scene_dir) if self.relocate_missing else None,
+                                package=self.package_relocated))
+        
         # 步骤1-4: 准备工作
         self._step1_validate_scene()
         year = self._step2_get_maya_version()
@@ -403,19 +454,21 @@ class MayaSceneProcessor:
         
         # 步骤5-9: 主处理流程
         with self._temporary_files_cleanup(self.is_mb) as temp_files:
-            current_scene_path = self._step5_convert_mb_to_ma(temp_files)
-            scene_data = self._step6_read_and_fix_scene(current_scene_path)
+            # 场景文档在步骤5-9之间共享，MA文件只读取和扫描一次
+            current_scene_path, document = self._step5_convert_mb_to_ma(temp_files)
+            scene_data = self._step6_read_and_fix_scene(document)
             self._step6_extract_and_save_render_settings(scene_data)
-            upload_mapping = self._step7_build_upload_mapping(current_scene_path)
+            upload_mapping = self._step7_build_upload_mapping(document)
             self._step8_save_upload_json(upload_mapping)
-            self._step9_create_package(current_scene_path)
+            self._step9_create_package(document)
             self._cleanup_xgen_if_needed(current_scene_path)
+        walk_cache.save()
         
         # 完成提示
         self._print_completion_summary()
     
-    def _step5_convert_mb_to_ma(self, temp_files: List[str]) -> str:
-        """步骤5: MB转MA（如果需要）"""
+    def _step5_convert_mb_to_ma(self, temp_files: List[str]) -> Tuple[str, SceneDocument]:
+        """步骤5: MB转MA（如果需要），返回MA文件路径和对应的场景文档"""
         current_scene_path = self.scene_path
         
         if self.is_mb:
@@ -438,14 +491,17 @@ class MayaSceneProcessor:
             self.logger.print_with_time(f"  文件已是MA格式，无需转换")
             self.logger.print_with_time("")
         
-        return current_scene_path
+        # 场景文档在第一次查询时才读取文件（如果步骤6需要修正渲染路径，改写和读取在同一遍完成）
+        return current_scene_path, open_scene_document(current_scene_path, use_mmap=self.use_mmap,
+                                                       workers=self.scan_workers)
     
-    def _step6_read_and_fix_scene(self, scene_path: str) -> Dict[str, Any]:
+    def _step6_read_and_fix_scene(self, document: SceneDocument) -> Dict[str, Any]:
         """步骤6: 读取场景信息并处理渲染路径"""
         self.logger.print_with_time("步骤 6/9: 读取场景信息")
+        scene_path = document.path
         
         # 读取场景数据
-        scene_data = run_maya_script(self.mayapy_path, scene_path)
+        scene_data = self._read_scene_data(document)
         
         # 处理渲染路径（如果需要修改绝对路径）
         render_path_info = scene_data.get('render_path', {})
@@ -454,14 +510,24 @@ class MayaSceneProcessor:
         
         if is_absolute and image_file_prefix:
             self.logger.print_with_time("  修正渲染路径为相对路径...")
-            if fix_ma_render_path(scene_path, self.mayapy_path, is_absolute, image_file_prefix):
-                scene_data = run_maya_script(self.mayapy_path, scene_path)
+            if fix_ma_render_path(scene_path, self.mayapy_path, is_absolute, image_file_prefix, document=document):
+                scene_data = self._read_scene_data(document)
             else:
                 self.logger.warning("  路径修正失败")
         self.logger.print_with_time("")
         
         return scene_data
     
+    def _read_scene_data(self, document: SceneDocument) -> Dict[str, Any]:
+        """读取场景数据（快速模式下参数齐全时直接使用MA文本中的值，否则启动mayapy）"""
+        if self.fast_mode:
+            scene_data, missing = read_render_settings(document)
+            if not missing:
+                self.logger.print_with_time("  快速模式: 已从MA文件读取渲染参数，跳过mayapy")
+                return scene_data
+            self.logger.print_with_time("  快速模式: 渲染参数不完整，使用mayapy读取")
+        return run_maya_script(self.mayapy_path, document.path)
+    
     def _step6_extract_and_save_render_settings(self, scene_data: Dict[str, Any]) -> None:
         """步骤6: 提取并保存渲染参数"""
         render_settings = self._extract_render_settings(scene_data)
@@ -469,12 +535,23 @@ class MayaSceneProcessor:
         self.render_json_path = self._save_render_settings(render_settings)
         self.logger.print_with_time("")
     
-    def _step7_build_upload_mapping(self, scene_path: str) -> Dict[str, Any]:
+    def _step7_build_upload_mapping(self, document: SceneDocument) -> Dict[str, Any]:
         """步骤7: 生成upload.json映射"""
         self.logger.print_with_time("步骤 7/9: 生成文件映射")
-        upload_mapping = build_upload_mapping(scene_path, self.server_root)
+        upload_mapping = build_upload_mapping(document.path, self.server_root, document=document,
+                                              include_general=self.include_general_paths,
+                                              xgen_targeted=self.xgen_targeted)
         file_count = len(upload_mapping.get('assets', [])) + 1  # +1 for scene file
         self.logger.print_with_time(f"  映射完成: {file_count} 个文件")
+        self.dependency_report = get_relocator().report()
+        missing_count = len(self.dependency_report['missing'])
+        relocated_count = len(self.dependency_report['relocated'])
+        if missing_count or relocated_count:
+            self.logger.print_with_time(f"  缺失: {missing_count} 个文件，重定位: {relocated_count} 个文件")
+        if self.dependency_report['skipped_files']:
+            self.logger.print_with_time(
+                f"  XGen 按引用收集: 少打包 {self.dependency_report['skipped_files']} 个文件，"
+                f"节省 {self.dependency_report['skipped_bytes'] / (1024 * 1024):.1f} MB")
         self.logger.print_with_time("")
         return upload_mapping
     
@@ -487,9 +564,10 @@ class MayaSceneProcessor:
         self.logger.print_with_time(f"  保存完成")
         self.logger.print_with_time("")
     
-    def _step9_create_package(self, scene_path: str) -> None:
+    def _step9_create_package(self, document: SceneDocument) -> None:
         """步骤9: 打包文件"""
         self.logger.print_with_time("步骤 9/9: 创建压缩包")
+        scene_path = document.path
         # 获取场景文件名和后缀名
         scene_basename = os.path.splitext(os.path.basename(self.scene_path))[0]
         scene_ext = os.path.splitext(os.path.basename(self.scene_path))[1].lstrip('.')  # 去掉点号
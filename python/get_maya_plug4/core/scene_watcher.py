@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+watch 模式
+美术修改场景后会反复提交，每次提交都从头解析场景、检查所有依赖文件。
+SceneWatchSession 把场景文档、文件状态缓存和依赖集合保留在内存中，收到文件变化后只更新受影响的部分：
+
+- 已收集文件的内容变化、与依赖无关的文件增删：不需要更新 upload.json
+- 场景文件保存后路径引用没有变化（只改了参数、灯光等）：只更新场景hash
+- 引用的路径新出现的文件：直接加入依赖集合
+- 其他情况（删除依赖、目录/序列/XGen/OCIO 目录中的变化、缺失文件出现、路径引用变化）：
+  使用已有的缓存重新生成映射，只有变化的路径重新访问磁盘
+
+只生成 upload.json（渲染参数和压缩包仍由完整的 package 流程生成），只支持 MA 场景
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set
+
+from builders.package_builder import (
+    open_scene_document, build_upload_mapping, build_scene_entry, should_upload_asset,
+    to_server_path, save_upload_json
+)
+from parsers.file_path_extractor import extract_file_paths_from_ma, is_absolute_path
+from parsers.reference_graph import resolve_reference_graph
+from parsers.scene_document import SceneDocument
+from utils.file_watcher import WatcherError, PollingWatcher, create_watcher
+from utils.path_tokens import has_sequence_tokens
+from utils.path_utils import normalize_path_separators, canonical_path, path_key
+from utils.relocation import Relocator, set_relocator, get_relocator, find_project_root
+from utils.stat_cache import FileStatCache, set_stat_cache, DEFAULT_STAT_WORKERS
+from utils.walk_cache import DirectoryWalkCache, set_walk_cache, default_walk_cache_dir
+from utils.xgen_cache import XGenDependencyCache, set_xgen_cache, default_xgen_cache_dir
+# 导入全局logger
+from core.logger import logger
+
+
+# 内容变化会改变依赖集合的文件类型（场景引用、XGen描述、OCIO配置）
+_CONTAINER_EXTENSIONS = ('.ma', '.mb', '.xgen', '.ocio')
+
+# 更新方式
+MODE_INITIAL = 'initial'
+MODE_UNCHANGED = 'unchanged'
+MODE_SCENE = 'scene'
+MODE_INCREMENTAL = 'incremental'
+MODE_REBUILD = 'rebuild'
+
+
+class WatchUpdate(NamedTuple):
+    """一次更新的结果"""
+    mode: str            # 更新方式（MODE_*）
+    changed: int         # 本批变化的路径数
+    asset_count: int     # upload.json 中的依赖文件数
+    elapsed: float       # 更新耗时（秒）
+
+
+class SceneWatchSession:
+    """保留在内存中的场景依赖状态，按文件变化增量更新 upload.json"""
+
+    def __init__(self, scene_path: str, output_dir: str, server_root: str = "",
+                 include_general_paths: bool = True,
+                 follow_references: bool = True,
+                 stat_workers: int = DEFAULT_STAT_WORKERS,
+                 use_walk_cache: bool = True,
+                 relocate_missing: bool = True,
+                 package_relocated: bool = False,
+                 use_xgen_cache: bool = True):
+        """
+        Args:
+            scene_path: MA场景文件路径
+            output_dir: upload.json 的输出目录
+            server_root: 服务器根路径（空字符串=简洁路径格式）
+            include_general_paths: 收集通用模式（引号中的任意绝对路径）匹配到的文件
+            follow_references: 递归解析引用的MA/MB文件
+            stat_workers: 检查资源文件是否存在的并发数
+            use_walk_cache: 使用磁盘上的目录遍历缓存
+            relocate_missing: 不存在的依赖文件按文件名在项目目录中查找同名文件（结果写入 dependency_report）
+            package_relocated: 打包项目目录中找到的同名文件（上传到原路径对应的服务器位置）
+            use_xgen_cache: 使用磁盘上的XGen依赖缓存
+        """
+        self.scene_path = os.path.abspath(scene_path)
+        self.upload_path = os.path.join(output_dir, 'upload.json')
+        self.server_root = server_root
+        self.include_general_paths = include_general_paths
+        self.follow_references = follow_references
+        self.dependency_report: Optional[Dict[str, Any]] = None
+
+        self._scene_dir = os.path.dirname(self.scene_path)
+        self._scene_key = path_key(self.scene_path)
+        self._ignored_keys = {path_key(self.upload_path)}
+        self._project_root = find_project_root(self._scene_dir) if relocate_missing else None
+        self._package_relocated = package_relocated
+        self._stat_cache = FileStatCache(workers=stat_workers)
+        self._walk_cache = DirectoryWalkCache(default_walk_cache_dir() if use_walk_cache else None)
+        self._xgen_cache_dir = default_xgen_cache_dir() if use_xgen_cache else None
+
+        self._document: Optional[SceneDocument] = None
+        # 场景（及引用文件）中的路径引用
+        self._raw_paths: FrozenSet[str] = frozenset()
+        # upload.json 的内容：依赖文件 -> 服务器路径，以及 scene 列表
+        self._assets: Dict[str, str] = {}
+        self._scene_entry: List[Dict[str, str]] = []
+        # 路径引用解析后的绝对路径：路径键 -> 路径
+        self._candidates: Dict[str, str] = {}
+        # 通过目录遍历收集的目录（引用的目录、序列所在目录、XGen/OCIO等非直接引用文件所在目录）
+        self._walk_roots: Set[str] = set()
+        self._collected_dirs: Set[str] = set()
+        # 缺失或已重定位的路径，以及缺失文件的文件名（出现同名文件时需要重新定位）
+        self._unresolved: Set[str] = set()
+        self._missing: Dict[str, str] = {}
+        self._missing_names: Set[str] = set()
+
+    def _install_caches(self) -> None:
+        """各模块通过全局实例访问缓存，每次更新前重新安装本会话的缓存"""
+        set_stat_cache(self._stat_cache)
+        set_walk_cache(self._walk_cache)
+
+    def _scan_raw_paths(self, document: SceneDocument) -> FrozenSet[str]:
+        """场景和引用文件中的路径引用（引用文件中的相对路径已转为绝对路径）"""
+        raw_paths = set(extract_file_paths_from_ma(self.scene_path, document=document,
+                                                   include_general=self.include_general_paths))
+        if self.follow_references:
+            graph = resolve_reference_graph(self.scene_path, document=document,
+                                            include_general=self.include_general_paths)
+            raw_paths |= graph.dependencies
+            raw_paths.update(child for children in graph.references.values() for child in children)
+        return frozenset(raw_paths)
+
+    def _rebuild(self) -> None:
+        """用已有的缓存重新生成映射（只有失效的路径重新访问磁盘）"""
+        set_relocator(Relocator(self._project_root, package=self._package_relocated))
+        # 数据目录的列表签名在每次重新生成时重新计算
+        set_xgen_cache(XGenDependencyCache(self._xgen_cache_dir))
+        mapping = build_upload_mapping(self.scene_path, self.server_root, document=self._document,
+                                       include_general=self.include_general_paths,
+                                       follow_references=self.follow_references)
+        self._assets = {item['local']: item['server'] for item in mapping['asset']}
+        self._scene_entry = mapping['scene']
+        self.dependency_report = get_relocator().report()
+        self._index_dependencies()
+
+    def _index_dependencies(self) -> None:
+        """记录判断文件变化影响范围所需的索引"""
+        stat_cache = self._stat_cache
+        self._candidates = {}
+        for path in self._raw_paths:
+            absolute_path = path if is_absolute_path(path) else canonical_path(path, self._scene_dir)
+            self._candidates[path_key(absolute_path)] = normalize_path_separators(absolute_path)
+        self._walk_roots = {key for key, path in self._candidates.items() if stat_cache.isdir(path)}
+        self._collected_dirs = {path_key(os.path.dirname(path)) for key, path in self._candidates.items()
+                                if has_sequence_tokens(path)}
+        self._collected_dirs.update(path_key(os.path.dirname(local)) for local in self._assets
+                                    if path_key(local) not in self._candidates)
+        report = self.dependency_report or {'missing': [], 'relocated': []}
+        self._missing = {path_key(path): path for path in report['missing']}
+        self._unresolved = set(self._missing)
+        self._unresolved.update(path_key(item['original']) for item in report['relocated'])
+        self._missing_names = {os.path.normcase(os.path.basename(path)) for path in report['missing']}
+
+    def watch_targets(self) -> Dict[str, Set[str]]:
+        """需要监视的目录和文件"""
+        directories = {self._scene_dir}
+        directories.update(os.path.dirname(path) for path in self._candidates.values())
+        directories.update(os.path.dirname(local) for local in self._assets)
+        # 引用的目录整体收集：子目录中新建的文件也会改变依赖集合，目录树中的每个目录都需要监视
+        # （包括目前没有文件的子目录；目录列表来自目录遍历缓存，不重新读取）
+        for key in self._walk_roots:
+            directories.update(directory for directory, _, _ in self._walk_cache.walk(self._candidates[key]))
+        # 不存在的目录改为监视最近的上级目录（目录创建后重新设置监视）
+        directories = {self._existing_ancestor(directory) for directory in directories}
+        files = {self.scene_path}
+        files.update(path for path in self._candidates.values() if path.lower().endswith(_CONTAINER_EXTENSIONS))
+        files.update(local for local in self._assets if local.lower().endswith(_CONTAINER_EXTENSIONS))
+        return {'directories': directories, 'files': files}
+
+    def _existing_ancestor(self, directory: str) -> str:
+        while not self._stat_cache.isdir(directory):
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+        return directory
+
+    def _write(self) -> None:
+        save_upload_json({
+            'asset': [{'local': local, 'server': self._assets[local]} for local in sorted(self._assets)],
+            'scene': self._scene_entry,
+        }, self.upload_path)
+
+    def initialize(self) -> WatchUpdate:
+        """第一次完整解析并写出 upload.json"""
+        start = time.perf_counter()
+        self._install_caches()
+        self._document = open_scene_document(self.scene_path)
+        self._raw_paths = self._scan_raw_paths(self._document)
+        self._rebuild()
+        self._write()
+        self._walk_cache.save()
+        return WatchUpdate(MODE_INITIAL, 0, len(self._assets), time.perf_counter() - start)
+
+    def _needs_rebuild(self, key: str, path: str) -> bool:
+        """判断依赖文件的变化是否需要重新生成映射（不需要时返回False，直接加入的文件在 apply_changes 中处理）"""
+        if key in self._missing and key in self._candidates and self._stat_cache.isfile(path):
+            # 缺失文件出现在引用的位置：直接加入
+            return False
+        if key in self._unresolved or key in self._walk_roots:
+            return True
+        lower = path.lower()
+        if lower.endswith(_CONTAINER_EXTENSIONS) and (
+                key in self._candidates or normalize_path_separators(path) in self._assets
+                or path_key(os.path.dirname(path)) == path_key(self._scene_dir)):
+            return True
+        local = normalize_path_separators(path)
+        if local in self._assets and self._stat_cache.isfile(path):
+            # 已收集文件的内容变化
+            return False
+        if key in self._candidates:
+            # 已收集的依赖被删除：需要重新定位或记为缺失
+            return local in self._assets
+        if path_key(os.path.dirname(path)) in self._collected_dirs:
+            return True
+        if os.path.normcase(os.path.basename(path)) in self._missing_names:
+            return True
+        # 引用的目录中更深层的变化
+        directory = os.path.dirname(key)
+        while directory and directory != os.path.dirname(directory):
+            if directory in self._walk_roots:
+                return True
+            directory = os.path.dirname(directory)
+        return False
+
+    def apply_changes(self, changed_paths: Iterable[str]) -> WatchUpdate:
+        """
+        处理一批文件变化
+
+        Args:
+            changed_paths: 变化的路径（新建、删除、重命名或写入的文件和目录）
+
+        Returns:
+            WatchUpdate（mode 为 MODE_UNCHANGED 时 upload.json 没有重写）
+        """
+        start = time.perf_counter()
+        self._install_caches()
+        changed = {path_key(path): path for path in changed_paths}
+        for key in self._ignored_keys:
+            changed.pop(key, None)
+        for path in changed.values():
+            self._stat_cache.invalidate(path)
+            self._stat_cache.invalidate(os.path.dirname(path))
+
+        mode = MODE_UNCHANGED
+        if self._scene_key in changed:
+            document = open_scene_document(self.scene_path)
+            raw_paths = self._scan_raw_paths(document)
+            self._document = document
+            self._scene_entry = build_scene_entry(self.scene_path, self.server_root, document)
+            if raw_paths != self._raw_paths:
+                self._raw_paths = raw_paths
+                mode = MODE_REBUILD
+            else:
+                mode = MODE_SCENE
+
+        if mode != MODE_REBUILD:
+            added: List[str] = []
+            for key, path in changed.items():
+                if key == self._scene_key:
+                    continue
+                if self._needs_rebuild(key, path):
+                    mode = MODE_REBUILD
+                    break
+                local = normalize_path_separators(path)
+                if (key in self._candidates and local not in self._assets and self._stat_cache.isfile(path)
+                        and should_upload_asset(local, normalize_path_separators(self.scene_path),
+                                                os.path.splitext(os.path.basename(self.scene_path))[0])):
+                    added.append(local)
+            if mode != MODE_REBUILD and added:
+                for local in added:
+                    self._assets[local] = to_server_path(local, self.server_root)
+                    missing_path = self._missing.pop(path_key(local), None)
+                    if missing_path is not None:
+                        self._unresolved.discard(path_key(local))
+                        self.dependency_report['missing'].remove(missing_path)
+                mode = MODE_INCREMENTAL
+
+        if mode == MODE_REBUILD:
+            self._rebuild()
+        if mode != MODE_UNCHANGED:
+            self._write()
+            self._walk_cache.save()
+        return WatchUpdate(mode, len(changed), len(self._assets), time.perf_counter() - start)
+
+    def run(self, watcher=None, on_update: Optional[Callable[[WatchUpdate], None]] = None,
+            stop: Optional[Callable[[], bool]] = None) -> None:
+        """
+        持续监视并更新（直到 stop() 返回True或被中断）
+
+        Args:
+            watcher: 文件变化监视器（默认 create_watcher()：优先 inotify，不可用时轮询）
+            on_update: 每次初始化或更新后的回调
+            stop: 每次等待超时后调用，返回True时结束
+        """
+        watcher = watcher or create_watcher()
+        try:
+            update = self.initialize()
+            if on_update:
+                on_update(update)
+            watcher = self._set_watches(watcher)
+            while not (stop and stop()):
+                changed = watcher.wait(timeout=1.0)
+                if not changed:
+                    continue
+                update = self.apply_changes(changed)
+                if update.mode != MODE_UNCHANGED or any(self._stat_cache.isdir(path) for path in changed):
+                    watcher = self._set_watches(watcher)
+                if on_update:
+                    on_update(update)
+        finally:
+            watcher.close()
+
+    def _set_watches(self, watcher):
+        """更新监视目标（inotify 超过系统监视数上限时改用轮询）"""
+        targets = self.watch_targets()
+        try:
+            watcher.set_watches(targets['directories'], targets['files'])
+        except WatcherError as e:
+            logger.warning(f"无法使用 inotify 监视 {len(targets['directories'])} 个目录（{e}），改用轮询")
+            watcher.close()
+            watcher = PollingWatcher()
+            watcher.set_watches(targets['directories'], targets['files'])
+        return watcher
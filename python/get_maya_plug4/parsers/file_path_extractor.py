@@ -5,14 +5,39 @@ MA文件解析模块
 直接从MA文件中提取文件路径引用
 """
 
+import itertools
 import os
 import re
-import platform
-from typing import List, Set
-from utils.path_utils import normalize_path_separators
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from utils.path_utils import normalize_path_separators, canonical_path, path_key
+from utils.path_store import PathStore
+from utils.stat_cache import get_stat_cache
+from utils.walk_cache import cached_walk, get_walk_cache
+from utils.path_tokens import has_sequence_tokens, expand_sequence_path
+from utils.relocation import get_relocator
+from utils.xgen_cache import get_xgen_cache
+from parsers.ma_scanner import (
+    ScanRecord,
+    KIND_FILE_TEXTURE,
+    KIND_REFERENCE,
+    KIND_ALEMBIC,
+    KIND_USD,
+    KIND_GPU_CACHE,
+    KIND_ARNOLD_STANDIN,
+    KIND_ARNOLD_IMAGE,
+    KIND_CACHE_PATH,
+    KIND_CACHE_NAME,
+    KIND_OCIO,
+    KIND_IMAGE_PLANE,
+    KIND_GENERAL
+)
+from parsers.ma_tokenizer import DEFAULT_BUFFER_SIZE, iter_ma_chunks
+from parsers.scene_document import SceneDocument, DEFAULT_SCAN_WORKERS
 # 导入全局logger
 from core.logger import logger
-from parsers.xgen_parser import collect_xgen_dependencies
+from parsers.xgen_parser import collect_xgen_dependencies, load_xgen_file, record_skipped_files
 
 
 def is_absolute_path(path: str) -> bool:
@@ -36,147 +61,131 @@ def is_absolute_path(path: str) -> bool:
     return os.path.isabs(path)
 
 
-def _extract_file_texture_paths(content: str, file_paths: Set[str]) -> None:
+def _add_record_paths(records: List[ScanRecord], file_paths: Set[str]) -> None:
+    """将记录中的路径加入集合"""
+    for record in records:
+        if record.value:
+            file_paths.add(record.value)
+
+
+def _extract_file_texture_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
     """提取file节点的纹理路径"""
-    pattern = r'setAttr\s+"\.fileTextureName"\s+-type\s+"string"\s+"([^"]+)"'
-    for match in re.finditer(pattern, content):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
+    _add_record_paths(records.get(KIND_FILE_TEXTURE, []), file_paths)
 
 
-def _extract_reference_paths(content: str, file_paths: Set[str]) -> None:
+def _extract_reference_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
     """提取引用文件路径"""
-    pattern = r'file\s+-r[^"]*"\s*"([^"]+)"'
-    for match in re.finditer(pattern, content):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
+    _add_record_paths(records.get(KIND_REFERENCE, []), file_paths)
 
 
-def _extract_alembic_paths(content: str, file_paths: Set[str]) -> None:
+def _extract_alembic_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
     """提取Alembic文件路径"""
-    pattern = r'setAttr\s+"\.abc_File"\s+-type\s+"string"\s+"([^"]+)"'
-    for match in re.finditer(pattern, content):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
+    _add_record_paths(records.get(KIND_ALEMBIC, []), file_paths)
 
 
-def _extract_usd_paths(content: str, file_paths: Set[str]) -> None:
+def _extract_usd_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
     """提取USD文件路径"""
-    pattern = r'setAttr\s+"\.filePath"\s+-type\s+"string"\s+"([^"]+)"'
-    for match in re.finditer(pattern, content):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
+    _add_record_paths(records.get(KIND_USD, []), file_paths)
 
 
-def _extract_gpu_cache_paths(content: str, file_paths: Set[str]) -> None:
+def _extract_gpu_cache_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
     """提取GPU Cache文件路径"""
-    pattern = r'setAttr\s+"\.cacheFileName"\s+-type\s+"string"\s+"([^"]+)"'
-    for match in re.finditer(pattern, content):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
+    _add_record_paths(records.get(KIND_GPU_CACHE, []), file_paths)
 
 
-def _extract_arnold_standin_paths(content: str, file_paths: Set[str]) -> None:
+def _extract_arnold_standin_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
     """提取Arnold Stand-In文件路径"""
-    pattern = r'setAttr\s+"\.dso"\s+-type\s+"string"\s+"([^"]+)"'
-    for match in re.finditer(pattern, content):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
+    _add_record_paths(records.get(KIND_ARNOLD_STANDIN, []), file_paths)
 
 
-def _extract_arnold_image_paths(content: str, file_paths: Set[str]) -> None:
+def _extract_arnold_image_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
     """提取Arnold Image文件路径"""
-    pattern = r'setAttr\s+"\.filename"\s+-type\s+"string"\s+"([^"]+)"'
-    for match in re.finditer(pattern, content):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
-
-
-def _extract_cache_file_paths(content: str, file_paths: Set[str]) -> None:
-    """提取Cache File路径"""
-    # 匹配cacheFile节点的cachePath和cacheName，组合成完整路径
-    cache_file_pattern = r'createNode\s+cacheFile[^;]*;.*?setAttr\s+"\.cachePath"\s+-type\s+"string"\s+"([^"]+)"[^;]*;.*?setAttr\s+"\.cacheName"\s+-type\s+"string"\s+"([^"]+)"'
-    for match in re.finditer(cache_file_pattern, content, re.DOTALL):
-        cache_path = match.group(1).strip()
-        cache_name = match.group(2).strip()
-        if cache_path and cache_name:
-            full_path = os.path.join(cache_path, cache_name + ".xml")
-            file_paths.add(full_path)
-    
-    # 也单独提取cachePath（如果没有cacheName）
-    pattern_cache_path = r'setAttr\s+"\.cachePath"\s+-type\s+"string"\s+"([^"]+)"'
-    for match in re.finditer(pattern_cache_path, content):
-        start_pos = match.start()
-        prev_text = content[max(0, start_pos-500):start_pos]
-        if 'createNode cacheFile' in prev_text:
+    _add_record_paths(records.get(KIND_ARNOLD_IMAGE, []), file_paths)
+
+
+def _extract_cache_file_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
+    """提取Cache File路径：同一个cacheFile节点块中的 cachePath + cacheName 组合成 .xml 描述文件路径"""
+    cache_paths: Dict[int, str] = {}
+    for record in records.get(KIND_CACHE_PATH, []):
+        if record.node_type == 'cacheFile':
+            cache_paths.setdefault(record.node_offset, record.value)
+            # 也单独提取cachePath（如果没有cacheName）
+            file_paths.add(record.value)
+    
+    for record in records.get(KIND_CACHE_NAME, []):
+        if record.node_type == 'cacheFile':
+            cache_path = cache_paths.get(record.node_offset)
+            if cache_path is not None:
+                file_paths.add(os.path.join(cache_path, record.value + ".xml"))
+
+
+def _extract_disk_cache_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
+    """提取Disk Cache文件路径（diskCache节点的cacheName，其他节点只接受 .dc/.diskCache 扩展名）"""
+    pattern = re.compile(r'(.+\.(?:dc|diskCache))', re.IGNORECASE)
+    for record in records.get(KIND_CACHE_NAME, []):
+        if record.node_type == 'diskCache':
+            file_paths.add(record.value)
+            continue
+        match = pattern.match(record.value)
+        if match:
             path = match.group(1).strip()
             if path:
                 file_paths.add(path)
 
 
-def _extract_disk_cache_paths(content: str, file_paths: Set[str]) -> None:
-    """提取Disk Cache文件路径"""
-    pattern = r'setAttr\s+"\.cacheName"\s+-type\s+"string"\s+"([^"]+\.(?:dc|diskCache))'
-    for match in re.finditer(pattern, content, re.IGNORECASE):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
-
-
-def _extract_mash_audio_paths(content: str, file_paths: Set[str]) -> None:
-    """提取MASH Audio文件路径"""
-    pattern = r'setAttr\s+"\.filename"\s+-type\s+"string"\s+"([^"]+\.(?:wav|mp3|aac|ogg|flac))'
-    for match in re.finditer(pattern, content, re.IGNORECASE):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
+def _extract_mash_audio_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
+    """提取MASH Audio文件路径（MASH_Audio节点的filename，其他节点只接受音频扩展名）"""
+    pattern = re.compile(r'(.+\.(?:wav|mp3|aac|ogg|flac))', re.IGNORECASE)
+    for record in records.get(KIND_ARNOLD_IMAGE, []):
+        if record.node_type == 'MASH_Audio':
+            file_paths.add(record.value)
+            continue
+        match = pattern.match(record.value)
+        if match:
+            path = match.group(1).strip()
+            if path:
+                file_paths.add(path)
 
 
-def _extract_particle_cache_paths(content: str, file_paths: Set[str]) -> None:
+def _extract_particle_cache_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
     """提取Particle Cache文件路径"""
-    pattern = r'setAttr\s+"\.cachePath"\s+-type\s+"string"\s+"([^"]+)"'
-    for match in re.finditer(pattern, content):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
+    _add_record_paths(records.get(KIND_CACHE_PATH, []), file_paths)
 
 
-def _extract_ocio_paths(content: str, file_paths: Set[str]) -> None:
+def _extract_ocio_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
     """提取OCIO配置文件路径"""
-    pattern = r'setAttr\s+"\.(?:colorManagementPrefs|ocioConfig)"\s+-type\s+"string"\s+"([^"]+)"'
-    for match in re.finditer(pattern, content):
-        path = match.group(1).strip()
-        if path:
-            file_paths.add(path)
+    _add_record_paths(records.get(KIND_OCIO, []), file_paths)
+
+
+def _extract_image_plane_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
+    """提取Image Plane图片路径"""
+    _add_record_paths(records.get(KIND_IMAGE_PLANE, []), file_paths)
 
 
-def _extract_general_paths(content: str, file_paths: Set[str]) -> None:
+def _extract_general_paths(records: Dict[str, List[ScanRecord]], file_paths: Set[str]) -> None:
     """提取其他可能的文件路径（通用模式）"""
-    if platform.system() == 'Windows':
-        pattern = r'"([A-Za-z]:[^"]+)"'
-    else:
-        pattern = r'"(/[^"]+)"'
-    
-    for match in re.finditer(pattern, content):
-        path = match.group(1).strip()
-        if path and ('/' in path or '\\' in path):
-            if not path.startswith('.') and len(path) > 3:
-                file_paths.add(path)
+    _add_record_paths(records.get(KIND_GENERAL, []), file_paths)
 
 
-def extract_file_paths_from_ma(ma_file_path: str) -> Set[str]:
+def extract_file_paths_from_ma(ma_file_path: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                               document: Optional[SceneDocument] = None,
+                               workers: int = DEFAULT_SCAN_WORKERS,
+                               include_general: bool = True) -> Set[str]:
     """
     从MA文件中提取所有文件路径引用
     
+    按语句边界分块流式读取（见 parsers.ma_tokenizer），每块只扫描一遍（见 parsers.ma_scanner），
+    .mb 文件不经过Maya转换，直接按IFF数据块读取（见 parsers.mb_reader），
+    各提取函数共享扫描记录；内存占用只与 buffer_size 有关，与场景大小无关。
+    workers 大于1时，超过 PARALLEL_SIZE_THRESHOLD 的场景按 createNode 切分后多进程并行扫描（见 parsers.scene_document）
+    
     Args:
         ma_file_path: MA文件路径
+        buffer_size: 读取缓冲区大小（字节）
+        document: 已打开的场景文档（提供时直接使用其扫描记录，不再重新读取文件）
+        workers: 并行扫描的进程数（1 表示不并行；提供 document 时忽略）
+        include_general: 是否包含通用模式（引号中的任意绝对路径）；属性短名已按节点类型解析，
+            场景中的依赖都由具名属性引用时可以关闭，减少后续的存在性检查
         
     Returns:
         文件路径集合（去重后的路径）
@@ -184,28 +193,32 @@ def extract_file_paths_from_ma(ma_file_path: str) -> Set[str]:
     if not os.path.exists(ma_file_path):
         return set()
     
-    if not ma_file_path.lower().endswith('.ma'):
+    if not ma_file_path.lower().endswith(('.ma', '.mb')):
         return set()
     
     file_paths = set()
     
+    if document is None:
+        document = SceneDocument(ma_file_path, buffer_size, workers=workers)
+    
     try:
-        with open(ma_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        records = document.scan_records()
         
-        _extract_file_texture_paths(content, file_paths)
-        _extract_reference_paths(content, file_paths)
-        _extract_alembic_paths(content, file_paths)
-        _extract_usd_paths(content, file_paths)
-        _extract_gpu_cache_paths(content, file_paths)
-        _extract_arnold_standin_paths(content, file_paths)
-        _extract_arnold_image_paths(content, file_paths)
-        _extract_cache_file_paths(content, file_paths)
-        _extract_disk_cache_paths(content, file_paths)
-        _extract_mash_audio_paths(content, file_paths)
-        _extract_particle_cache_paths(content, file_paths)
-        _extract_ocio_paths(content, file_paths)
-        _extract_general_paths(content, file_paths)
+        _extract_file_texture_paths(records, file_paths)
+        _extract_reference_paths(records, file_paths)
+        _extract_alembic_paths(records, file_paths)
+        _extract_usd_paths(records, file_paths)
+        _extract_gpu_cache_paths(records, file_paths)
+        _extract_arnold_standin_paths(records, file_paths)
+        _extract_arnold_image_paths(records, file_paths)
+        _extract_cache_file_paths(records, file_paths)
+        _extract_disk_cache_paths(records, file_paths)
+        _extract_mash_audio_paths(records, file_paths)
+        _extract_particle_cache_paths(records, file_paths)
+        _extract_ocio_paths(records, file_paths)
+        _extract_image_plane_paths(records, file_paths)
+        if include_general:
+            _extract_general_paths(records, file_paths)
         
     except Exception as e:
         logger.warning(f"解析MA文件失败: {ma_file_path}, 错误: {e}")
@@ -213,47 +226,38 @@ def extract_file_paths_from_ma(ma_file_path: str) -> Set[str]:
     return file_paths
 
 
-def _extract_absolute_paths_from_xgen(xgen_file_path: str) -> Set[str]:
+def _extract_absolute_paths_from_xgen(xgen_file_path: str, missing: Optional[Set[str]] = None) -> Set[str]:
     """
     从.xgen文件中提取所有绝对路径（仅文件路径，不包括目录）
     
     Args:
         xgen_file_path: .xgen文件路径
+        missing: 检查过但不是文件的路径（会被修改，XGen依赖缓存据此校验，见 utils.xgen_cache）
         
     Returns:
         绝对路径集合（仅文件路径）
     """
     absolute_paths = set()
     
-    if not os.path.exists(xgen_file_path):
-        return absolute_paths
-    
     try:
-        with open(xgen_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        # 文件中出现的绝对路径在解析 .xgen 时一起提取（与 collect_xgen_dependencies 共用同一次解析）
+        palette = load_xgen_file(xgen_file_path)
+        if palette is None:
+            return absolute_paths
         
-        # 提取所有可能的绝对路径
-        # Windows: 匹配 C:/ 或 C:\ 开头的路径
-        # Linux: 匹配 / 开头的路径
-        if platform.system() == 'Windows':
-            # Windows: 匹配盘符开头的路径
-            pattern = r'([A-Za-z]:[/\\][^\s"\'<>|]+)'
-        else:
-            # Linux: 匹配 / 开头的路径
-            pattern = r'(/[^\s"\'<>|]+)'
-        
-        for match in re.finditer(pattern, content):
-            path = match.group(1).strip()
+        for path in palette.absolute_paths:
             # 验证是否为有效的绝对路径
             if is_absolute_path(path):
                 # 进一步验证：路径应该包含至少一个斜杠，且长度合理
                 if ('/' in path or '\\' in path) and len(path) > 2:
-                    # 规范化路径
-                    normalized_path = normalize_path_separators(path)
+                    # 规范化路径（与其他阶段共用 canonical_path 的结果）
+                    normalized_path = canonical_path(path)
                     # 只添加文件路径，不添加目录路径
                     # 检查路径是否存在且是文件
-                    if os.path.exists(normalized_path) and os.path.isfile(normalized_path):
+                    if get_stat_cache().isfile(normalized_path):
                         absolute_paths.add(normalized_path)
+                    elif missing is not None:
+                        missing.add(normalized_path)
     
     except Exception as e:
         logger.warning(f"从XGen文件提取路径失败: {xgen_file_path}, 错误: {e}")
@@ -261,13 +265,13 @@ def _extract_absolute_paths_from_xgen(xgen_file_path: str) -> Set[str]:
     return absolute_paths
 
 
-def _collect_directory_files(directory_path: str, file_list: List[str], extensions: tuple = None) -> int:
+def _collect_directory_files(directory_path: str, file_list: PathStore, extensions: tuple = None) -> int:
     """
     递归收集目录中的所有文件
     
     Args:
         directory_path: 目录路径
-        file_list: 文件列表（会直接修改此列表）
+        file_list: 文件集合（会直接修改此集合）
         extensions: 要收集的文件扩展名元组（如果为None则收集所有文件）
         
     Returns:
@@ -275,25 +279,25 @@ def _collect_directory_files(directory_path: str, file_list: List[str], extensio
     """
     count = 0
     try:
-        for root, dirs, files in os.walk(directory_path):
+        for root, dirs, listing in get_walk_cache().walk_listings(directory_path):
             # 跳过一些明显的临时/备份目录
             dirs[:] = [d for d in dirs if d.lower() not in ['backup', 'temp', 'cache', '.git']]
             
-            for file in files:
-                file_path = os.path.join(root, file)
-                if os.path.isfile(file_path):
+            special = set(listing.special)
+            for file in listing.files:
+                file_path = normalize_path_separators(os.path.join(root, file))
+                # 目录列表中的普通文件直接收集（增删时目录的修改时间会变化），符号链接等需要确认指向的是文件
+                if file not in special or get_stat_cache().isfile(file_path):
                     # 如果指定了扩展名过滤，只收集匹配的文件
                     if extensions is None:
                         # 没有扩展名过滤，收集所有文件
-                        if file_path not in file_list:
-                            file_list.append(file_path)
+                        if file_list.add(file_path):
                             count += 1
                     else:
                         # 有扩展名过滤，检查文件扩展名
                         file_lower = file.lower()
                         if any(file_lower.endswith(ext) for ext in extensions):
-                            if file_path not in file_list:
-                                file_list.append(file_path)
+                            if file_list.add(file_path):
                                 count += 1
     except Exception as e:
         logger.warning(f"收集目录文件失败: {directory_path}, 错误: {e}")
@@ -307,7 +311,37 @@ def _get_ocio_extensions() -> tuple:
             '.mga', '.m3d', '.ocio', '.xml', '.yaml', '.yml')
 
 
-def _process_absolute_path(path: str, existing_paths: List[str], verbose: bool = False) -> tuple:
+def _add_sequence_files(path: str, existing_paths: PathStore, verbose: bool = False) -> int:
+    """展开路径中的UDIM/贴片/帧号标记，添加目录中匹配的文件，返回添加的文件数量"""
+    added_count = 0
+    for file_path in expand_sequence_path(path):
+        if existing_paths.add(normalize_path_separators(file_path)):
+            added_count += 1
+    if verbose:
+        logger.print_with_time(f"            -> 序列路径，匹配到 {added_count} 个文件")
+    return added_count
+
+
+def _relocate_missing_path(absolute_path: str) -> int:
+    """
+    不存在的文件按文件名在项目目录中重新定位（见 utils.relocation），返回重定位的文件数量
+
+    找到的文件只写入报告；重定位器设置了 package 时才打包，由 build_upload_mapping 上传到原路径对应的服务器位置，
+    不加入按本地路径映射的依赖集合
+    """
+    relocator = get_relocator()
+    if has_sequence_tokens(absolute_path):
+        # 序列路径没有匹配到任何文件，无法按文件名重定位
+        relocator.record_missing(absolute_path)
+        return 0
+    if relocator.relocate(absolute_path) is None:
+        return 0
+    if relocator.package:
+        relocator.mark_packaged(absolute_path)
+    return 1
+
+
+def _process_absolute_path(path: str, existing_paths: PathStore, verbose: bool = False) -> tuple:
     """
     处理单个绝对路径
     
@@ -318,23 +352,24 @@ def _process_absolute_path(path: str, existing_paths: List[str], verbose: bool =
         logger.print_with_time(f"      绝对路径: {path}")
     added_count = 0
     
-    if os.path.exists(path):
-        if os.path.isfile(path):
+    if get_stat_cache().exists(path):
+        if get_stat_cache().isfile(path):
             normalized_path = normalize_path_separators(path)
-            if normalized_path not in existing_paths:
-                existing_paths.append(normalized_path)
+            if existing_paths.add(normalized_path):
                 added_count += 1
                 if verbose:
                     logger.print_with_time(f"            -> 文件存在，已添加到资源列表")
             
             # 注意：OCIO配置文件在_process_ocio_configs中统一处理，这里不再重复处理
-        elif os.path.isdir(path):
+        elif get_stat_cache().isdir(path):
             if verbose:
                 logger.print_with_time(f"            -> 目录存在，递归收集目录中的文件...")
             dir_file_count = _collect_directory_files(path, existing_paths)
             added_count += dir_file_count
             if verbose:
                 logger.print_with_time(f"            -> 从目录中收集了 {dir_file_count} 个文件")
+    elif has_sequence_tokens(path):
+        added_count += _add_sequence_files(path, existing_paths, verbose)
     else:
         if verbose:
             logger.print_with_time(f"            -> 路径不存在，跳过")
@@ -342,7 +377,7 @@ def _process_absolute_path(path: str, existing_paths: List[str], verbose: bool =
     return added_count > 0, added_count
 
 
-def _process_relative_path(path: str, ma_dir: str, existing_paths: List[str], verbose: bool = False) -> tuple:
+def _process_relative_path(path: str, ma_dir: str, existing_paths: PathStore, verbose: bool = False) -> tuple:
     """
     处理单个相对路径
     
@@ -353,27 +388,26 @@ def _process_relative_path(path: str, ma_dir: str, existing_paths: List[str], ve
         logger.print_with_time(f"      相对路径: {path}")
     added_count = 0
     
-    absolute_path = os.path.join(ma_dir, path)
-    absolute_path = os.path.normpath(absolute_path)
-    absolute_path = os.path.abspath(absolute_path)
+    absolute_path = canonical_path(path, ma_dir)
     if verbose:
         logger.print_with_time(f"            -> 拼接后: {absolute_path}")
     
-    if os.path.exists(absolute_path):
-        if os.path.isfile(absolute_path):
+    if get_stat_cache().exists(absolute_path):
+        if get_stat_cache().isfile(absolute_path):
             normalized_path = normalize_path_separators(absolute_path)
-            if normalized_path not in existing_paths:
-                existing_paths.append(normalized_path)
+            if existing_paths.add(normalized_path):
                 added_count += 1
                 if verbose:
                     logger.print_with_time(f"            -> 文件存在，已添加到资源列表")
-        elif os.path.isdir(absolute_path):
+        elif get_stat_cache().isdir(absolute_path):
             if verbose:
                 logger.print_with_time(f"            -> 目录存在，递归收集目录中的文件...")
             dir_file_count = _collect_directory_files(absolute_path, existing_paths)
             added_count += dir_file_count
             if verbose:
                 logger.print_with_time(f"            -> 从目录中收集了 {dir_file_count} 个文件")
+    elif has_sequence_tokens(absolute_path):
+        added_count += _add_sequence_files(absolute_path, existing_paths, verbose)
     else:
         if verbose:
             logger.print_with_time(f"            -> 路径不存在，跳过")
@@ -410,7 +444,7 @@ def _find_xgen_files(scene_path: str) -> List[str]:
     return xgen_files
 
 
-def _process_ocio_configs(existing_paths: List[str]) -> None:
+def _process_ocio_configs(existing_paths: PathStore) -> None:
     """处理OCIO配置文件：递归收集配置目录下的所有相关文件"""
     ocio_config_files = [p for p in existing_paths if p.lower().endswith('.ocio')]
     if not ocio_config_files:
@@ -429,40 +463,43 @@ def _process_ocio_configs(existing_paths: List[str]) -> None:
             continue
         processed_dirs.add(normalized_config_dir)
         
-        if os.path.exists(config_dir) and os.path.isdir(config_dir):
+        if get_stat_cache().isdir(config_dir):
             try:
-                for root, dirs, files in os.walk(config_dir):
+                for root, dirs, files in cached_walk(config_dir):
                     for file in files:
                         file_lower = file.lower()
                         if any(file_lower.endswith(ext) for ext in ocio_extensions):
                             file_path = normalize_path_separators(os.path.join(root, file))
-                            if file_path not in existing_paths and os.path.isfile(file_path):
-                                existing_paths.append(file_path)
+                            if file_path not in existing_paths and get_stat_cache().isfile(file_path):
+                                existing_paths.add(file_path)
                                 ocio_dir_count += 1
             except Exception as e:
                 logger.warning(f"收集OCIO目录文件失败: {e}")
 
 
-def _extract_xgen_data_dirs(ma_file_path: str, ma_dir: str) -> List[str]:
-    """从MA文件中提取XGen数据目录路径"""
+def _extract_xgen_data_dirs(ma_file_path: str, ma_dir: str, document: Optional[SceneDocument] = None) -> List[str]:
+    """从MA文件中提取XGen数据目录路径（提供 document 时直接查询其索引）"""
     xgen_data_dirs = set()
     
     # 方法1: 从MA文件中提取XGen数据目录路径（xgDataPath）
     try:
-        with open(ma_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            ma_content = f.read()
-        pattern_xgen_data = r'setAttr\s+"\.xgDataPath"\s+-type\s+"string"\s+"([^"]+)"'
-        for match in re.finditer(pattern_xgen_data, ma_content):
-            data_path = match.group(1).strip()
+        if document is not None:
+            data_paths = [value.strip() for value in document.string_values('xgDataPath')]
+        else:
+            pattern_xgen_data = re.compile(r'setAttr\s+"\.xgDataPath"\s+-type\s+"string"\s+"([^"]+)"')
+            data_paths = []
+            for _, block_text in iter_ma_chunks(ma_file_path):
+                data_paths.extend(match.group(1).strip() for match in pattern_xgen_data.finditer(block_text))
+        for data_path in data_paths:
             if data_path:
                 if is_absolute_path(data_path):
-                    if os.path.exists(data_path) and os.path.isdir(data_path):
+                    if get_stat_cache().isdir(data_path):
                         xgen_data_dirs.add(data_path)
                 else:
                     absolute_data_path = os.path.join(ma_dir, data_path)
                     absolute_data_path = os.path.normpath(absolute_data_path)
                     absolute_data_path = os.path.abspath(absolute_data_path)
-                    if os.path.exists(absolute_data_path) and os.path.isdir(absolute_data_path):
+                    if get_stat_cache().isdir(absolute_data_path):
                         xgen_data_dirs.add(absolute_data_path)
     except Exception as e:
         logger.warning(f"从MA文件提取XGen数据目录失败: {e}")
@@ -473,78 +510,145 @@ def _extract_xgen_data_dirs(ma_file_path: str, ma_dir: str) -> List[str]:
         if os.path.basename(ma_dir).lower() == 'scenes':
             project_root = os.path.dirname(ma_dir)
             xgen_dir = os.path.join(project_root, 'xgen')
-            if os.path.exists(xgen_dir) and os.path.isdir(xgen_dir):
+            if get_stat_cache().isdir(xgen_dir):
                 xgen_data_dirs.add(xgen_dir)
     
     return list(xgen_data_dirs)
 
 
-def _process_single_xgen_file(xgen_file: str, xgen_data_dirs: List[str], existing_paths: List[str]) -> int:
-    """处理单个XGen文件，返回添加的文件数量"""
-    xgen_path_count = 0
+class XGenResolution(NamedTuple):
+    """单个XGen文件的解析结果"""
+    paths: List[str]     # 依赖文件（已规范化，不含.xgen文件本身）
+    parsed: bool         # 是否通过 xgen_parser 解析到依赖
+    elapsed: float       # 解析耗时（秒）
+    skipped: Set[str]    # 按引用收集时没有收集的数据目录文件
+    cached: bool         # 是否来自XGen依赖缓存（见 utils.xgen_cache）
+    data_dir: str        # 解析依赖所用的数据目录（未解析到依赖时为空字符串）
+
+
+def _resolve_single_xgen_file(xgen_file: str, xgen_data_dirs: List[str], targeted: bool = False) -> XGenResolution:
+    """
+    解析单个XGen文件的依赖（不修改共享的路径集合，可以在线程池中执行）
     
-    # 将.xgen文件本身添加到资源列表（如果还没有添加）
-    normalized_xgen_file = normalize_path_separators(xgen_file)
-    if normalized_xgen_file not in existing_paths:
-        existing_paths.append(normalized_xgen_file)
+    palette 内容和数据目录列表都没有变化时直接使用XGen依赖缓存中的结果；
+    解析过程中遇到缺失文件时不写入缓存（缺失/重定位报告需要每次重新生成）
+    """
+    start = time.perf_counter()
+    # 使用第一个存在的数据目录
+    xgen_data_dir = next((data_dir for data_dir in xgen_data_dirs if get_stat_cache().exists(data_dir)), '')
+    xgen_cache = get_xgen_cache()
+    cache_key = xgen_cache.key(xgen_file, xgen_data_dirs, targeted)
+    cached = xgen_cache.get(cache_key)
+    if cached is not None:
+        return XGenResolution(cached.paths, cached.parsed, time.perf_counter() - start, set(cached.skipped), True,
+                              xgen_data_dir if cached.parsed else '')
+    
+    # 整个解析在当前线程中进行，只比较本线程的查找次数（其他线程同时解析的 palette 不影响）
+    relocator = get_relocator()
+    lookups = relocator.thread_lookups()
+    paths = []
+    skipped: Set[str] = set()
+    # 检查过但不存在的候选路径（写入缓存时记录其所在目录，这些路径出现后缓存失效）
+    missing: Set[str] = set()
     
     # 方法1: 从.xgen文件中提取所有绝对路径（仅文件路径，不包括目录）
-    xgen_absolute_paths = _extract_absolute_paths_from_xgen(xgen_file)
-    if xgen_absolute_paths:
-        for xgen_path in xgen_absolute_paths:
-            normalized_xgen_path = normalize_path_separators(xgen_path)
-            if normalized_xgen_path not in existing_paths:
-                existing_paths.append(normalized_xgen_path)
-                xgen_path_count += 1
+    paths.extend(normalize_path_separators(xgen_path)
+                 for xgen_path in _extract_absolute_paths_from_xgen(xgen_file, missing))
     
     # 方法2: 使用xgen_parser解析.xgen文件获取依赖（如果xgen数据目录存在）
     xgen_parsed_success = False
-    if xgen_data_dirs:
-        for xgen_data_dir in xgen_data_dirs:
-            if os.path.exists(xgen_data_dir):
-                dependencies = collect_xgen_dependencies(xgen_file, xgen_data_dir)
-                if dependencies:
-                    for dep_file in dependencies:
-                        normalized_dep_file = normalize_path_separators(dep_file)
-                        if normalized_dep_file not in existing_paths:
-                            existing_paths.append(normalized_dep_file)
-                            xgen_path_count += 1
-                    xgen_parsed_success = True
-                break
-    
-    if xgen_data_dirs and not xgen_parsed_success:
-        logger.warning(
-            f"未能解析XGen依赖: {xgen_file}，已跳过递归收集，避免引入无关文件"
-        )
-    
-    return xgen_path_count
+    if xgen_data_dir:
+        dependencies = collect_xgen_dependencies(xgen_file, xgen_data_dir, targeted=targeted, skipped=skipped,
+                                                 missing=missing)
+        if dependencies:
+            paths.extend(normalize_path_separators(dep_file) for dep_file in dependencies)
+            xgen_parsed_success = True
+    
+    if relocator.thread_lookups() == lookups:
+        xgen_cache.put(cache_key, paths, xgen_parsed_success, skipped, missing)
+    return XGenResolution(paths, xgen_parsed_success, time.perf_counter() - start, skipped, False,
+                          xgen_data_dir if xgen_parsed_success else '')
 
 
 def _process_xgen_files(xgen_files: List[str], ma_file_path: str, ma_dir: str, 
-                       existing_paths: List[str]) -> None:
-    """处理找到的.xgen文件"""
+                       existing_paths: PathStore, document: Optional[SceneDocument] = None,
+                       workers: Optional[int] = None, targeted: bool = False) -> Tuple[Set[str], Set[str]]:
+    """
+    处理找到的.xgen文件
+    
+    各XGen文件（palette）的解析互相独立（读取文件、解析变量路径、遍历贴图目录，主要是文件系统访问），
+    在线程池中并发执行（并发数默认与文件状态缓存相同）；结果按文件名顺序合并，与串行执行相同。
+    targeted=True 时按引用收集（见 parsers.xgen_parser.parse_xgen_file），数据目录中没有引用的贴图不收集
+    
+    Returns:
+        (按引用收集时没有收集的数据目录文件（由调用方排除其他途径收集到的文件后记录）,
+         至少有一个 palette 解析成功的数据目录的路径键)
+    """
     if not xgen_files:
-        return
+        return set(), set()
     
-    xgen_data_dirs = _extract_xgen_data_dirs(ma_file_path, ma_dir)
+    xgen_files = sorted(xgen_files)
+    workers = workers if workers is not None else get_stat_cache().workers
+    xgen_data_dirs = _extract_xgen_data_dirs(ma_file_path, ma_dir, document)
     
-    for xgen_file in xgen_files:
-        _process_single_xgen_file(xgen_file, xgen_data_dirs, existing_paths)
-
-
-def collect_existing_absolute_paths(ma_file_path: str, original_scene_dir: str = None) -> List[str]:
+    def resolve(xgen_file: str) -> XGenResolution:
+        return _resolve_single_xgen_file(xgen_file, xgen_data_dirs, targeted)
+    
+    start = time.perf_counter()
+    if workers <= 1 or len(xgen_files) <= 1:
+        resolutions = [resolve(xgen_file) for xgen_file in xgen_files]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(xgen_files))) as executor:
+            resolutions = list(executor.map(resolve, xgen_files))
+    
+    for xgen_file, resolution in zip(xgen_files, resolutions):
+        # 将.xgen文件本身添加到资源列表（如果还没有添加）
+        existing_paths.add(normalize_path_separators(xgen_file))
+        xgen_path_count = sum(1 for path in resolution.paths if existing_paths.add(path))
+        logger.print_with_time(f"    XGen: {os.path.basename(xgen_file)} "
+                               f"{xgen_path_count} 个文件，耗时 {resolution.elapsed * 1000:.0f} ms"
+                               f"{'（缓存）' if resolution.cached else ''}")
+        if xgen_data_dirs and not resolution.parsed:
+            logger.warning(
+                f"未能解析XGen依赖: {xgen_file}，已跳过递归收集，避免引入无关文件"
+            )
+    if len(xgen_files) > 1:
+        logger.print_with_time(f"    XGen: {len(xgen_files)} 个文件共耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+    
+    skipped = {path for resolution in resolutions for path in resolution.skipped}
+    return skipped, {path_key(resolution.data_dir) for resolution in resolutions if resolution.data_dir}
+
+
+def collect_existing_absolute_paths(ma_file_path: str, original_scene_dir: str = None,
+                                    document: Optional[SceneDocument] = None,
+                                    include_general: bool = True,
+                                    extra_paths: Optional[Set[str]] = None,
+                                    xgen_targeted: bool = False) -> PathStore:
     """
     从MA文件中提取所有存在的文件路径（包括绝对路径和相对路径）
     
     Args:
         ma_file_path: MA文件路径
         original_scene_dir: 场景文件所在目录（用于相对路径拼接，如果为None则使用ma_file_path的目录）
+        document: 已打开的场景文档（路径扫描和xgDataPath查询共用，只读取一次文件）
+        include_general: 是否包含通用模式提取的路径（见 extract_file_paths_from_ma）
+        extra_paths: 额外的路径引用（如引用文件中的依赖，见 parsers.reference_graph），与MA文件中的路径一起处理
+        xgen_targeted: XGen 依赖按引用收集，只收集 map() 实际引用的 ptex/绘制贴图（见 parsers.xgen_parser）
         
     Returns:
-        存在的文件路径列表（已转换为绝对路径）
+        存在的文件路径集合（已转换为绝对路径，按字母顺序迭代）
     """
-    all_paths = extract_file_paths_from_ma(ma_file_path)
-    existing_paths = []
+    if document is None:
+        document = SceneDocument(ma_file_path)
+    all_paths = extract_file_paths_from_ma(ma_file_path, document=document, include_general=include_general)
+    # 只有具名属性引用的路径缺失时才重定位（通用模式可能匹配到渲染输出路径等不是依赖的字符串）
+    named_paths = all_paths
+    if include_general:
+        named_paths = extract_file_paths_from_ma(ma_file_path, document=document, include_general=False)
+    if extra_paths:
+        all_paths = all_paths | extra_paths
+    # 去重（目录或XGen可能贡献数十万个文件，按目录前缀压缩保存）
+    existing_paths = PathStore()
     
     # 获取用于拼接相对路径的目录
     if original_scene_dir:
@@ -557,23 +661,51 @@ def collect_existing_absolute_paths(ma_file_path: str, original_scene_dir: str =
     relative_count = 0
     existing_absolute_count = 0
     existing_relative_count = 0
+    relocated_count = 0
+    
+    # 按父目录批量读取目录列表，之后的存在性检查直接从目录列表中回答
+    get_stat_cache().prefetch(
+        path if is_absolute_path(path) else canonical_path(path, ma_dir)
+        for path in all_paths if path
+    )
+    
+    # 查找XGen文件（使用MA文件来查找，确保只匹配Maya自动生成的.xgen文件）
+    xgen_files = _find_xgen_files(ma_file_path)
+    
+    # 按引用收集时，场景中引用的XGen数据目录（xgDataPath）先交给XGen处理，不整体收集目录中的文件；
+    # 没有 palette 用该目录解析成功时（见 _process_xgen_files）再整体收集
+    xgen_data_keys: Set[str] = set()
+    deferred_data_dirs: Dict[str, str] = {}
+    # 没有整体收集的数据目录中的文件（用于统计按引用收集节省的大小）
+    xgen_directory_files = PathStore()
+    if xgen_targeted and xgen_files:
+        xgen_data_keys = {path_key(data_dir) for data_dir in _extract_xgen_data_dirs(ma_file_path, ma_dir, document)}
     
     # 处理所有路径（简化输出，不显示详细信息）
     for path in all_paths:
         if not path:
             continue
         
+        if xgen_data_keys:
+            data_dir = path if is_absolute_path(path) else canonical_path(path, ma_dir)
+            data_key = path_key(data_dir)
+            if data_key in xgen_data_keys:
+                deferred_data_dirs.setdefault(data_key, data_dir)
+                continue
+        
         if is_absolute_path(path):
             absolute_count += 1
+            absolute_path = path
             _, added_count = _process_absolute_path(path, existing_paths, verbose=False)
             existing_absolute_count += added_count
         else:
             relative_count += 1
+            absolute_path = canonical_path(path, ma_dir)
             _, added_count = _process_relative_path(path, ma_dir, existing_paths, verbose=False)
             existing_relative_count += added_count
-    
-    # 查找XGen文件（使用MA文件来查找，确保只匹配Maya自动生成的.xgen文件）
-    xgen_files = _find_xgen_files(ma_file_path)
+        
+        if not added_count and path in named_paths and not get_stat_cache().exists(absolute_path):
+            relocated_count += _relocate_missing_path(absolute_path)
     
     # 处理OCIO配置文件
     ocio_count_before = len(existing_paths)
@@ -582,8 +714,17 @@ def collect_existing_absolute_paths(ma_file_path: str, original_scene_dir: str =
     
     # 处理XGen文件
     xgen_count_before = len(existing_paths)
-    _process_xgen_files(xgen_files, ma_file_path, ma_dir, existing_paths)
+    xgen_skipped, xgen_resolved_keys = _process_xgen_files(xgen_files, ma_file_path, ma_dir, existing_paths,
+                                                           document, targeted=xgen_targeted)
+    for data_key, data_dir in deferred_data_dirs.items():
+        if data_key in xgen_resolved_keys:
+            _collect_directory_files(data_dir, xgen_directory_files)
+        else:
+            logger.warning(f"XGen 数据目录没有成功解析的 palette，整体收集目录中的文件: {data_dir}")
+            _collect_directory_files(data_dir, existing_paths)
     xgen_count = len(existing_paths) - xgen_count_before
+    xgen_skipped_count, xgen_skipped_bytes = record_skipped_files(
+        itertools.chain(xgen_skipped, xgen_directory_files), existing_paths)
     
     # 输出统计信息（简化的 [1/3] 部分）
     logger.print_with_time(f"  [1/3] 从MA文件中提取到 {len(all_paths)} 个路径引用")
@@ -591,10 +732,16 @@ def collect_existing_absolute_paths(ma_file_path: str, original_scene_dir: str =
         logger.print_with_time(f"    从OCIO配置目录收集了 {ocio_count} 个文件")
     if xgen_count > 0:
         logger.print_with_time(f"    从XGen相关处理中收集了 {xgen_count} 个文件")
+    if xgen_skipped_count > 0:
+        logger.print_with_time(f"    XGen 按引用收集: 跳过数据目录中 {xgen_skipped_count} 个未引用的文件"
+                               f"（{xgen_skipped_bytes / (1024 * 1024):.1f} MB）")
     logger.print_with_time("    路径统计:")
     logger.print_with_time(f"      绝对路径: {absolute_count} 个（存在: {existing_absolute_count} 个）")
     logger.print_with_time(f"      相对路径: {relative_count} 个（存在: {existing_relative_count} 个）")
+    if relocated_count > 0:
+        packaged_text = "打包到原路径对应的服务器位置" if get_relocator().package else "未打包，候选文件见 dependency_report"
+        logger.print_with_time(f"      重定位: {relocated_count} 个（原路径不存在，按文件名在项目目录中找到；{packaged_text}）")
     logger.print_with_time(f"      总计: {len(existing_paths)} 个文件")
     
-    return sorted(existing_paths)
+    return existing_paths
 
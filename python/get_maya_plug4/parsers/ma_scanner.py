@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MA文件单次扫描模块
+使用一个编译好的多分支正则一次性扫描MA文本，输出带类型的路径记录，
+供 file_path_extractor 中的各个提取函数共同使用；
+同一个模式也有 bytes 版本，可以直接扫描 mmap 映射，只解码匹配到的子串。
+扫描时跟踪当前所在的节点块（createNode / select -ne），每条记录都带有所属节点的类型，
+属性按节点类型归属在线性时间内完成，不需要跨语句的回溯匹配
+"""
+
+import re
+import platform
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+
+# 记录类型（与 file_path_extractor 中的提取函数一一对应）
+KIND_NODE = 'node'                      # createNode / select -ne 语句（attribute=节点类型，value=节点名）
+KIND_FILE_TEXTURE = 'file_texture'      # file 节点 .fileTextureName
+KIND_REFERENCE = 'reference'            # file -r 引用
+KIND_ALEMBIC = 'alembic'                # .abc_File
+KIND_USD = 'usd'                        # .filePath
+KIND_GPU_CACHE = 'gpu_cache'            # .cacheFileName
+KIND_ARNOLD_STANDIN = 'arnold_standin'  # .dso
+KIND_ARNOLD_IMAGE = 'arnold_image'      # .filename（MASH Audio / audio 节点也从这里筛选）
+KIND_CACHE_PATH = 'cache_path'          # .cachePath（cacheFile / particleCache）
+KIND_CACHE_NAME = 'cache_name'          # .cacheName（cacheFile / diskCache）
+KIND_OCIO = 'ocio'                      # .colorManagementPrefs / .ocioConfig / .configFilePath
+KIND_IMAGE_PLANE = 'image_plane'        # imagePlane 节点 .imageName
+KIND_GENERAL = 'general'                # 通用模式：引号中的绝对路径
+KIND_STRING = 'string'                  # 其他字符串属性（如 .ifp / .xgDataPath）
+KIND_REQUIRES = 'requires'              # requires 语句（attribute=插件名，value=版本）
+KIND_FILE_INFO = 'file_info'            # fileInfo 语句（attribute=键，value=值）
+
+# 字符串属性名 -> 记录类型
+STRING_ATTRIBUTE_KINDS: Dict[str, str] = {
+    'fileTextureName': KIND_FILE_TEXTURE,
+    'fileTextureNamePattern': KIND_FILE_TEXTURE,
+    'abc_File': KIND_ALEMBIC,
+    'filePath': KIND_USD,
+    'cacheFileName': KIND_GPU_CACHE,
+    'dso': KIND_ARNOLD_STANDIN,
+    'filename': KIND_ARNOLD_IMAGE,
+    'cachePath': KIND_CACHE_PATH,
+    'cacheName': KIND_CACHE_NAME,
+    'colorManagementPrefs': KIND_OCIO,
+    'ocioConfig': KIND_OCIO,
+    'configFilePath': KIND_OCIO,
+    'imageName': KIND_IMAGE_PLANE,
+}
+
+# Maya保存MA文件时写出的是属性短名：节点类型 -> {短名: 长名}
+# 短名只在对应的节点类型中才有意义（如 .fn 在 AlembicNode 中是 abc_File），因此按节点类型区分
+NODE_ATTRIBUTE_ALIASES: Dict[str, Dict[str, str]] = {
+    'file': {'ftn': 'fileTextureName', 'ftnp': 'fileTextureNamePattern'},
+    'AlembicNode': {'fn': 'abc_File'},
+    'mayaUsdProxyShape': {'fp': 'filePath'},
+    'gpuCache': {'cfn': 'cacheFileName'},
+    'cacheFile': {'cp': 'cachePath', 'cn': 'cacheName'},
+    'diskCache': {'cn': 'cacheName'},
+    'imagePlane': {'imn': 'imageName'},
+    'audio': {'f': 'filename'},
+    'colorManagementGlobals': {'cfp': 'configFilePath'},
+    'renderGlobals': {'ifp': 'imageFilePrefix'},
+}
+
+# (节点类型, 短名) -> 记录类型
+_NODE_ATTRIBUTE_KINDS: Dict[Tuple[str, str], str] = {
+    (node_type, short_name): STRING_ATTRIBUTE_KINDS.get(long_name, KIND_STRING)
+    for node_type, aliases in NODE_ATTRIBUTE_ALIASES.items()
+    for short_name, long_name in aliases.items()
+}
+
+# 节点类型未知时（如MB文件中的插件节点）只解析在所有节点类型中含义一致的短名
+_UNTYPED_ATTRIBUTE_KINDS: Dict[str, str] = {}
+for (_node_type, _short_name), _kind in _NODE_ATTRIBUTE_KINDS.items():
+    _UNTYPED_ATTRIBUTE_KINDS[_short_name] = (
+        _kind if _UNTYPED_ATTRIBUTE_KINDS.get(_short_name, _kind) == _kind else KIND_STRING
+    )
+
+
+# select -ne 选中的常见共享节点 -> 节点类型（MA文件中不写出共享节点的类型）
+SHARED_NODE_TYPES: Dict[str, str] = {
+    'defaultRenderGlobals': 'renderGlobals',
+    'defaultResolution': 'resolution',
+    'defaultRenderQuality': 'renderQuality',
+    'defaultColorMgtGlobals': 'colorManagementGlobals',
+    'hardwareRenderingGlobals': 'hardwareRenderingGlobals',
+    'defaultArnoldRenderOptions': 'aiOptions',
+    'defaultArnoldDriver': 'aiAOVDriver',
+    'defaultArnoldFilter': 'aiAOVFilter',
+    'defaultArnoldDisplayDriver': 'aiAOVDriver',
+    'vraySettings': 'VRaySettingsNode',
+    'redshiftOptions': 'RedshiftOptions',
+}
+
+
+class ScanRecord(NamedTuple):
+    """扫描记录"""
+    kind: str        # 记录类型（KIND_*）
+    attribute: str   # 属性名（node 记录为节点类型，reference/general 为空字符串）
+    value: str       # 路径或属性值（已去除首尾空白；node 记录为节点名）
+    offset: int      # 语句在文件中的起始偏移
+    node_type: str   # 所属节点的类型（不在任何节点块中或共享节点类型未知时为空字符串）
+    node_offset: int  # 所属节点语句的偏移（不在任何节点块中为 -1），同一节点块的记录相同
+
+
+# 扫描上下文：(当前节点类型, 当前节点偏移)，分块扫描时由上一块的最后一条记录延续
+NO_NODE_CONTEXT = ('', -1)
+
+
+def _general_prefix_pattern() -> str:
+    """通用绝对路径的前缀（根据当前操作系统）"""
+    if platform.system() == 'Windows':
+        return r'[A-Za-z]:'
+    return r'/'
+
+
+_GENERAL_PREFIX = _general_prefix_pattern()
+_GENERAL_PATH = re.compile(_GENERAL_PREFIX)
+
+# 各分支以不同的关键字开头，任一位置至多只有一个分支能匹配。
+# 除通用模式外，各分支只消费关键字本身，其余内容通过先行断言捕获，
+# 这样引号的配对顺序与单独的通用模式扫描完全一致，通用路径不会被其他分支“吃掉”。
+_SCAN_SOURCE = (
+    r'createNode\s+(?=(\w+)(?:\s+-s)?(?:\s+-n\s+"([^"]*)")?)'                              # 1: 节点类型 2: 节点名
+    r'|setAttr\s+(?="\.([^"]+)"\s+-type\s+"string"\s+"([^"]+)")'                           # 3: 属性名 4: 值
+    r'|file\s+-r(?=(?:[^";]*"[^"]*")*?[^";]*"([^"]+)"\s*;)'                                 # 5: 引用路径（语句中最后一个字符串）
+    r'|"(' + _GENERAL_PREFIX + r'[^"]+)"'                                                    # 6: 通用绝对路径
+    r'|select\s+-ne\s+(?=:?([\w:|]+))'                                                      # 7: 共享节点名
+    r'|requires\s+(?=(?:-\w+\s+"[^"]*"\s+)*"?([^"\s]+)"?\s+"([^"]*)")'                     # 8: 插件名 9: 版本
+    r'|fileInfo\s+(?="([^"]+)"\s+"([^"]*)")'                                                # 10: 键 11: 值
+)
+_SCAN_PATTERN = re.compile(_SCAN_SOURCE)
+# bytes 版本（模式只包含ASCII，语义与 str 版本一致）
+_SCAN_BYTES_PATTERN = re.compile(_SCAN_SOURCE.encode('ascii'))
+_GROUP_NODE_TYPE = 1
+_GROUP_NODE_NAME = 2
+_GROUP_VALUE = 4
+_GROUP_REFERENCE = 5
+_GROUP_GENERAL = 6
+_GROUP_SELECT = 7
+_GROUP_REQUIRES = 9
+_GROUP_FILE_INFO = 11
+
+
+def _collect_records(matches: Iterator['re.Match'], base_offset: int, decode: Callable[..., str],
+                     context: Tuple[str, int]) -> List[ScanRecord]:
+    """把扫描结果转换为记录（decode 把匹配到的分组转换为 str，context 为扫描开始时所在的节点）"""
+    records: List[ScanRecord] = []
+    append = records.append
+    new_record = tuple.__new__  # 跳过 NamedTuple 的参数解析，大场景下每条记录都能省一次调用
+    attribute_kinds = STRING_ATTRIBUTE_KINDS
+    node_attribute_kinds = _NODE_ATTRIBUTE_KINDS
+    shared_node_types = SHARED_NODE_TYPES
+    node_type, node_offset = context
+
+    for match in matches:
+        group_index = match.lastindex
+        offset = base_offset + match.start()
+        if group_index == _GROUP_GENERAL:
+            path = decode(match.group(_GROUP_GENERAL)).strip()
+            # 与原 _extract_general_paths 的过滤条件一致
+            if ('/' in path or '\\' in path) and not path.startswith('.') and len(path) > 3:
+                append(new_record(ScanRecord, (KIND_GENERAL, '', path, offset, node_type, node_offset)))
+        elif group_index == _GROUP_VALUE:
+            attribute, path = match.group(3, _GROUP_VALUE)
+            attribute = decode(attribute)
+            path = decode(path).strip()
+            if path:
+                # 先按 (节点类型, 属性名) 解析短名，再按长名解析
+                kind = node_attribute_kinds.get((node_type, attribute)) or attribute_kinds.get(attribute, KIND_STRING)
+                append(new_record(ScanRecord, (kind, attribute, path, offset, node_type, node_offset)))
+        elif group_index == _GROUP_NODE_TYPE or group_index == _GROUP_NODE_NAME:
+            # 进入新的节点块
+            raw_type, node_name = match.group(_GROUP_NODE_TYPE, _GROUP_NODE_NAME)
+            node_type = decode(raw_type)
+            node_offset = offset
+            append(new_record(ScanRecord, (KIND_NODE, node_type, decode(node_name) if node_name else '', offset,
+                                           node_type, node_offset)))
+        elif group_index == _GROUP_REFERENCE:
+            # 顶层语句，结束当前节点块
+            node_type, node_offset = NO_NODE_CONTEXT
+            path = decode(match.group(_GROUP_REFERENCE)).strip()
+            if path:
+                append(new_record(ScanRecord, (KIND_REFERENCE, '', path, offset, node_type, node_offset)))
+        elif group_index == _GROUP_SELECT:
+            # 选中共享节点，之后的 setAttr 都作用于该节点
+            node_name = decode(match.group(_GROUP_SELECT))
+            node_type = shared_node_types.get(node_name, '')
+            node_offset = offset
+            append(new_record(ScanRecord, (KIND_NODE, node_type, node_name, offset, node_type, node_offset)))
+        elif group_index == _GROUP_REQUIRES:
+            node_type, node_offset = NO_NODE_CONTEXT
+            plugin, version = match.group(8, _GROUP_REQUIRES)
+            append(new_record(ScanRecord, (KIND_REQUIRES, decode(plugin), decode(version), offset,
+                                           node_type, node_offset)))
+        else:
+            node_type, node_offset = NO_NODE_CONTEXT
+            key, value = match.group(10, _GROUP_FILE_INFO)
+            append(new_record(ScanRecord, (KIND_FILE_INFO, decode(key), decode(value), offset,
+                                           node_type, node_offset)))
+
+    return records
+
+
+def _decode_bytes(value: bytes) -> str:
+    return value.decode('utf-8', errors='ignore')
+
+
+def resolve_attribute_kind(node_type: str, attribute: str) -> str:
+    """
+    字符串属性的记录类型（与扫描MA文本时的规则一致）
+
+    Args:
+        node_type: 所属节点的类型（未知时为空字符串，此时只解析含义唯一的短名）
+        attribute: 属性名（短名或长名）
+    """
+    if node_type:
+        kind = _NODE_ATTRIBUTE_KINDS.get((node_type, attribute))
+    else:
+        kind = _UNTYPED_ATTRIBUTE_KINDS.get(attribute)
+    return kind or STRING_ATTRIBUTE_KINDS.get(attribute, KIND_STRING)
+
+
+def is_general_path(value: str) -> bool:
+    """字符串是否会被通用模式当作绝对路径（与扫描MA文本时的过滤条件一致）"""
+    return (_GENERAL_PATH.match(value) is not None and ('/' in value or '\\' in value)
+            and len(value) > 3)
+
+
+def context_after(records: List[ScanRecord], context: Tuple[str, int] = NO_NODE_CONTEXT) -> Tuple[str, int]:
+    """返回扫描完 records 之后所在的节点（没有记录时保持 context 不变），用于下一块的扫描"""
+    if records:
+        last = records[-1]
+        return last.node_type, last.node_offset
+    return context
+
+
+def scan_ma_text(content: str, base_offset: int = 0,
+                 context: Tuple[str, int] = NO_NODE_CONTEXT) -> List[ScanRecord]:
+    """
+    单次扫描MA文本，按出现顺序返回所有路径记录
+
+    Args:
+        content: MA文本内容
+        base_offset: content 在文件中的起始偏移（分块扫描时使用）
+        context: content 开始时所在的节点（分块扫描时传入 context_after(上一块的记录)）
+
+    Returns:
+        扫描记录列表（按偏移排序）
+    """
+    return _collect_records(_SCAN_PATTERN.finditer(content), base_offset, str, context)
+
+
+def scan_ma_bytes(data, start: int = 0, end: Optional[int] = None,
+                  context: Tuple[str, int] = NO_NODE_CONTEXT, base_offset: int = 0) -> List[ScanRecord]:
+    """
+    直接扫描MA字节内容（bytes / mmap 等支持缓冲区协议的对象），不解码整段内容
+
+    只有匹配到的属性名和路径会被解码为 str，记录中的偏移就是字节偏移。
+
+    Args:
+        data: MA字节内容
+        start: 扫描起始位置
+        end: 扫描结束位置（None 表示到末尾），应位于语句边界
+        context: start 处所在的节点（分段扫描时传入 context_after(上一段的记录)）
+        base_offset: data 在文件中的起始偏移（流式读取的块使用）
+
+    Returns:
+        扫描记录列表（按偏移排序）
+    """
+    if end is None:
+        end = len(data)
+    return _collect_records(_SCAN_BYTES_PATTERN.finditer(data, start, end), base_offset, _decode_bytes, context)
+
+
+def group_records_by_kind(records: List[ScanRecord]) -> Dict[str, List[ScanRecord]]:
+    """按记录类型分组（组内保持偏移顺序）"""
+    grouped: Dict[str, List[ScanRecord]] = {}
+    for record in records:
+        grouped.setdefault(record.kind, []).append(record)
+    return grouped
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MA文件流式分词模块
+按固定大小的缓冲区分块读取MA文件，只在完整的MEL语句边界处切分，
+内存占用与场景大小无关（约为 buffer_size 的常数倍）。
+超过缓冲区的单条语句（大型数值数组、字符串数组）在字符串字面量之外的位置切成多段，
+每段都完整扫描，结果与一次扫描整条语句（mmap 模式）相同；只有单个字符串字面量超过缓冲区时，
+内存占用才会随该字面量增长
+"""
+
+import re
+from typing import BinaryIO, Generator, Iterator, NamedTuple, Optional, Set, Tuple
+
+
+# 默认读取缓冲区大小（字节）
+DEFAULT_BUFFER_SIZE = 4 * 1024 * 1024
+
+# 超过缓冲区大小的语句切分时，开头这么多字节（及其中开始的字符串字面量）保留在第一段中，
+# 语句开头的属性名、-type 和属性值由同一次匹配捕获，不能被切开；
+# 按语句读取（iter_ma_statements）时超长语句的 text 也只保留这么长的开头
+_OVERSIZED_HEAD_SIZE = 4096
+
+# _iter_blocks 产出的块类型
+_BLOCK_COMPLETE = 0        # 只包含完整语句
+_BLOCK_OVERSIZED_HEAD = 1  # 超长语句的第一段
+_BLOCK_OVERSIZED_TAIL = 2  # 超长语句的后续段
+
+# 单条语句：可选的 // 注释行 + 以分号结束的语句体（分号和引号在字符串字面量中不算，
+# 字符串字面量可以跨行并包含转义字符；语句体不能以 // 开头，注释行不完整时不会被误当成语句）
+_STATEMENT_SOURCE = (
+    rb'(?:[ \t\r\n]*//[^\n]*\n)*(?![ \t\r\n]*//)'
+    rb'[^";]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^";]*)*;'
+)
+_STATEMENT = re.compile(_STATEMENT_SOURCE, re.DOTALL)
+# 连续的完整语句：一次匹配即可找到缓冲区中最后一个安全切分点
+_STATEMENTS = re.compile(rb'(?:' + _STATEMENT_SOURCE + rb')*', re.DOTALL)
+# 语句开头的空白和注释
+_LEADING_TRIVIA = re.compile(rb'(?:[ \t\r\n]*//[^\n]*\n)*[ \t\r\n]*')
+_KEYWORD = re.compile(rb'[^\s;]+')
+# 超长语句跳过模式下需要关注的字符
+_SPECIAL_CHARS = re.compile(rb'[";\\]')
+
+
+class MaStatement(NamedTuple):
+    """MEL语句"""
+    keyword: str      # 语句关键字（createNode / setAttr / file / requires / fileInfo ...）
+    text: str         # 语句文本（不含开头的空白和注释，包含结尾分号）
+    offset: int       # 语句在文件中的字节偏移
+    truncated: bool   # 语句超过缓冲区大小，text 只保留了开头部分
+
+
+def _iter_oversized_statement(stream: BinaryIO, pending: bytes, buffer_size: int,
+                              offset: int) -> Generator[Tuple[int, bytes, int], None, Tuple[bytes, int]]:
+    """
+    分段产出一条超过缓冲区大小的语句
+
+    只在字符串字面量之外切分（字面量中的转义字符、分号和换行不影响判断），
+    开头 _OVERSIZED_HEAD_SIZE 字节以及其中开始的字面量都留在第一段
+
+    Args:
+        stream: 二进制流
+        pending: 已读取的数据（从语句开头，或语句前的空白和注释开始）
+        buffer_size: 读取缓冲区大小
+        offset: pending 在文件中的字节偏移
+
+    Yields:
+        (段在文件中的字节偏移, 段内容, 块类型)
+
+    Returns:
+        (语句之后剩余的数据, 语句占用的字节数)
+    """
+    data = pending
+    piece_start = 0
+    # 语句前的空白和注释（注释中的引号和分号不算）
+    position = _LEADING_TRIVIA.match(data).end()
+    head_end = position + _OVERSIZED_HEAD_SIZE
+    in_string = False
+    escaped = False
+    literal_start = -1
+    block_type = _BLOCK_OVERSIZED_HEAD
+    while True:
+        length = len(data)
+        if escaped and position < length:
+            position += 1
+            escaped = False
+        while not escaped:
+            match = _SPECIAL_CHARS.search(data, position)
+            if match is None:
+                position = length
+                break
+            char = match.group()
+            position = match.end()
+            if in_string:
+                if char == b'\\':
+                    if position >= length:
+                        escaped = True
+                        break
+                    position += 1
+                elif char == b'"':
+                    in_string = False
+            elif char == b'"':
+                in_string = True
+                literal_start = position - 1
+            elif char == b';':
+                yield offset + piece_start, data[:position], block_type
+                return data[position:], piece_start + position
+
+        # 切在当前未结束的字面量之前（不在字面量中时切在末尾）
+        cut = literal_start if in_string else length
+        if cut > 0 and piece_start + cut >= head_end:
+            yield offset + piece_start, data[:cut], block_type
+            block_type = _BLOCK_OVERSIZED_TAIL
+            data = data[cut:]
+            piece_start += cut
+            position -= cut
+            literal_start -= cut
+
+        more = stream.read(buffer_size)
+        if not more:
+            # 文件在语句结束前结束
+            if data.strip():
+                yield offset + piece_start, data, block_type
+            return b'', piece_start + len(data)
+        data += more
+
+
+def _iter_blocks(stream: BinaryIO, buffer_size: int) -> Iterator[Tuple[int, bytes, int]]:
+    """
+    分块读取，产出只包含完整语句的字节块（超长语句分段产出）
+
+    Yields:
+        (块在文件中的字节偏移, 块内容, 块类型 _BLOCK_*)
+    """
+    pending = b''
+    offset = 0
+    while True:
+        data = stream.read(buffer_size)
+        eof = not data
+        if data:
+            pending = pending + data if pending else data
+
+        if eof:
+            if pending.strip():
+                yield offset, pending, _BLOCK_COMPLETE
+            return
+
+        end = _STATEMENTS.match(pending).end()
+        if end > 0:
+            yield offset, pending[:end], _BLOCK_COMPLETE
+            pending = pending[end:]
+            offset += end
+        elif len(pending) > buffer_size:
+            # 单条语句超过缓冲区：分段产出，每段大约一个缓冲区
+            pending, consumed = yield from _iter_oversized_statement(stream, pending, buffer_size, offset)
+            offset += consumed
+
+
+def _open_binary(ma_file_path: str) -> BinaryIO:
+    # 关闭Python自身的缓冲，读取大小完全由 buffer_size 决定
+    return open(ma_file_path, 'rb', buffering=0)
+
+
+def iter_ma_chunks(ma_file_path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[Tuple[int, str]]:
+    """
+    按语句边界分块读取MA文件
+
+    每块只包含完整语句（跨块的语句和多行字符串字面量会被合并到同一块），
+    适合直接交给正则扫描；超过缓冲区的语句在字符串字面量之外切成多块，
+    依次扫描各块与一次扫描整条语句的结果相同。
+
+    Args:
+        ma_file_path: MA文件路径
+        buffer_size: 读取缓冲区大小（字节）
+
+    Yields:
+        (块在文件中的字节偏移, 块文本)
+    """
+    with _open_binary(ma_file_path) as stream:
+        yield from iter_ma_stream_chunks(stream, buffer_size)
+
+
+def iter_ma_stream_chunks(stream: BinaryIO, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[Tuple[int, str]]:
+    """
+    与 iter_ma_chunks 相同，但直接读取已打开的二进制流（只需要支持 read(size)）
+
+    Args:
+        stream: 二进制流
+        buffer_size: 读取缓冲区大小（字节）
+
+    Yields:
+        (块在流中的字节偏移, 块文本)
+    """
+    for offset, block, _ in _iter_blocks(stream, buffer_size):
+        yield offset, block.decode('utf-8', errors='ignore')
+
+
+def iter_ma_stream_blocks(stream: BinaryIO, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Iterator[Tuple[int, bytes]]:
+    """
+    与 iter_ma_stream_chunks 相同，但产出未解码的字节块（直接交给 ma_scanner.scan_ma_bytes，
+    记录的偏移是字节偏移，与 mmap 模式相同）
+
+    Yields:
+        (块在流中的字节偏移, 块内容)
+    """
+    for offset, block, _ in _iter_blocks(stream, buffer_size):
+        yield offset, block
+
+
+def iter_ma_spans(data, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                  start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int]]:
+    """
+    把内存中的MA内容（bytes / mmap 等支持缓冲区协议的对象）按语句边界切分为若干区间
+
+    与 iter_ma_chunks 的切分规则相同，但不复制数据，只产出区间；
+    各区间首尾相接，覆盖 [start, end)。超过 buffer_size 的语句单独成为一个区间（不截断）。
+
+    Args:
+        data: MA字节内容
+        buffer_size: 区间的目标大小（字节）
+        start: 起始位置（应位于语句边界）
+        end: 结束位置（None 表示到末尾，应位于语句边界）
+
+    Yields:
+        (区间起始位置, 区间结束位置)
+    """
+    size = len(data) if end is None else end
+    while start < size:
+        limit = min(start + buffer_size, size)
+        span_end = _STATEMENTS.match(data, start, limit).end() if limit < size else size
+        if span_end == start:
+            # 单条语句超过 buffer_size：整条语句作为一个区间
+            match = _STATEMENT.match(data, start, size)
+            span_end = match.end() if match else size
+        yield start, span_end
+        start = span_end
+
+
+def iter_ma_statements(ma_file_path: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                       keywords: Optional[Set[str]] = None) -> Iterator[MaStatement]:
+    """
+    逐条产出MA文件中的MEL语句（createNode / setAttr / file -r / requires / fileInfo ...）
+
+    Args:
+        ma_file_path: MA文件路径
+        buffer_size: 读取缓冲区大小（字节）
+        keywords: 只产出这些关键字的语句（None 表示全部）
+
+    Yields:
+        MaStatement
+    """
+    with _open_binary(ma_file_path) as stream:
+        yield from iter_ma_stream_statements(stream, buffer_size, keywords)
+
+
+def iter_ma_stream_statements(stream: BinaryIO, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                              keywords: Optional[Set[str]] = None,
+                              base_offset: int = 0) -> Iterator[MaStatement]:
+    """
+    与 iter_ma_statements 相同，但直接读取已打开的二进制流（只需要支持 read(size)）
+
+    按需读取：调用方提前结束迭代时，流中剩余的内容不会被读取。
+
+    Args:
+        stream: 二进制流（应从语句边界开始）
+        buffer_size: 读取缓冲区大小（字节）
+        keywords: 只产出这些关键字的语句（None 表示全部）
+        base_offset: 流的开始位置在文件中的字节偏移
+
+    Yields:
+        MaStatement
+    """
+    keyword_filter = {keyword.encode('ascii') for keyword in keywords} if keywords else None
+
+    for block_offset, block, block_type in _iter_blocks(stream, buffer_size):
+        block_offset += base_offset
+        truncated = block_type != _BLOCK_COMPLETE
+        if block_type == _BLOCK_OVERSIZED_TAIL:
+            continue
+        if truncated:
+            spans = [(0, len(block))]
+        else:
+            spans = []
+            position = 0
+            for match in _STATEMENT.finditer(block):
+                if match.start() != position:
+                    break
+                spans.append((position, match.end()))
+                position = match.end()
+            # 文件末尾没有分号的残余内容
+            if position < len(block) and block[position:].strip():
+                spans.append((position, len(block)))
+
+        for start, end in spans:
+            start = _LEADING_TRIVIA.match(block, start, end).end()
+            if truncated:
+                # 超长语句只保留开头部分（其余各段已跳过）
+                end = min(end, start + _OVERSIZED_HEAD_SIZE)
+            keyword_match = _KEYWORD.match(block, start, end)
+            if keyword_match is None:
+                continue
+            keyword = keyword_match.group()
+            if keyword_filter is not None and keyword not in keyword_filter:
+                continue
+            yield MaStatement(
+                keyword.decode('utf-8', errors='ignore'),
+                block[start:end].decode('utf-8', errors='ignore'),
+                block_offset + start,
+                truncated
+            )
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MB文件（Maya Binary）读取模块
+MB文件是IFF格式的分块文件（32位为 FOR4，64位为 FOR8），本模块不依赖Maya，
+流式遍历分组和数据块，把节点创建、字符串属性、引用、requires、fileInfo 数据块
+转换为与 parsers.ma_scanner 相同的扫描记录，MB场景不需要先转换为MA就能扫描依赖文件
+
+只解析上述数据块，其余数据块（数值属性、连接等）直接跳过：
+    CREA  节点创建：标志(1字节) + 节点名 + [父节点名]，所属分组的类型为节点类型ID
+    SLCT  选中共享节点（对应 select -ne）：节点名
+    STR   字符串属性（对应 setAttr -type "string"）：属性名 + [标志(1字节)] + 值
+    FREF  文件引用（对应 file -r）：路径 + ...
+    PLUG  插件依赖（对应 requires）：插件名 + 版本
+    FINF  文件信息（对应 fileInfo）：键 + 值
+字符串均以 \\0 结尾，按 UTF-8 解码
+"""
+
+import struct
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+from parsers.ma_scanner import (
+    ScanRecord,
+    KIND_NODE,
+    KIND_REFERENCE,
+    KIND_GENERAL,
+    KIND_REQUIRES,
+    KIND_FILE_INFO,
+    NO_NODE_CONTEXT,
+    SHARED_NODE_TYPES,
+    resolve_attribute_kind,
+    is_general_path
+)
+from parsers.ma_tokenizer import DEFAULT_BUFFER_SIZE
+
+
+class _ChunkLayout(NamedTuple):
+    """数据块头格式"""
+    size_format: str   # 大小字段的 struct 格式
+    header_size: int   # 块头长度（标签 + 填充 + 大小）
+    type_size: int     # 分组类型字段长度（类型标签 + 填充）
+    alignment: int     # 块对齐字节数
+
+
+# 文件头标签 -> 块头格式（FOR8 的标签后有4字节填充，大小字段为8字节）
+_LAYOUTS: Dict[bytes, _ChunkLayout] = {
+    b'FORM': _ChunkLayout('>I', 8, 4, 2),
+    b'FOR4': _ChunkLayout('>I', 8, 4, 4),
+    b'FOR8': _ChunkLayout('>Q', 16, 8, 8),
+}
+
+# 分组块标签（内容为分组类型 + 子块）
+_GROUP_TAGS = frozenset((
+    b'FORM', b'LIST', b'CAT ', b'PROP',
+    b'FOR4', b'LIS4', b'CAT4', b'PRO4',
+    b'FOR8', b'LIS8', b'CAT8', b'PRO8',
+))
+
+# 节点分组的类型ID -> 节点类型（插件节点的类型ID是数值，通常不在表中，此时节点类型为空字符串）
+MB_NODE_TYPE_IDS: Dict[bytes, str] = {
+    b'RTFT': 'file',
+    b'XFRM': 'transform',
+    b'DMSH': 'mesh',
+}
+
+# 需要读取内容的数据块，其余数据块只跳过
+_CHUNK_CREATE = b'CREA'
+_CHUNK_SELECT = b'SLCT'
+_CHUNK_STRING = b'STR '
+_CHUNK_REFERENCE = b'FREF'
+_CHUNK_REQUIRES = b'PLUG'
+_CHUNK_FILE_INFO = b'FINF'
+_DATA_TAGS = frozenset((_CHUNK_CREATE, _CHUNK_SELECT, _CHUNK_STRING, _CHUNK_REFERENCE,
+                        _CHUNK_REQUIRES, _CHUNK_FILE_INFO))
+
+
+class MbFormatError(ValueError):
+    """不是有效的MB文件，或文件结构损坏"""
+
+
+def is_maya_binary(header: bytes) -> bool:
+    """文件开头的字节是否为MB文件头"""
+    return header[:4] in _LAYOUTS
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise MbFormatError(f"MB文件意外结束（需要 {size} 字节，实际 {len(data)} 字节）")
+    return data
+
+
+def _skip(stream: BinaryIO, size: int, buffer_size: int) -> None:
+    """跳过指定字节数（按块读取，流不需要支持 seek）"""
+    while size > 0:
+        data = stream.read(min(size, buffer_size))
+        if not data:
+            raise MbFormatError("MB文件意外结束")
+        size -= len(data)
+
+
+def _split_strings(payload: bytes) -> List[str]:
+    """把以 \\0 结尾的字符串序列拆分并解码"""
+    return [part.decode('utf-8', errors='ignore') for part in payload.split(b'\0')]
+
+
+def _parse_string_attribute(payload: bytes) -> Tuple[str, str]:
+    """解析 STR 数据块，返回 (属性名, 值)"""
+    name_end = payload.find(b'\0')
+    if name_end < 0:
+        return payload.decode('utf-8', errors='ignore').lstrip('.'), ''
+    value_start = name_end + 1
+    # 属性名之后可能有一个标志字节
+    if value_start < len(payload) and payload[value_start] < 0x20 and payload[value_start] != 0:
+        value_start += 1
+    value_end = payload.find(b'\0', value_start)
+    if value_end < 0:
+        value_end = len(payload)
+    attribute = payload[:name_end].decode('utf-8', errors='ignore').lstrip('.')
+    return attribute, payload[value_start:value_end].decode('utf-8', errors='ignore')
+
+
+def scan_mb_stream(stream: BinaryIO, buffer_size: int = DEFAULT_BUFFER_SIZE) -> List[ScanRecord]:
+    """
+    流式扫描MB文件，按出现顺序返回扫描记录（与 parsers.ma_scanner.scan_ma_text 的记录相同）
+
+    节点块的范围就是包含 CREA 数据块的分组，分组结束后回到“不在任何节点中”的上下文。
+
+    Args:
+        stream: 二进制流（只需要支持 read(size)）
+        buffer_size: 跳过大数据块时的读取大小（字节）
+
+    Returns:
+        扫描记录列表（偏移为数据块在文件中的字节偏移）
+
+    Raises:
+        MbFormatError: 不是MB文件或文件结构损坏
+    """
+    head = stream.read(4)
+    layout = _LAYOUTS.get(head)
+    if layout is None:
+        raise MbFormatError("不是MB文件（缺少 FOR4/FOR8 文件头）")
+
+    records: List[ScanRecord] = []
+    append = records.append
+    new_record = tuple.__new__
+    size_struct = struct.Struct(layout.size_format)
+    alignment = layout.alignment
+
+    # 分组栈：(分组结束位置, 分组类型, 进入分组前的节点上下文)
+    groups: List[Tuple[int, bytes, Tuple[str, int]]] = []
+    node_type, node_offset = NO_NODE_CONTEXT
+    position = 0
+    tag: Optional[bytes] = head
+
+    while True:
+        # 离开已经结束的分组
+        while groups and position >= groups[-1][0]:
+            _, _, (node_type, node_offset) = groups.pop()
+
+        if tag is None:
+            tag = stream.read(4)
+            if not tag:
+                if groups:
+                    # 在数据块边界上截断：外层分组的大小超出了文件末尾
+                    raise MbFormatError("MB文件意外结束（分组不完整）")
+                break
+            if len(tag) != 4:
+                raise MbFormatError("MB文件意外结束")
+        offset = position
+        header = _read_exact(stream, layout.header_size - 4)
+        size = size_struct.unpack_from(header, layout.header_size - 4 - size_struct.size)[0]
+        position += layout.header_size
+        padded_size = size + (-size) % alignment
+
+        if tag in _GROUP_TAGS:
+            group_type = _read_exact(stream, layout.type_size)[:4]
+            position += layout.type_size
+            groups.append((offset + layout.header_size + padded_size, group_type, (node_type, node_offset)))
+            tag = None
+            continue
+
+        if tag not in _DATA_TAGS:
+            _skip(stream, padded_size, buffer_size)
+            position += padded_size
+            tag = None
+            continue
+
+        payload = _read_exact(stream, padded_size)[:size]
+        position += padded_size
+
+        if tag == _CHUNK_STRING:
+            attribute, raw_value = _parse_string_attribute(payload)
+            value = raw_value.strip()
+            if value:
+                append(new_record(ScanRecord, (resolve_attribute_kind(node_type, attribute), attribute, value,
+                                               offset, node_type, node_offset)))
+                if is_general_path(raw_value):
+                    append(new_record(ScanRecord, (KIND_GENERAL, '', value, offset, node_type, node_offset)))
+        elif tag == _CHUNK_CREATE:
+            # 节点分组内的 CREA：分组类型为节点类型ID
+            group_type = groups[-1][1] if groups else b''
+            node_type = MB_NODE_TYPE_IDS.get(group_type, '')
+            node_offset = offset
+            name = _split_strings(payload[1:])[0] if payload else ''
+            append(new_record(ScanRecord, (KIND_NODE, node_type, name, offset, node_type, node_offset)))
+        elif tag == _CHUNK_SELECT:
+            name = _split_strings(payload)[0].lstrip(':')
+            node_type = SHARED_NODE_TYPES.get(name, '')
+            node_offset = offset
+            append(new_record(ScanRecord, (KIND_NODE, node_type, name, offset, node_type, node_offset)))
+        else:
+            node_type, node_offset = NO_NODE_CONTEXT
+            strings = _split_strings(payload) + ['', '']
+            if tag == _CHUNK_REFERENCE:
+                raw_path = strings[0]
+                path = raw_path.strip()
+                if path:
+                    append(new_record(ScanRecord, (KIND_REFERENCE, '', path, offset, node_type, node_offset)))
+                    if is_general_path(raw_path):
+                        append(new_record(ScanRecord, (KIND_GENERAL, '', path, offset, node_type, node_offset)))
+            elif tag == _CHUNK_REQUIRES:
+                append(new_record(ScanRecord, (KIND_REQUIRES, strings[0], strings[1], offset,
+                                               node_type, node_offset)))
+            else:
+                append(new_record(ScanRecord, (KIND_FILE_INFO, strings[0], strings[1], offset,
+                                               node_type, node_offset)))
+        tag = None
+
+    return records
+
+
+def scan_mb_file(mb_file_path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> List[ScanRecord]:
+    """
+    扫描MB文件（见 scan_mb_stream）
+
+    Args:
+        mb_file_path: MB文件路径
+        buffer_size: 跳过大数据块时的读取大小（字节）
+    """
+    with open(mb_file_path, 'rb') as stream:
+        return scan_mb_stream(stream, buffer_size)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+引用关系解析模块
+从主场景开始递归解析 file -r 引用的MA/MB文件，合并所有文件中的依赖路径，并输出引用关系图（DAG）。
+每个场景文件按 (路径, 大小, 修改时间) 缓存解析结果（LRU，有上限），被多次引用的共享文件（如角色绑定）只解析一次；
+同一层的引用文件在多个进程中并行解析，引用环会被检测并从关系图中去掉
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from parsers.ma_scanner import KIND_REFERENCE
+from parsers.scene_document import SceneDocument
+from parsers.file_path_extractor import extract_file_paths_from_ma, is_absolute_path
+from utils.bounded_cache import BoundedCache
+from utils.stat_cache import get_stat_cache
+# 导入全局logger
+from core.logger import logger
+
+
+# 可以继续解析的引用文件类型
+_SCENE_EXTENSIONS = ('.ma', '.mb')
+
+# 同一文件被多次引用时，Maya在路径末尾加上 {N} 区分
+_COPY_NUMBER_SUFFIX = re.compile(r'\{\d+\}$')
+
+
+class SceneDependencies(NamedTuple):
+    """单个场景文件的解析结果"""
+    paths: Tuple[str, ...]       # 依赖路径（extract_file_paths_from_ma 的结果去掉 {N} 后缀，按字母排序）
+    references: Tuple[str, ...]  # file -r 引用路径（已去掉 {N} 后缀，保持文件中的顺序）
+
+
+class ReferenceGraph(NamedTuple):
+    """引用关系解析结果"""
+    root: str                                # 主场景路径（绝对路径）
+    dependencies: Set[str]                   # 合并后的依赖路径（引用文件中的相对路径已按其所在目录转为绝对路径）
+    references: Dict[str, List[str]]         # 引用关系图：场景 -> 直接引用的场景（不含形成环的边）
+    cycles: List[Tuple[str, str]]            # 形成引用环的边 (引用方, 被引用方)
+    missing: List[str]                       # 不存在的引用文件
+
+
+# 解析结果缓存的最大条目数（监视模式下场景每次修改都产生新的键，旧条目按最近使用顺序淘汰）
+SCENE_CACHE_SIZE = 128
+
+# 解析结果缓存：(规范化路径, 大小, 修改时间, 是否包含通用模式) -> 解析结果
+_SCENE_CACHE: BoundedCache[SceneDependencies] = BoundedCache(SCENE_CACHE_SIZE)
+
+
+def _cache_key(scene_path: str, include_general: bool) -> Optional[Tuple[str, int, int, bool]]:
+    try:
+        stat_result = os.stat(scene_path)
+    except OSError:
+        return None
+    return os.path.normcase(scene_path), stat_result.st_size, stat_result.st_mtime_ns, include_general
+
+
+def _parse_scene(scene_path: str, include_general: bool,
+                 document: Optional[SceneDocument] = None) -> SceneDependencies:
+    """解析单个场景文件（在子进程中执行时不传入 document）"""
+    if document is None:
+        # 已经在进程池中并行，单个文件不再分片并行扫描
+        document = SceneDocument(scene_path, workers=1)
+    paths = {_COPY_NUMBER_SUFFIX.sub('', path)
+             for path in extract_file_paths_from_ma(scene_path, document=document, include_general=include_general)}
+    references = []
+    try:
+        for record in document.scan_records().get(KIND_REFERENCE, []):
+            reference = _COPY_NUMBER_SUFFIX.sub('', record.value)
+            if reference and reference not in references:
+                references.append(reference)
+    except Exception as e:
+        logger.warning(f"读取引用失败: {scene_path}, 错误: {e}")
+    return SceneDependencies(tuple(sorted(paths)), tuple(references))
+
+
+def _resolve_path(path: str, base_dir: str) -> str:
+    """展开环境变量，相对路径按 base_dir 拼接为绝对路径"""
+    path = os.path.expandvars(path)
+    if not is_absolute_path(path):
+        path = os.path.join(base_dir, path)
+    return os.path.normpath(os.path.abspath(path))
+
+
+def _parse_scenes(scene_paths: List[str], include_general: bool,
+                  workers: int) -> Dict[str, SceneDependencies]:
+    """解析一批场景文件（未缓存的文件在进程池中并行解析）"""
+    results: Dict[str, SceneDependencies] = {}
+    pending: List[Tuple[str, Tuple[str, int, int, bool]]] = []
+    for scene_path in scene_paths:
+        key = _cache_key(scene_path, include_general)
+        if key is None:
+            continue
+        cached = _SCENE_CACHE.get(key)
+        if cached is not None:
+            results[scene_path] = cached
+        else:
+            pending.append((scene_path, key))
+
+    parsed: List[SceneDependencies] = []
+    if len(pending) > 1 and workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+                futures = [executor.submit(_parse_scene, scene_path, include_general)
+                           for scene_path, _ in pending]
+                parsed = [future.result() for future in futures]
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"并行解析引用文件失败，改用串行解析: {e}")
+            parsed = []
+    if not parsed:
+        parsed = [_parse_scene(scene_path, include_general) for scene_path, _ in pending]
+
+    for (scene_path, key), dependencies in zip(pending, parsed):
+        _SCENE_CACHE.put(key, dependencies)
+        results[scene_path] = dependencies
+    return results
+
+
+def _find_back_edges(root: str, references: Dict[str, List[str]]) -> List[Tuple[str, str]]:
+    """深度优先遍历，返回形成环的边（指向当前遍历路径上的祖先）"""
+    back_edges: List[Tuple[str, str]] = []
+    visited: Set[str] = set()
+    on_path: Set[str] = set()
+    # 栈元素：(场景, 下一个要访问的子节点序号)
+    stack: List[Tuple[str, int]] = [(root, 0)]
+    visited.add(root)
+    on_path.add(root)
+    while stack:
+        scene_path, index = stack[-1]
+        children = references.get(scene_path, [])
+        if index >= len(children):
+            stack.pop()
+            on_path.discard(scene_path)
+            continue
+        stack[-1] = (scene_path, index + 1)
+        child = children[index]
+        if child in on_path:
+            back_edges.append((scene_path, child))
+        elif child not in visited:
+            visited.add(child)
+            on_path.add(child)
+            stack.append((child, 0))
+    return back_edges
+
+
+def resolve_reference_graph(scene_path: str, document: Optional[SceneDocument] = None,
+                            workers: Optional[int] = None, include_general: bool = True) -> ReferenceGraph:
+    """
+    递归解析场景引用的MA/MB文件，合并所有依赖路径
+
+    Args:
+        scene_path: 主场景路径
+        document: 主场景已打开的场景文档（提供时不再重新读取主场景）
+        workers: 并行解析的进程数（None 表示CPU核数，1 表示不并行）
+        include_general: 是否包含通用模式提取的路径（见 extract_file_paths_from_ma）
+
+    Returns:
+        ReferenceGraph（主场景中的相对路径保持原样，由调用方按场景目录处理）
+    """
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    root = os.path.normpath(os.path.abspath(scene_path))
+
+    root_dependencies = SceneDependencies((), ())
+    root_key = _cache_key(root, include_general)
+    if root_key is not None:
+        root_dependencies = _SCENE_CACHE.get(root_key) or _parse_scene(root, include_general, document)
+        _SCENE_CACHE.put(root_key, root_dependencies)
+
+    dependencies: Set[str] = set(root_dependencies.paths)
+    references: Dict[str, List[str]] = {}
+    missing: List[str] = []
+    parsed: Dict[str, SceneDependencies] = {root: root_dependencies}
+
+    # 按层解析：同一层中尚未解析的引用文件一起并行解析
+    level = [root]
+    while level:
+        next_level: List[str] = []
+        for parent in level:
+            parent_dir = os.path.dirname(parent)
+            children = []
+            for reference in parsed[parent].references:
+                child = _resolve_path(reference, parent_dir)
+                if child not in children:
+                    children.append(child)
+                if child in parsed or child in next_level:
+                    continue
+                if not get_stat_cache().isfile(child):
+                    if child not in missing:
+                        missing.append(child)
+                    continue
+                if child.lower().endswith(_SCENE_EXTENSIONS):
+                    next_level.append(child)
+            references[parent] = children
+
+        level_results = _parse_scenes(next_level, include_general, workers)
+        for child, child_dependencies in level_results.items():
+            parsed[child] = child_dependencies
+            child_dir = os.path.dirname(child)
+            for path in child_dependencies.paths:
+                dependencies.add(path if is_absolute_path(path) else _resolve_path(path, child_dir))
+            dependencies.update(_resolve_path(reference, child_dir) for reference in child_dependencies.references)
+        level = [child for child in next_level if child in level_results]
+
+    cycles = _find_back_edges(root, references)
+    for parent, child in cycles:
+        references[parent].remove(child)
+        logger.warning(f"检测到循环引用: {parent} -> {child}")
+
+    if len(parsed) > 1:
+        logger.print_with_time(f"    解析了 {len(parsed) - 1} 个引用文件，"
+                               f"合并后共 {len(dependencies)} 个路径引用")
+    return ReferenceGraph(root, dependencies, references, cycles, missing)
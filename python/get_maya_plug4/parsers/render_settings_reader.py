@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染参数读取模块（快速模式）
+直接从MA文本中读取渲染参数（defaultRenderGlobals / defaultResolution / 渲染器选项节点 / 相机 .rnd），
+输出与 scene_inspector.run_maya_script 相同结构的场景数据，不需要启动mayapy。
+
+MA文件只写出与默认值不同的属性，未写出的属性按Maya的默认值处理，
+使用了默认值的属性记录在场景数据的 'defaults' 中（节点名 -> 属性名列表），与实际读取到的值区分开；
+以下情况无法从文本中可靠得到，对应字段记为缺失，由调用方回退到mayapy：
+    - 共享节点不在场景中（如渲染器插件未保存选项节点）
+    - 属性没有已知的默认值（如 imageFormat 与渲染器相关）
+    - 渲染设备属性未写出（渲染器插件的默认值随版本和设置变化，不按默认值推断）
+    - 场景包含引用（引用文件中的相机和引用编辑不在当前文件中）
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from parsers.ma_scanner import KIND_REFERENCE
+from parsers.scene_document import SceneDocument
+# 导入全局logger
+from core.logger import logger
+
+
+# 字段名（缺失字段列表中使用）
+FIELD_RENDERER = 'renderer'
+FIELD_RESOLUTION = 'resolution'
+FIELD_FRAME_RANGE = 'frame_range'
+FIELD_IMAGE_FORMAT = 'image_format'
+FIELD_IMAGE_FILE_PREFIX = 'image_file_prefix'
+FIELD_RENDER_CAMERAS = 'render_cameras'
+FIELD_RENDER_DEVICE = 'render_device'
+
+# 属性短名 -> 长名（MA文件中写出的是短名）
+_ATTRIBUTE_LONG_NAMES: Dict[str, str] = {
+    'ren': 'currentRenderer',
+    'fs': 'startFrame',
+    'ef': 'endFrame',
+    'bfs': 'byFrameStep',
+    'an': 'animation',
+    'if': 'imageFormat',
+    'ifp': 'imageFilePrefix',
+    'ofc': 'outFormatControl',
+    'w': 'width',
+    'h': 'height',
+    'rnd': 'renderable',
+}
+
+# 未写出的属性使用的Maya默认值（不在表中的属性没有可靠的默认值，包括渲染器插件选项节点的属性）
+_NODE_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    'defaultRenderGlobals': {
+        'currentRenderer': 'mayaSoftware',
+        'startFrame': 1.0,
+        'endFrame': 10.0,
+        'byFrameStep': 1.0,
+        'animation': False,
+        'imageFilePrefix': '',
+        'outFormatControl': 0,
+    },
+    'defaultResolution': {
+        'width': 640,
+        'height': 480,
+    },
+}
+
+# 渲染器 -> (选项节点, 设备属性, 属性值 -> 设备)，与 mayapy 检查脚本的对应关系一致
+_RENDER_DEVICE_ATTRIBUTES: Dict[str, Tuple[str, str, Dict[int, str]]] = {
+    'arnold': ('defaultArnoldRenderOptions', 'renderDevice', {0: 'cpu', 1: 'gpu'}),
+    'redshift': ('redshiftOptions', 'renderUsing', {0: 'gpu', 1: 'cpu'}),
+    'vray': ('vraySettings', 'vrayVfbRenderDevice', {0: 'cpu', 1: 'gpu'}),
+}
+
+# setAttr 语句：可选的标志（-k on / -l on / -av ...）+ 属性名 + 可选的 -type + 值
+_SET_ATTR = re.compile(
+    r'setAttr\s+(?:-\w+(?:\s+(?:on|off|yes|no|true|false|\d+))?\s+)*"\.([^"]+)"\s+'
+    r'(?:-type\s+"[^"]*"\s+)?(.*?)\s*;\s*$',
+    re.DOTALL
+)
+# 时间属性（mayapy getAttr 返回浮点数）
+_FLOAT_ATTRIBUTES = frozenset(('startFrame', 'endFrame', 'byFrameStep'))
+_PARENT_FLAG = re.compile(r'\s-p\s+"([^"]+)"')
+_BOOLEAN_VALUES = {'yes': True, 'on': True, 'true': True, 'no': False, 'off': False, 'false': False}
+
+
+def _parse_value(text: str) -> Optional[Any]:
+    """解析 setAttr 的单个值（字符串 / 布尔 / 数值），多个值或无法解析时返回None"""
+    if text.startswith('"'):
+        if len(text) < 2 or not text.endswith('"'):
+            return None
+        return re.sub(r'\\(.)', r'\1', text[1:-1])
+    if not text or len(text.split()) != 1:
+        return None
+    if text in _BOOLEAN_VALUES:
+        return _BOOLEAN_VALUES[text]
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _read_node_attributes(document: SceneDocument, node_name: str) -> Optional[Dict[str, Any]]:
+    """
+    读取节点 setAttr 设置的单值属性（键为长名，未知短名保持原样），只包含文件中实际写出的属性
+
+    同一节点可能有多个节点块（如多次 select -ne），按出现顺序合并；节点不在场景中时返回None
+    """
+    blocks = [node for node in document.nodes() if node.name == node_name]
+    if not blocks:
+        return None
+    attributes: Dict[str, Any] = {}
+    for node in blocks:
+        for statement in document.node_statements(node):
+            if statement.keyword != 'setAttr':
+                continue
+            match = _SET_ATTR.match(statement.text)
+            if not match:
+                continue
+            value = _parse_value(match.group(2))
+            if value is not None:
+                attribute = _ATTRIBUTE_LONG_NAMES.get(match.group(1), match.group(1))
+                if attribute in _FLOAT_ATTRIBUTES and isinstance(value, int):
+                    value = float(value)
+                attributes[attribute] = value
+    return attributes
+
+
+def _apply_defaults(node_name: str, attributes: Dict[str, Any], defaults: Dict[str, List[str]]) -> Dict[str, Any]:
+    """未写出的属性使用Maya默认值，使用了默认值的属性名记录到 defaults[node_name]"""
+    merged = dict(attributes)
+    for attribute, value in _NODE_DEFAULTS.get(node_name, {}).items():
+        if attribute not in merged:
+            merged[attribute] = value
+            defaults.setdefault(node_name, []).append(attribute)
+    return merged
+
+
+def _is_absolute_prefix(image_file_prefix: str) -> bool:
+    """判断 imageFilePrefix 是否为绝对路径（与 mayapy 检查脚本的判断一致）"""
+    if not image_file_prefix:
+        return False
+    prefix_clean = image_file_prefix.replace('\\', '/')
+    if re.match(r'^[A-Za-z]:', prefix_clean):
+        return True
+    if prefix_clean.startswith('//') or prefix_clean.startswith('\\\\'):
+        return True
+    return os.path.isabs(prefix_clean.replace('/', '\\'))
+
+
+def _read_render_cameras(document: SceneDocument) -> List[str]:
+    """可渲染相机的父节点名（相机的 renderable 默认为开启）"""
+    render_cameras = []
+    for node in document.nodes('camera'):
+        statements = document.node_statements(node)
+        create_statement = next(statements, None)
+        parent_match = _PARENT_FLAG.search(create_statement.text) if create_statement else None
+        renderable = True
+        for statement in statements:
+            match = _SET_ATTR.match(statement.text) if statement.keyword == 'setAttr' else None
+            if match and _ATTRIBUTE_LONG_NAMES.get(match.group(1), match.group(1)) == 'renderable':
+                renderable = bool(_parse_value(match.group(2)))
+        if renderable and parent_match:
+            render_cameras.append(parent_match.group(1).split('|')[-1])
+    return render_cameras
+
+
+def read_render_settings(document: SceneDocument) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    从MA文本中读取渲染参数
+
+    Args:
+        document: 场景文档（只读取相关节点块所在的区间）
+
+    Returns:
+        (场景数据（结构与 run_maya_script 的返回值相同，只包含渲染参数相关的字段，另有 'defaults'
+        记录使用了Maya默认值的属性）, 缺失的字段列表)
+        缺失字段列表为空时，场景数据可以直接代替 mayapy 的检查结果
+    """
+    if document.is_binary:
+        # MB文件没有文本形式的 setAttr 语句
+        return {}, [FIELD_RENDERER, FIELD_RESOLUTION, FIELD_FRAME_RANGE, FIELD_IMAGE_FORMAT,
+                    FIELD_IMAGE_FILE_PREFIX, FIELD_RENDER_CAMERAS, FIELD_RENDER_DEVICE]
+
+    missing: List[str] = []
+    defaults: Dict[str, List[str]] = {}
+
+    render_globals = _read_node_attributes(document, 'defaultRenderGlobals')
+    resolution = _read_node_attributes(document, 'defaultResolution')
+    if render_globals is None:
+        missing.extend((FIELD_RENDERER, FIELD_FRAME_RANGE, FIELD_IMAGE_FORMAT, FIELD_IMAGE_FILE_PREFIX))
+        render_globals = {}
+    else:
+        if 'imageFormat' not in render_globals:
+            missing.append(FIELD_IMAGE_FORMAT)
+        render_globals = _apply_defaults('defaultRenderGlobals', render_globals, defaults)
+    if resolution is None:
+        missing.append(FIELD_RESOLUTION)
+        resolution = {}
+    else:
+        resolution = _apply_defaults('defaultResolution', resolution, defaults)
+
+    renderer = render_globals.get('currentRenderer') or 'unknown'
+
+    # 渲染设备：只有 Arnold / Redshift / V-Ray 有设备选项
+    render_device = None
+    device_attribute = _RENDER_DEVICE_ATTRIBUTES.get(renderer.lower())
+    if device_attribute:
+        node_name, attribute, devices = device_attribute
+        options = _read_node_attributes(document, node_name)
+        if options is None or attribute not in options:
+            missing.append(FIELD_RENDER_DEVICE)
+        else:
+            render_device = devices.get(options[attribute])
+
+    # 引用文件中的相机不在当前文件中
+    if document.scan_records().get(KIND_REFERENCE):
+        missing.append(FIELD_RENDER_CAMERAS)
+        render_cameras = []
+    else:
+        render_cameras = _read_render_cameras(document)
+
+    image_file_prefix = render_globals.get('imageFilePrefix', '') or ''
+    scene_data = {
+        'renderer': renderer,
+        'plugins': [
+            {'name': plugin, 'version': version}
+            for plugin, version in document.requires.items() if plugin != 'maya'
+        ],
+        'render_settings': {
+            'defaultRenderGlobals': {
+                attribute: render_globals[attribute]
+                for attribute in ('imageFilePrefix', 'startFrame', 'endFrame', 'byFrameStep', 'animation',
+                                  'imageFormat')
+                if attribute in render_globals
+            },
+            'defaultResolution': {
+                attribute: resolution[attribute] for attribute in ('width', 'height') if attribute in resolution
+            },
+            'render_cameras': render_cameras,
+            'render_device': render_device,
+        },
+        'render_path': {
+            'imageFilePrefix': image_file_prefix,
+            'is_absolute': _is_absolute_prefix(image_file_prefix),
+            'outFormatControl': render_globals.get('outFormatControl', 0),
+            'workspace_images': '',
+        },
+        # 文件中没有写出、按Maya默认值处理的属性（节点名 -> 属性名列表）
+        'defaults': defaults,
+    }
+
+    if defaults:
+        logger.print_with_time("  快速模式使用Maya默认值: " + ', '.join(
+            f"{node_name}.{attribute}" for node_name, attributes in defaults.items() for attribute in attributes))
+    if missing:
+        logger.print_with_time(f"  快速模式缺少渲染参数: {', '.join(missing)}")
+    return scene_data, missing
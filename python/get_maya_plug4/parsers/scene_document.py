@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MA场景文档模块
+一次读取MA文件，同时完成路径扫描、语句/节点索引和文件hash计算，
+处理流程中的各个步骤都从同一个 SceneDocument 查询，不再各自重新读取和扫描场景文件；
+超大场景按 createNode 语句切分成多个分片，在多个进程中并行扫描。
+MB文件由 parsers.mb_reader 直接读取，查询接口与MA文件相同
+"""
+
+import os
+import mmap
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from parsers.ma_scanner import (
+    ScanRecord,
+    KIND_NODE,
+    KIND_REFERENCE,
+    KIND_GENERAL,
+    KIND_REQUIRES,
+    KIND_FILE_INFO,
+    NO_NODE_CONTEXT,
+    context_after,
+    scan_ma_bytes,
+    group_records_by_kind
+)
+from parsers.ma_tokenizer import (
+    DEFAULT_BUFFER_SIZE,
+    MaStatement,
+    iter_ma_spans,
+    iter_ma_stream_blocks,
+    iter_ma_stream_statements
+)
+from parsers.mb_reader import scan_mb_stream
+# 导入全局logger
+from core.logger import logger
+
+
+# 超过该大小（字节）的场景才并行扫描，小场景不值得付出进程启动的开销
+PARALLEL_SIZE_THRESHOLD = 128 * 1024 * 1024
+
+# 默认不并行扫描（需要显式指定进程数，如 cli.py package --scan-workers；
+# 并行扫描的效果与CPU核数和磁盘有关，见 benchmarks/bench_scene_load.py --modes parallel）
+DEFAULT_SCAN_WORKERS = 1
+
+# 每个分片的最小大小（字节）
+_MIN_SHARD_SIZE = 16 * 1024 * 1024
+
+# 分片边界：行首的 createNode 一定是新语句的开始（Maya写出的字符串字面量不包含未转义的换行），
+# 也是新节点块的开始，因此各分片都可以从“不在任何节点中”的上下文开始扫描
+_SHARD_BOUNDARY = b'\ncreateNode '
+
+
+# 释放已扫描的映射页面（Python 3.8+ 且系统支持 madvise 时可用）
+_MADV_DONTNEED = getattr(mmap, 'MADV_DONTNEED', None) if hasattr(mmap.mmap, 'madvise') else None
+
+# 节点块内的语句关键字（节点块中遇到其他语句，如文件末尾的 connectAttr，说明节点块已经结束）
+_NODE_BODY_KEYWORDS = frozenset(('setAttr', 'addAttr', 'rename', 'lockNode', 'parent'))
+
+# 不属于字符串属性的记录类型（其余类型的 attribute 都是 setAttr 的属性名）
+_NON_ATTRIBUTE_KINDS = frozenset((KIND_NODE, KIND_REFERENCE, KIND_GENERAL, KIND_REQUIRES, KIND_FILE_INFO))
+
+
+class SceneNode(NamedTuple):
+    """节点块（从 createNode / select -ne 语句到下一个节点语句之前）"""
+    node_type: str   # 节点类型（select -ne 选中的共享节点见 SHARED_NODE_TYPES，未知类型为空字符串）
+    name: str        # 节点名
+    offset: int      # 节点块在文件中的起始偏移
+    end: int         # 节点块在文件中的结束偏移
+
+
+def _scan_mapped_range(mapping: mmap.mmap, start: int, end: int, buffer_size: int,
+                       hashers: Dict[str, Any]) -> List[ScanRecord]:
+    """按语句边界分段扫描映射中的 [start, end) 区间，同时更新hash，并释放已扫描的页面"""
+    scan_records: List[ScanRecord] = []
+    context = NO_NODE_CONTEXT
+    page_size = mmap.ALLOCATIONGRANULARITY
+    released = start - start % page_size
+    with memoryview(mapping) as view:
+        for span_start, span_end in iter_ma_spans(mapping, buffer_size, start, end):
+            for hasher in hashers.values():
+                hasher.update(view[span_start:span_end])
+            span_records = scan_ma_bytes(mapping, span_start, span_end, context)
+            context = context_after(span_records, context)
+            scan_records.extend(span_records)
+            # 已扫描过的页面不再需要，及时释放，常驻内存不随场景大小增长
+            release_end = span_end - span_end % page_size
+            if _MADV_DONTNEED is not None and release_end > released:
+                mapping.madvise(_MADV_DONTNEED, released, release_end - released)
+                released = release_end
+    return scan_records
+
+
+def _scan_shard(ma_file_path: str, start: int, end: int, buffer_size: int) -> List[tuple]:
+    """
+    扫描一个分片（在子进程中执行）
+
+    按列返回记录（每个字段一列），进程间传输比逐条序列化 NamedTuple 快得多
+    """
+    with open(ma_file_path, 'rb', buffering=0) as stream:
+        with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            return list(zip(*_scan_mapped_range(mapping, start, end, buffer_size, {})))
+
+
+def _records_from_columns(columns: List[tuple]) -> List[ScanRecord]:
+    new_record = tuple.__new__
+    return [new_record(ScanRecord, fields) for fields in zip(*columns)]
+
+
+def _scan_hash_only(mapping: mmap.mmap, buffer_size: int, hashers: Dict[str, Any]) -> None:
+    """只计算hash（并行扫描时由主进程执行）"""
+    size = len(mapping)
+    with memoryview(mapping) as view:
+        for start in range(0, size, buffer_size):
+            end = min(start + buffer_size, size)
+            for hasher in hashers.values():
+                hasher.update(view[start:end])
+            if _MADV_DONTNEED is not None:
+                page_end = end - end % mmap.ALLOCATIONGRANULARITY
+                page_start = start - start % mmap.ALLOCATIONGRANULARITY
+                if page_end > page_start:
+                    mapping.madvise(_MADV_DONTNEED, page_start, page_end - page_start)
+
+
+def _find_shard_bounds(mapping: mmap.mmap, shard_count: int) -> List[int]:
+    """在大致等分的位置之后查找 createNode 语句，返回分片边界（含 0 和文件大小）"""
+    size = len(mapping)
+    bounds = [0]
+    for index in range(1, shard_count):
+        position = mapping.find(_SHARD_BOUNDARY, max(size * index // shard_count, bounds[-1]))
+        if position < 0:
+            break
+        bounds.append(position + 1)
+    bounds.append(size)
+    return bounds
+
+
+class _HashingReader:
+    """读取时顺便更新hash的二进制流包装"""
+
+    def __init__(self, stream: BinaryIO, hashers: Dict[str, Any]):
+        self._stream = stream
+        self._hashers = list(hashers.values())
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        if data:
+            for hasher in self._hashers:
+                hasher.update(data)
+            self.bytes_read += len(data)
+        return data
+
+
+class _RangeReader:
+    """只读取流中指定长度内容的包装"""
+
+    def __init__(self, stream: BinaryIO, length: int):
+        self._stream = stream
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b''
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._stream.read(size)
+        self._remaining -= len(data)
+        return data
+
+
+class _LineRewriteReader:
+    """逐行改写源文件：read() 返回改写后的内容，同时写入输出流"""
+
+    def __init__(self, source: BinaryIO, output: BinaryIO, transform: Callable[[str], str]):
+        self._source = source
+        self._output = output
+        self._transform = transform
+        self.modified = False
+
+    def read(self, size: int = -1) -> bytes:
+        lines = []
+        total = 0
+        while size < 0 or total < size:
+            line = self._source.readline()
+            if not line:
+                break
+            text = line.decode('utf-8', errors='ignore')
+            new_text = self._transform(text)
+            # 未修改的行原样写出（不经过解码/编码，保证字节不变）
+            if new_text != text:
+                line = new_text.encode('utf-8')
+                self.modified = True
+            lines.append(line)
+            total += len(line)
+        data = b''.join(lines)
+        if data:
+            self._output.write(data)
+        return data
+
+
+class SceneDocument:
+    """
+    MA场景文档
+
+    第一次查询时读取整个文件（流式分块，见 parsers.ma_tokenizer），扫描记录（见 parsers.ma_scanner）
+    同时就是语句索引：路径、节点块、字符串属性、requires、fileInfo 都从中查询；
+    .mb 文件按IFF数据块读取（见 parsers.mb_reader），不支持 rewrite_lines；
+    read_count 记录文件实际被读取的次数
+    """
+
+    def __init__(self, ma_file_path: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 hash_factories: Optional[Dict[str, Callable[[], Any]]] = None,
+                 use_mmap: bool = False, workers: int = DEFAULT_SCAN_WORKERS,
+                 parallel_threshold: int = PARALLEL_SIZE_THRESHOLD):
+        """
+        Args:
+            ma_file_path: MA文件路径（.mb 文件按MB格式读取）
+            buffer_size: 读取缓冲区大小（字节）
+            hash_factories: 读取时需要同时计算的hash（名称 -> hash对象构造函数，如 hashlib.md5）
+            use_mmap: 使用内存映射直接扫描字节内容（不复制、不整体解码，只解码匹配到的路径）
+            workers: 并行扫描的进程数（1 表示不并行）
+            parallel_threshold: 文件超过该大小（字节）才并行扫描
+        """
+        self.path = ma_file_path
+        self.is_binary = ma_file_path.lower().endswith('.mb')
+        self.buffer_size = buffer_size
+        self.use_mmap = use_mmap
+        self.workers = max(1, workers)
+        self.parallel_threshold = parallel_threshold
+        self.read_count = 0
+        self._hash_factories = dict(hash_factories or {})
+        self._loaded = False
+        self._size = 0
+        self._records: Dict[str, List[ScanRecord]] = {}
+        self._string_attributes: Optional[Dict[str, List[ScanRecord]]] = None
+        self._nodes: Optional[List[SceneNode]] = None
+        self._hashers: Dict[str, Any] = {}
+
+    def _index_stream(self, stream: BinaryIO) -> None:
+        """从流中读取并建立索引"""
+        hashers = {name: factory() for name, factory in self._hash_factories.items()}
+        reader = _HashingReader(stream, hashers)
+
+        scan_records: List[ScanRecord] = []
+        context = NO_NODE_CONTEXT
+        # 直接扫描字节块（只解码匹配到的路径），偏移与 mmap 模式相同，都是字节偏移
+        for block_offset, block in iter_ma_stream_blocks(reader, self.buffer_size):
+            block_records = scan_ma_bytes(block, context=context, base_offset=block_offset)
+            context = context_after(block_records, context)
+            scan_records.extend(block_records)
+
+        self._set_index(scan_records, reader.bytes_read, hashers)
+
+    def _index_binary(self, stream: BinaryIO) -> None:
+        """从MB文件流中读取并建立索引（节点块偏移为 CREA 数据块的偏移）"""
+        hashers = {name: factory() for name, factory in self._hash_factories.items()}
+        reader = _HashingReader(stream, hashers)
+        scan_records = scan_mb_stream(reader, self.buffer_size)
+        self._set_index(scan_records, reader.bytes_read, hashers)
+
+    def _set_index(self, scan_records: List[ScanRecord], size: int, hashers: Dict[str, Any]) -> None:
+        """读取全部成功后替换当前索引"""
+        self._size = size
+        self._records = group_records_by_kind(scan_records)
+        self._string_attributes = None
+        self._nodes = None
+        self._hashers = hashers
+        self._loaded = True
+        self.read_count += 1
+
+    def _index_mapping(self, stream: BinaryIO) -> bool:
+        """
+        通过内存映射建立索引
+
+        Returns:
+            是否成功（空文件等无法映射的情况返回False，由调用方改用流式读取）
+        """
+        try:
+            mapping = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return False
+
+        hashers = {name: factory() for name, factory in self._hash_factories.items()}
+        try:
+            scan_records = _scan_mapped_range(mapping, 0, len(mapping), self.buffer_size, hashers)
+            size = len(mapping)
+        finally:
+            mapping.close()
+
+        self._set_index(scan_records, size, hashers)
+        return True
+
+    def _index_parallel(self, stream: BinaryIO) -> bool:
+        """
+        多进程并行建立索引：按 createNode 语句切分成多个分片，各进程扫描后按偏移顺序合并，
+        主进程同时计算hash。合并结果与串行的字节扫描（use_mmap）完全一致
+
+        Returns:
+            是否成功（文件太小、只能切出一个分片或进程池不可用时返回False，由调用方改用串行扫描）
+        """
+        if self.workers <= 1:
+            return False
+        try:
+            size = os.fstat(stream.fileno()).st_size
+        except OSError:
+            return False
+        if size < self.parallel_threshold:
+            return False
+
+        try:
+            mapping = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return False
+
+        hashers = {name: factory() for name, factory in self._hash_factories.items()}
+        try:
+            shard_count = min(self.workers, max(1, size // _MIN_SHARD_SIZE))
+            bounds = _find_shard_bounds(mapping, shard_count)
+            if len(bounds) <= 2:
+                return False
+
+            shards = list(zip(bounds[:-1], bounds[1:]))
+            try:
+                with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+                    futures = [
+                        executor.submit(_scan_shard, self.path, start, end, self.buffer_size)
+                        for start, end in shards
+                    ]
+                    # 子进程扫描期间，主进程计算整个文件的hash
+                    if hashers:
+                        _scan_hash_only(mapping, self.buffer_size, hashers)
+                    scan_records: List[ScanRecord] = []
+                    for future in futures:
+                        scan_records.extend(_records_from_columns(future.result()))
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"并行扫描MA文件失败，改用串行扫描: {e}")
+                return False
+        finally:
+            mapping.close()
+
+        self._set_index(scan_records, size, hashers)
+        return True
+
+    def load(self) -> 'SceneDocument':
+        """读取并索引场景文件（已读取过则直接返回）"""
+        if not self._loaded:
+            with open(self.path, 'rb', buffering=0) as stream:
+                if self.is_binary:
+                    self._index_binary(stream)
+                elif not (self._index_parallel(stream) or (self.use_mmap and self._index_mapping(stream))):
+                    self._index_stream(stream)
+        return self
+
+    def rewrite_lines(self, transform: Callable[[str], str]) -> bool:
+        """
+        逐行改写场景文件，并在同一遍读取中重新索引改写后的内容
+
+        Args:
+            transform: 行改写函数（输入包含行尾换行符的原始行，返回新行，应保留原来的换行符；返回原行表示不修改）
+
+        Returns:
+            是否有行被修改（未修改时原文件保持不变）
+        """
+        if self.is_binary:
+            raise ValueError(f"MB文件不支持逐行改写: {self.path}")
+        scene_dir = os.path.dirname(os.path.abspath(self.path))
+        temp_fd, temp_path = tempfile.mkstemp(suffix='.ma', dir=scene_dir)
+        try:
+            with open(self.path, 'rb') as source, os.fdopen(temp_fd, 'wb') as output:
+                rewriter = _LineRewriteReader(source, output, transform)
+                self._index_stream(rewriter)
+
+            if not rewriter.modified:
+                return False
+
+            # 用修改后的内容替换原文件（保留原文件权限）
+            shutil.copymode(self.path, temp_path)
+            os.replace(temp_path, self.path)
+            temp_path = None
+            return True
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+
+    @property
+    def size(self) -> int:
+        """文件大小（字节）"""
+        return self.load()._size
+
+    def scan_records(self) -> Dict[str, List[ScanRecord]]:
+        """按类型分组的路径扫描记录（见 parsers.ma_scanner）"""
+        return self.load()._records
+
+    def string_values(self, *attributes: str) -> List[str]:
+        """
+        字符串属性的值（按出现顺序）
+
+        Args:
+            attributes: 属性名（短名/长名均可，如 'ifp', 'imageFilePrefix'）
+        """
+        self.load()
+        if self._string_attributes is None:
+            string_attributes: Dict[str, List[ScanRecord]] = {}
+            for kind, records in self._records.items():
+                if kind in _NON_ATTRIBUTE_KINDS:
+                    continue
+                for record in records:
+                    string_attributes.setdefault(record.attribute, []).append(record)
+            self._string_attributes = string_attributes
+
+        records: List[ScanRecord] = []
+        for attribute in attributes:
+            records.extend(self._string_attributes.get(attribute, []))
+        records.sort(key=lambda record: record.offset)
+        return [record.value for record in records]
+
+    def nodes(self, node_type: Optional[str] = None) -> List[SceneNode]:
+        """节点块列表（按出现顺序），可按节点类型过滤"""
+        self.load()
+        if self._nodes is None:
+            heads = self._records.get(KIND_NODE, [])
+            nodes = []
+            for index, record in enumerate(heads):
+                end = heads[index + 1].offset if index + 1 < len(heads) else self._size
+                nodes.append(SceneNode(record.attribute, record.value, record.offset, end))
+            self._nodes = nodes
+        if node_type is None:
+            return list(self._nodes)
+        return [node for node in self._nodes if node.node_type == node_type]
+
+    def node_statements(self, node: SceneNode) -> Iterator[MaStatement]:
+        """
+        节点块中的语句（createNode / select 语句本身及其后的 setAttr、addAttr 等）
+
+        只读取该节点块所在的区间（不计入 read_count），遇到不属于节点块的语句时停止读取
+
+        Args:
+            node: nodes() 返回的节点块（只支持MA文件）
+        """
+        if self.is_binary:
+            raise ValueError(f"MB文件不支持按语句读取: {self.path}")
+        with open(self.path, 'rb', buffering=0) as stream:
+            stream.seek(node.offset)
+            reader = _RangeReader(stream, node.end - node.offset)
+            for statement in iter_ma_stream_statements(reader, self.buffer_size, base_offset=node.offset):
+                if statement.offset > node.offset and statement.keyword not in _NODE_BODY_KEYWORDS:
+                    return
+                yield statement
+
+    @property
+    def requires(self) -> Dict[str, str]:
+        """requires 语句（插件名 -> 版本，同一插件以第一条为准）"""
+        requires: Dict[str, str] = {}
+        for record in self.load()._records.get(KIND_REQUIRES, []):
+            requires.setdefault(record.attribute, record.value)
+        return requires
+
+    @property
+    def file_info(self) -> Dict[str, str]:
+        """fileInfo 语句（键 -> 值）"""
+        return {record.attribute: record.value for record in self.load()._records.get(KIND_FILE_INFO, [])}
+
+    def hash_object(self, name: str) -> Any:
+        """读取时同时计算的hash对象（名称与 hash_factories 中的一致）"""
+        return self.load()._hashers[name]
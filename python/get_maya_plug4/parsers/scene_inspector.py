@@ -15,6 +15,8 @@ from typing import Dict, Any, Optional, Tuple
 
 # 导入路径标准化函数
 from utils.path_utils import normalize_path_separators
+from parsers.ma_tokenizer import iter_ma_chunks
+from parsers.scene_document import SceneDocument
 # 导入全局logger
 from core.logger import logger
 
@@ -382,25 +384,8 @@ try:
                         color_mgmt["ocio_config"] = config_file
                         
                         # 将OCIO配置文件添加到external_files中
+                        # （配置目录中的LUT等文件由 expand_external_files 通过目录遍历缓存收集，这里不再遍历目录）
                         result["external_files"].setdefault("color_management", []).append(config_file)
-                        
-                        # 收集OCIO配置目录中的所有相关文件（LUT等）
-                        try:
-                            config_dir = os.path.dirname(config_file)
-                            if os.path.exists(config_dir):
-                                # 收集OCIO配置目录及其子目录中的所有LUT和配置文件
-                                ocio_extensions = {'.lut', '.spi1d', '.spi3d', '.cube', '.3dl', 
-                                                  '.csp', '.ctf', '.clf', '.cc', '.ccc', '.cdl',
-                                                  '.mga', '.m3d', '.ocio', '.xml', '.yaml'}
-                                
-                                for root, dirs, files in os.walk(config_dir):
-                                    for file in files:
-                                        file_lower = file.lower()
-                                        if any(file_lower.endswith(ext) for ext in ocio_extensions):
-                                            file_path = os.path.join(root, file).replace("\\\\", "/")
-                                            result["external_files"]["color_management"].append(file_path)
-                        except Exception as e:
-                            pass
                 except:
                     pass
         except:
@@ -1044,12 +1029,14 @@ file -save -force -preserveReferences;
         return False
 
 
-def get_ma_render_path_from_file(ma_file_path: str) -> Tuple[Optional[str], bool]:
+def get_ma_render_path_from_file(ma_file_path: str,
+                                 document: Optional[SceneDocument] = None) -> Tuple[Optional[str], bool]:
     """
     直接从MA文件中读取渲染保存路径
     
     Args:
         ma_file_path: MA文件路径
+        document: 已打开的场景文档（提供时直接查询其索引，不再读取文件）
         
     Returns:
         (image_file_prefix, is_absolute) 元组
@@ -1063,32 +1050,34 @@ def get_ma_render_path_from_file(ma_file_path: str) -> Tuple[Optional[str], bool
         return None, False
     
     try:
-        with open(ma_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        
-        # 匹配 imageFilePrefix 设置行
+        # 匹配 imageFilePrefix 设置行（只取第一处）
         # MA文件格式示例:
         # setAttr ".ifp" -type "string" "C:/path/to/render";
         # setAttr ".imageFilePrefix" -type "string" "C:/path/to/render";
-        patterns = [
-            r'setAttr\s+"\.(?:ifp|imageFilePrefix)"\s+-type\s+"string"\s+"([^"]+)"',
-            r'setAttr\s+"\.(?:ifp|imageFilePrefix)"\s+-type\s+"string"\s+"([^"]+)"\s*;',
-        ]
+        image_file_prefix = None
+        if document is not None:
+            values = document.string_values('ifp', 'imageFilePrefix')
+            if values:
+                image_file_prefix = values[0].strip()
+        else:
+            # 分块流式读取，找到第一处即停止
+            pattern = re.compile(r'setAttr\s+"\.(?:ifp|imageFilePrefix)"\s+-type\s+"string"\s+"([^"]+)"')
+            for _, block_text in iter_ma_chunks(ma_file_path):
+                match = pattern.search(block_text)
+                if match:
+                    image_file_prefix = match.group(1).strip()
+                    break
         
-        for pattern in patterns:
-            match = re.search(pattern, content)
-            if match:
-                image_file_prefix = match.group(1).strip()
-                if image_file_prefix:
-                    # 判断是否是绝对路径
-                    # Windows绝对路径: C:/ 或 C:\ 开头
-                    # Unix绝对路径: / 开头
-                    normalized_path = normalize_path_separators(image_file_prefix)
-                    is_absolute = (
-                        (len(normalized_path) >= 2 and normalized_path[1] == ':' and normalized_path[0].isalpha()) or  # Windows: C:/
-                        normalized_path.startswith('/')  # Unix: /
-                    )
-                    return image_file_prefix, is_absolute
+        if image_file_prefix:
+            # 判断是否是绝对路径
+            # Windows绝对路径: C:/ 或 C:\ 开头
+            # Unix绝对路径: / 开头
+            normalized_path = normalize_path_separators(image_file_prefix)
+            is_absolute = (
+                (len(normalized_path) >= 2 and normalized_path[1] == ':' and normalized_path[0].isalpha()) or  # Windows: C:/
+                normalized_path.startswith('/')  # Unix: /
+            )
+            return image_file_prefix, is_absolute
         
         return None, False
     except Exception as e:
@@ -1096,7 +1085,58 @@ def get_ma_render_path_from_file(ma_file_path: str) -> Tuple[Optional[str], bool
         return None, False
 
 
-def fix_ma_render_path(scene_path: str, mayapy_path: str, is_absolute: bool, image_file_prefix: str) -> bool:
+def _fix_render_path_line(line: str, new_prefix: str) -> str:
+    """
+    改写单行：imageFilePrefix 替换为 new_prefix，outFormatControl 设为0；其他行原样返回
+
+    只替换匹配到的值，行首缩进和行尾换行符（\n 或 \r\n）保持不变
+    """
+    # 匹配 imageFilePrefix 设置行
+    # MA文件格式示例:
+    # setAttr ".ifp" -type "string" "C:/path/to/render";
+    # setAttr ".imageFilePrefix" -type "string" "C:/path/to/render";
+    # setAttr ".ifp" -type "string" "C:/path/to/render" ;
+    if '.ifp' in line or '.imageFilePrefix' in line:
+        # 匹配多种可能的格式
+        # 匹配格式: setAttr ".ifp" -type "string" "原路径值";
+        patterns = [
+            r'(setAttr\s+"\.(?:ifp|imageFilePrefix)"\s+-type\s+"string"\s+")[^"]*(";)',
+            r'(setAttr\s+"\.(?:ifp|imageFilePrefix)"\s+-type\s+"string"\s+")[^"]*("\s*;)',
+            r'(setAttr\s+"\.(?:ifp|imageFilePrefix)"\s+-type\s+"string"\s+")[^"]*(")',
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, line)
+            if match:
+                # 替换为新路径
+                new_line = line[:match.start()] + match.group(1) + new_prefix + match.group(2) + line[match.end():]
+                logger.print_with_time(f"修改行: {line.rstrip()}")
+                logger.print_with_time(f"   -> {new_line.rstrip()}")
+                return new_line
+    
+    # 匹配 outFormatControl 设置行（确保设为0）
+    elif '.ofc' in line or '.outFormatControl' in line:
+        # 确保 outFormatControl 为 0
+        # 格式: setAttr ".ofc" -type "long" 1;
+        patterns = [
+            r'(setAttr\s+"\.(?:ofc|outFormatControl)"\s+-type\s+"long"\s+)\d+(\s*;)',
+            r'(setAttr\s+"\.(?:ofc|outFormatControl)"\s+-type\s+"long"\s+)\d+(\s*$)',  # 行尾可能没有分号
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, line)
+            if match:
+                new_line = line[:match.start()] + match.group(1) + '0' + match.group(2) + line[match.end():]
+                if new_line != line:
+                    logger.print_with_time(f"修改 outFormatControl: {line.rstrip()}")
+                    return new_line
+    
+    # 保持其他所有行不变（包括贴图路径、引用等所有其他信息）
+    return line
+
+
+def fix_ma_render_path(scene_path: str, mayapy_path: str, is_absolute: bool, image_file_prefix: str,
+                       document: Optional[SceneDocument] = None) -> bool:
     """修改MA文件中的绝对路径为相对路径（通过直接文本编辑，不通过Maya API保存）
     
     使用文本解析方式直接修改MA文件，避免通过Maya API保存导致的信息丢失。
@@ -1107,6 +1147,7 @@ def fix_ma_render_path(scene_path: str, mayapy_path: str, is_absolute: bool, ima
         mayapy_path: mayapy路径（未使用，保留以兼容接口）
         is_absolute: 是否为绝对路径
         image_file_prefix: 当前的imageFilePrefix值
+        document: 场景文档（改写的同时重新索引，之后的步骤可以直接使用；为None时临时创建）
         
     Returns:
         是否修改成功
@@ -1136,87 +1177,17 @@ def fix_ma_render_path(scene_path: str, mayapy_path: str, is_absolute: bool, ima
         # 如果无法确定相对路径，使用默认前缀
         new_prefix = "<Scene>/<RenderLayer>"
     
+    if document is None:
+        document = SceneDocument(scene_path)
+    
     try:
-        # 读取MA文件内容
-        with open(scene_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-        
-        # 查找并替换渲染路径相关的行
-        modified = False
-        new_lines = []
-        
-        for line in lines:
-            # 匹配 imageFilePrefix 设置行
-            # MA文件格式示例:
-            # setAttr ".ifp" -type "string" "C:/path/to/render";
-            # setAttr ".imageFilePrefix" -type "string" "C:/path/to/render";
-            # setAttr ".ifp" -type "string" "C:/path/to/render" ;
-            if '.ifp' in line or '.imageFilePrefix' in line:
-                # 匹配多种可能的格式
-                # 匹配格式: setAttr ".ifp" -type "string" "原路径值";
-                patterns = [
-                    r'(setAttr\s+"\.(?:ifp|imageFilePrefix)"\s+-type\s+"string"\s+")[^"]*(";)',
-                    r'(setAttr\s+"\.(?:ifp|imageFilePrefix)"\s+-type\s+"string"\s+")[^"]*("\s*;)',
-                    r'(setAttr\s+"\.(?:ifp|imageFilePrefix)"\s+-type\s+"string"\s+")[^"]*(")',
-                ]
-                
-                matched = False
-                for pattern in patterns:
-                    match = re.search(pattern, line)
-                    if match:
-                        # 替换为新路径
-                        new_line = match.group(1) + new_prefix + match.group(2)
-                        if not new_line.endswith('\n'):
-                            new_line += '\n'
-                        new_lines.append(new_line)
-                        modified = True
-                        logger.print_with_time(f"修改行: {line.rstrip()}")
-                        logger.print_with_time(f"   -> {new_line.rstrip()}")
-                        matched = True
-                        break
-                
-                if not matched:
-                    new_lines.append(line)
-            
-            # 匹配 outFormatControl 设置行（确保设为0）
-            elif '.ofc' in line or '.outFormatControl' in line:
-                # 确保 outFormatControl 为 0
-                # 格式: setAttr ".ofc" -type "long" 1;
-                patterns = [
-                    r'(setAttr\s+"\.(?:ofc|outFormatControl)"\s+-type\s+"long"\s+)\d+(\s*;)',
-                    r'(setAttr\s+"\.(?:ofc|outFormatControl)"\s+-type\s+"long"\s+)\d+(\s*$)',  # 行尾可能没有分号
-                ]
-                
-                matched = False
-                for pattern in patterns:
-                    match = re.search(pattern, line)
-                    if match:
-                        new_line = match.group(1) + '0'
-                        if len(match.groups()) > 1:
-                            new_line += match.group(2)
-                        if not new_line.endswith('\n'):
-                            new_line += '\n'
-                        if new_line != line:
-                            new_lines.append(new_line)
-                            modified = True
-                            logger.print_with_time(f"修改 outFormatControl: {line.rstrip()}")
-                            matched = True
-                            break
-                
-                if not matched:
-                    new_lines.append(line)
-            else:
-                # 保持其他所有行不变（包括贴图路径、引用等所有其他信息）
-                new_lines.append(line)
+        # 逐行改写到同目录下的临时文件（不把整个文件读入内存），改写后的内容同时重新索引
+        modified = document.rewrite_lines(lambda line: _fix_render_path_line(line, new_prefix))
         
         if not modified:
             logger.print_with_time("警告: 未找到需要修改的行，可能文件格式不同")
             return False
         
-        # 写入修改后的内容
-        with open(scene_path, 'w', encoding='utf-8', errors='ignore') as f:
-            f.writelines(new_lines)
-        
         logger.print_with_time(f"路径已修改为: {new_prefix}")
         logger.print_with_time("MA文件已更新（文本编辑模式，其他内容保持不变）")
         return True
@@ -1226,4 +1197,3 @@ def fix_ma_render_path(scene_path: str, mayapy_path: str, is_absolute: bool, ima
         traceback.print_exc()
         
         return False
-
@@ -2,77 +2,177 @@
 # -*- coding: utf-8 -*-
 """
 XGen 文件解析器
-用于解析 .xgen 文件（文本格式），提取实际使用的文件列表
+用于解析 .xgen 文件（文本格式），提取实际使用的文件列表。
+同一个 .xgen 文件在一次处理中会被多处使用（依赖收集、绝对路径提取），
+解析结果按 (路径, 大小, 修改时间) 缓存，每个文件只逐行读取一次
 """
 
 import os
+import platform
 import re
-from typing import List, Set, Dict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 # 导入路径标准化函数
-from utils.path_utils import normalize_path_separators
+from utils.path_utils import normalize_path_separators, canonical_path
+from utils.bounded_cache import BoundedCache
+from utils.stat_cache import get_stat_cache
+from utils.walk_cache import cached_walk, get_walk_cache
+from utils.relocation import get_relocator
 # 导入全局logger
 from core.logger import logger
 
 
-def parse_xgen_file(xgen_file_path: str, xgen_data_root: str) -> List[str]:
+# 文件内容中的绝对路径（Windows: 盘符开头；Linux: / 开头）
+if platform.system() == 'Windows':
+    _ABSOLUTE_PATH_PATTERN = re.compile(r'([A-Za-z]:[/\\][^\s"\'<>|]+)')
+else:
+    _ABSOLUTE_PATH_PATTERN = re.compile(r'(/[^\s"\'<>|]+)')
+
+# map('...') 或 map("...")
+_MAP_REFERENCE_PATTERN = re.compile(r"map\(['\"]([^'\"]+)['\"]\)")
+
+# 键值对的分隔（制表符或多个空格）
+_KEY_VALUE_SEPARATOR = re.compile(r'\t+|\s{2,}')
+
+# 目录收集的文件类型
+_DIRECTORY_EXTENSIONS = (
+    '.png', '.jpg', '.jpeg', '.exr', '.tif', '.tiff', '.iff', '.tga',  # 贴图
+    '.abc',                                                              # Alembic
+    '.xgc', '.xgd',                                                      # XGen 配置
+    '.mel', '.py'                                                        # 脚本
+)
+
+# 按引用收集时 map() 引用的目录中收集的文件（ptex 和绘制贴图）
+_MAP_FILE_EXTENSIONS = ('.ptx', '.ptex', '.png', '.jpg', '.jpeg', '.exr', '.tif', '.tiff', '.iff', '.tga')
+
+# 按引用收集时仍从数据目录收集的文件（配置和脚本，体积小且无法从 .xgen 中确定是否用到）
+_SUPPORT_EXTENSIONS = ('.xgc', '.xgd', '.mel', '.py')
+
+
+class XGenPalette(NamedTuple):
+    """.xgen 文件的解析结果（路径保持文件中的原样，未解析变量和检查存在性）"""
+    project_path: str                  # xgProjectPath
+    data_paths: Tuple[str, ...]        # xgDataPath
+    cache_files: Tuple[Tuple[str, str], ...]     # cacheFileName（如 ${DESC}/guides.abc）：(所在描述名, 路径)
+    map_references: Tuple[Tuple[str, str], ...]  # 表达式中 map() 引用的路径：(所在描述名, 路径)
+    map_textures: Dict[str, str]       # MapTextures：模块名_属性名 -> 贴图路径
+    absolute_paths: Tuple[str, ...]    # 文件内容中出现的所有绝对路径（按出现顺序，已去重）
+
+
+# 解析结果缓存的最大条目数（监视模式下 .xgen 每次修改都产生新的键，旧条目按最近使用顺序淘汰）
+PALETTE_CACHE_SIZE = 64
+
+# 解析结果缓存：(规范化路径, 大小, 修改时间) -> 解析结果
+_PALETTE_CACHE: BoundedCache[XGenPalette] = BoundedCache(PALETTE_CACHE_SIZE)
+
+
+def load_xgen_file(xgen_file_path: str) -> Optional[XGenPalette]:
+    """
+    解析 .xgen 文件（文件未变化时直接返回缓存的结果）
+
+    Returns:
+        XGenPalette（文件不存在或无法读取时返回None）
+    """
+    try:
+        stat_result = os.stat(xgen_file_path)
+    except OSError:
+        return None
+    cache_key = (os.path.normcase(os.path.abspath(xgen_file_path)), stat_result.st_size, stat_result.st_mtime_ns)
+    palette = _PALETTE_CACHE.get(cache_key)
+    if palette is None:
+        try:
+            with open(xgen_file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                palette = _parse_xgen_text_format(f)
+        except OSError as e:
+            logger.warning(f"读取 XGen 文件失败: {xgen_file_path}, 错误: {e}")
+            return None
+        _PALETTE_CACHE.put(cache_key, palette)
+    return palette
+
+
+def parse_xgen_file(xgen_file_path: str, xgen_data_root: str, targeted: bool = False,
+                    skipped: Optional[Set[str]] = None, missing: Optional[Set[str]] = None) -> List[str]:
     """
     解析 .xgen 文件，返回所有引用的文件路径
     
     XGen 文件格式：自定义文本格式（非 XML）
     
+    默认收集 xgDataPath 目录下所有贴图、Alembic、配置和脚本文件（目录中常有旧版本的绘制贴图）。
+    targeted=True 时按引用收集：map() 引用的目录只收集其中的 ptex/绘制贴图文件，
+    数据目录中只再收集配置和脚本文件；有无法解析的 map() 引用、或文件中没有任何贴图引用时，
+    无法确定用到哪些文件，回退到目录收集
+    
     Args:
         xgen_file_path: .xgen 文件路径
         xgen_data_root: XGen 数据根目录（通常是 Project/xgen）
+        targeted: 按引用收集
+        skipped: 按引用收集时，目录收集会包含但没有收集的文件（会被修改，用于统计节省的大小）
+        missing: 解析引用时检查过但不存在的候选路径（会被修改，XGen依赖缓存据此校验，见 utils.xgen_cache）
     
     Returns:
         引用的文件路径列表（绝对路径）
     """
-    if not os.path.exists(xgen_file_path):
-        return []
-    
     referenced_files: Set[str] = set()
     
     try:
-        # 读取文件内容
-        with open(xgen_file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        
-        # 解析 XGen 文件（文本格式）
-        xgen_data = _parse_xgen_text_format(content)
+        # 解析 XGen 文件（文本格式，按文件修改时间缓存）
+        xgen_data = load_xgen_file(xgen_file_path)
+        if xgen_data is None:
+            return []
         
         # 获取路径变量
-        project_path = xgen_data.get('xgProjectPath', '')
+        project_path = xgen_data.project_path
+        fallback_dir = os.path.dirname(xgen_file_path)
         
         # 1. 提取 MapTextures 中的所有贴图（最直接的引用）
-        map_textures = xgen_data.get('MapTextures', {})
-        for texture_path in map_textures.values():
-            absolute_path = _resolve_xgen_path(texture_path, xgen_data_root, project_path, 
-                                          os.path.dirname(xgen_file_path))
-            if absolute_path and os.path.exists(absolute_path):
+        for texture_path in xgen_data.map_textures.values():
+            absolute_path = _resolve_xgen_path(texture_path, xgen_data_root, project_path, fallback_dir, missing)
+            if absolute_path and get_stat_cache().exists(absolute_path):
                 referenced_files.add(absolute_path)
         
         # 2. 提取 cacheFileName（如 guides.abc）
-        for cache_file in xgen_data.get('cacheFileNames', []):
-            absolute_path = _resolve_xgen_path(cache_file, xgen_data_root, project_path,
-                                          os.path.dirname(xgen_file_path))
-            if absolute_path and os.path.exists(absolute_path):
+        for description, cache_file in xgen_data.cache_files:
+            if targeted:
+                absolute_path = _resolve_description_path(cache_file, description, xgen_data_root,
+                                                          project_path, fallback_dir, missing)
+            else:
+                absolute_path = _resolve_xgen_path(cache_file, xgen_data_root, project_path, fallback_dir, missing)
+            if absolute_path and get_stat_cache().exists(absolute_path):
                 referenced_files.add(absolute_path)
         
         # 3. 从表达式中提取 map() 函数引用的路径
-        for map_reference in xgen_data.get('mapReferences', []):
-            absolute_path = _resolve_xgen_path(map_reference, xgen_data_root, project_path,
-                                          os.path.dirname(xgen_file_path))
-            if absolute_path and os.path.exists(absolute_path):
-                referenced_files.add(absolute_path)
+        # 同一路径常被多个表达式引用，只解析一次
+        if targeted:
+            fallback_reason = _collect_map_references(xgen_data, xgen_data_root, fallback_dir, referenced_files,
+                                                      missing)
+            if not fallback_reason and not xgen_data.map_references and not xgen_data.map_textures:
+                fallback_reason = "没有贴图引用"
+            if fallback_reason:
+                logger.print_with_time(f"      {os.path.basename(xgen_file_path)}: {fallback_reason}，回退到目录收集")
+                targeted = False
+        else:
+            for map_reference in dict.fromkeys(path for _, path in xgen_data.map_references):
+                absolute_path = _resolve_xgen_path(map_reference, xgen_data_root, project_path, fallback_dir,
+                                                   missing)
+                if absolute_path and get_stat_cache().exists(absolute_path):
+                    referenced_files.add(absolute_path)
         
         # 4. 收集 xgDataPath 指向的目录内容（根据实际路径）
-        for data_path in xgen_data.get('xgDataPaths', []):
-            absolute_path = _resolve_xgen_path(data_path, xgen_data_root, project_path,
-                                          os.path.dirname(xgen_file_path))
-            if absolute_path and os.path.exists(absolute_path) and os.path.isdir(absolute_path):
-                # 收集该目录下的特定文件
-                _collect_xgen_directory_files(absolute_path, referenced_files)
+        for data_path in xgen_data.data_paths:
+            absolute_path = _resolve_xgen_path(data_path, xgen_data_root, project_path, fallback_dir, missing)
+            if absolute_path and get_stat_cache().isdir(absolute_path):
+                if not targeted:
+                    # 收集该目录下的特定文件
+                    _collect_xgen_directory_files(absolute_path, referenced_files)
+                    continue
+                # 按引用收集：只收集配置和脚本，其余没有被引用的文件记为跳过
+                directory_files: Set[str] = set()
+                _collect_xgen_directory_files(absolute_path, directory_files)
+                for file_path in directory_files:
+                    if file_path.lower().endswith(_SUPPORT_EXTENSIONS):
+                        referenced_files.add(file_path)
+                    elif skipped is not None and file_path not in referenced_files:
+                        skipped.add(file_path)
         
     except Exception as e:
         logger.warning(f"解析 XGen 文件失败: {xgen_file_path}, 错误: {e}")
@@ -80,9 +180,48 @@ def parse_xgen_file(xgen_file_path: str, xgen_data_root: str) -> List[str]:
     return sorted(list(referenced_files))
 
 
-def _parse_xgen_text_format(content: str) -> Dict:
+def _resolve_description_path(path: str, description: str, xgen_data_root: str, project_path: str,
+                              fallback_dir: str, missing: Optional[Set[str]] = None) -> str:
+    """按所在描述解析路径：${DESC} 先按描述目录（xgDataPath/描述名）解析，不存在时再按数据根目录解析"""
+    if description and '${DESC}' in path and xgen_data_root:
+        description_dir = canonical_path(description, xgen_data_root)
+        description_path = canonical_path(path.strip().replace('${DESC}', description_dir))
+        if _probe(description_path, missing):
+            return description_path
+    return _resolve_xgen_path(path, xgen_data_root, project_path, fallback_dir, missing)
+
+
+def _collect_map_references(xgen_data: XGenPalette, xgen_data_root: str, fallback_dir: str,
+                            referenced_files: Set[str], missing: Optional[Set[str]] = None) -> str:
     """
-    解析 XGen 文本格式
+    按引用收集 map() 引用的文件：引用目录时收集其中的 ptex/绘制贴图（不递归），引用文件时收集该文件
+
+    Returns:
+        需要回退到目录收集的原因（全部解析成功时返回空字符串；回退时已解析到的文件仍然保留）
+    """
+    fallback_reason = ""
+    for description, map_reference in dict.fromkeys(xgen_data.map_references):
+        absolute_path = _resolve_description_path(map_reference, description, xgen_data_root,
+                                                  xgen_data.project_path, fallback_dir, missing)
+        if not absolute_path:
+            fallback_reason = fallback_reason or f"无法解析 map() 引用 {map_reference}"
+            continue
+        if not get_stat_cache().isdir(absolute_path):
+            referenced_files.add(absolute_path)
+            continue
+        listing = get_walk_cache().listing(absolute_path)
+        map_files = [name for name in (listing.files if listing is not None else ())
+                     if name.lower().endswith(_MAP_FILE_EXTENSIONS)]
+        if not map_files:
+            fallback_reason = fallback_reason or f"map() 引用的目录中没有贴图 {absolute_path}"
+            continue
+        referenced_files.update(canonical_path(name, absolute_path) for name in map_files)
+    return fallback_reason
+
+
+def _parse_xgen_text_format(lines: Iterable[str]) -> XGenPalette:
+    """
+    解析 XGen 文本格式（逐行读取一遍，同时提取所有绝对路径）
     
     XGen 文件格式示例：
         Palette
@@ -97,22 +236,31 @@ def _parse_xgen_text_format(content: str) -> Dict:
         MapTextures
             Clumping1    mask    E:/.../texture.iff
     
+    Args:
+        lines: 文件的各行（可以直接传入打开的文件对象）
+    
     Returns:
-        解析后的数据字典
+        XGenPalette
     """
-    xgen_data = {
-        'xgProjectPath': '',
-        'xgDataPaths': [],
-        'cacheFileNames': [],
-        'mapReferences': [],
-        'MapTextures': {}
-    }
-    
-    lines = content.split('\n')
+    project_path = ''
+    data_paths: List[str] = []
+    cache_files: List[Tuple[str, str]] = []
+    map_references: List[Tuple[str, str]] = []
+    map_textures: Dict[str, str] = {}
+    # 绝对路径（dict 保持出现顺序并去重）
+    absolute_paths: Dict[str, None] = {}
     in_map_textures = False
+    # 当前所在的块（不缩进的行，如 Palette、Description）和描述名（其后的模块都属于该描述）
+    block = ''
+    description = ''
     
     for line in lines:
+        for match in _ABSOLUTE_PATH_PATTERN.finditer(line):
+            absolute_paths[match.group(1)] = None
+        
         stripped_line = line.strip()
+        if stripped_line and not line[0].isspace():
+            block = stripped_line
         
         # 检查是否进入 MapTextures 部分
         if stripped_line == 'MapTextures':
@@ -129,30 +277,32 @@ def _parse_xgen_text_format(content: str) -> Dict:
             if len(line_fields) >= 3:
                 # 第三列是路径
                 texture_path = line_fields[2]
-                xgen_data['MapTextures'][f"{line_fields[0]}_{line_fields[1]}"] = texture_path
+                map_textures[f"{line_fields[0]}_{line_fields[1]}"] = texture_path
             continue
         
         # 解析键值对（用制表符或多个空格分隔）
         if '\t' in stripped_line or '  ' in stripped_line:
             # 分割键值对
-            key_value_pair = re.split(r'\t+|\s{2,}', stripped_line, maxsplit=1)
+            key_value_pair = _KEY_VALUE_SEPARATOR.split(stripped_line, maxsplit=1)
             if len(key_value_pair) == 2:
                 key, value = key_value_pair[0].strip(), key_value_pair[1].strip()
                 
                 # 收集特定的键
                 if key == 'xgProjectPath' and value:
-                    xgen_data['xgProjectPath'] = value
+                    project_path = value
                 elif key == 'xgDataPath' and value:
-                    xgen_data['xgDataPaths'].append(value)
+                    data_paths.append(value)
                 elif key == 'cacheFileName' and value:
-                    xgen_data['cacheFileNames'].append(value)
+                    cache_files.append((description, value))
+                elif key == 'name' and block == 'Description':
+                    description = value
                 
                 # 从表达式中提取 map() 函数的路径
                 if 'map(' in value:
-                    map_paths = _extract_map_references(value)
-                    xgen_data['mapReferences'].extend(map_paths)
+                    map_references.extend((description, path) for path in _extract_map_references(value))
     
-    return xgen_data
+    return XGenPalette(project_path, tuple(data_paths), tuple(cache_files), tuple(map_references),
+                       map_textures, tuple(absolute_paths))
 
 
 def _extract_map_references(expression: str) -> List[str]:
@@ -168,11 +318,7 @@ def _extract_map_references(expression: str) -> List[str]:
     """
     map_paths = []
     
-    # 匹配 map('...') 或 map("...")
-    pattern = r"map\(['\"]([^'\"]+)['\"]\)"
-    matches = re.findall(pattern, expression)
-    
-    for match in matches:
+    for match in _MAP_REFERENCE_PATTERN.findall(expression):
         # 移除末尾的 / 
         map_path = match.rstrip('/')
         if map_path:
@@ -181,8 +327,17 @@ def _extract_map_references(expression: str) -> List[str]:
     return map_paths
 
 
+def _probe(path: str, missing: Optional[Set[str]]) -> bool:
+    """检查路径是否存在，不存在时记录到 missing（为None时不记录）"""
+    if get_stat_cache().exists(path):
+        return True
+    if missing is not None:
+        missing.add(path)
+    return False
+
+
 def _resolve_xgen_path(relative_path: str, xgen_data_root: str, project_path: str, 
-                      fallback_dir: str) -> str:
+                      fallback_dir: str, missing: Optional[Set[str]] = None) -> str:
     """
     解析 XGen 相对路径为绝对路径，支持变量替换
     
@@ -195,6 +350,7 @@ def _resolve_xgen_path(relative_path: str, xgen_data_root: str, project_path: st
         xgen_data_root: XGen 数据根目录
         project_path: 项目路径（xgProjectPath）
         fallback_dir: 备用目录（通常是 .xgen 文件所在目录）
+        missing: 检查过但不存在的候选路径（会被修改）
     
     Returns:
         绝对路径，如果文件不存在则返回空字符串
@@ -221,38 +377,40 @@ def _resolve_xgen_path(relative_path: str, xgen_data_root: str, project_path: st
     
     # 如果已经是绝对路径
     if os.path.isabs(resolved_path):
+        resolved_path = canonical_path(resolved_path)
         # 检查路径是否存在（可能是其他盘符）
-        if os.path.exists(resolved_path):
+        if _probe(resolved_path, missing):
             return resolved_path
         
-        # 如果不存在，可能是路径变了，尝试从文件名匹配
-        file_name = os.path.basename(resolved_path)
-        
-        # 在 xgen_data_root 中查找
-        if xgen_data_root and os.path.exists(xgen_data_root):
-            for root_dir, dirs, files in os.walk(xgen_data_root):
-                if file_name in files:
-                    found_path = normalize_path_separators(os.path.join(root_dir, file_name))
-                    return found_path
+        # 如果不存在，可能是路径变了，按文件名在 xgen_data_root 中查找
+        # （文件名索引每次处理只建立一次；有多个同名文件时选择末尾目录相同层数最多的一个，见 utils.relocation）
+        if xgen_data_root:
+            relocator = get_relocator()
+            relocated_path = relocator.relocate(resolved_path, xgen_data_root)
+            if relocated_path is None:
+                return ""
+            # 数据目录中的贴图与 palette 一起收集
+            relocator.mark_packaged(resolved_path, in_place=True)
+            return relocated_path
         
         return ""
     
     # 尝试相对于 xgen_data_root
     if xgen_data_root:
-        absolute_path = normalize_path_separators(os.path.join(xgen_data_root, resolved_path))
-        if os.path.exists(absolute_path):
+        absolute_path = canonical_path(resolved_path, xgen_data_root)
+        if _probe(absolute_path, missing):
             return absolute_path
     
     # 尝试相对于 project_path
     if project_path:
-        absolute_path = normalize_path_separators(os.path.join(project_path, resolved_path))
-        if os.path.exists(absolute_path):
+        absolute_path = canonical_path(resolved_path, project_path)
+        if _probe(absolute_path, missing):
             return absolute_path
     
     # 尝试相对于 fallback_dir
     if fallback_dir:
-        absolute_path = normalize_path_separators(os.path.join(fallback_dir, resolved_path))
-        if os.path.exists(absolute_path):
+        absolute_path = canonical_path(resolved_path, fallback_dir)
+        if _probe(absolute_path, missing):
             return absolute_path
     
     return ""
@@ -272,24 +430,16 @@ def _collect_xgen_directory_files(directory: str, referenced_files: Set[str]):
         directory: 目录路径
         referenced_files: 引用文件集合（会被修改）
     """
-    if not os.path.exists(directory):
+    if not get_stat_cache().exists(directory):
         return
     
-    # 要收集的扩展名
-    extensions = (
-        '.png', '.jpg', '.jpeg', '.exr', '.tif', '.tiff', '.iff', '.tga',  # 贴图
-        '.abc',                                                              # Alembic
-        '.xgc', '.xgd',                                                      # XGen 配置
-        '.mel', '.py'                                                        # 脚本
-    )
-    
     try:
-        for root_dir, dirs, files in os.walk(directory):
+        for root_dir, dirs, files in cached_walk(directory):
             # 跳过一些明显的临时/备份目录
             dirs[:] = [dir_name for dir_name in dirs if dir_name.lower() not in ['backup', 'temp', 'cache', '.git']]
             
             for file_name in files:
-                if file_name.lower().endswith(extensions):
+                if file_name.lower().endswith(_DIRECTORY_EXTENSIONS):
                     file_path = normalize_path_separators(os.path.join(root_dir, file_name))
                     referenced_files.add(file_path)
     except Exception as e:
@@ -298,13 +448,43 @@ def _collect_xgen_directory_files(directory: str, referenced_files: Set[str]):
 
 
 
-def collect_xgen_dependencies(xgen_file: str, xgen_data_root: str = None) -> List[str]:
+def record_skipped_files(candidates: Iterable[str], collected) -> Tuple[int, int]:
+    """
+    把按引用收集时没有收集的文件记录到重定位器的报告中
+
+    Args:
+        candidates: 目录收集会包含的文件
+        collected: 最终收集的文件（其他途径收集到的文件不算跳过）
+
+    Returns:
+        (跳过的文件数, 跳过的字节数)
+    """
+    skipped = sorted({path for path in candidates if path not in collected})
+    if not skipped:
+        return 0, 0
+    get_stat_cache().prefetch(skipped)
+    relocator = get_relocator()
+    skipped_bytes = 0
+    for path in skipped:
+        result = get_stat_cache().stat(path)
+        size = result.st_size if result is not None else 0
+        relocator.record_skipped(path, size)
+        skipped_bytes += size
+    return len(skipped), skipped_bytes
+
+
+def collect_xgen_dependencies(xgen_file: str, xgen_data_root: str = None, targeted: bool = False,
+                              skipped: Optional[Set[str]] = None,
+                              missing: Optional[Set[str]] = None) -> List[str]:
     """
     收集 XGen 文件的所有依赖
     
     Args:
         xgen_file: .xgen 文件路径
         xgen_data_root: XGen 数据根目录，如果为 None 则自动检测
+        targeted: 按引用收集（见 parse_xgen_file）
+        skipped: 按引用收集时没有收集的目录文件（会被修改）
+        missing: 检查过但不存在的候选路径（会被修改，见 parse_xgen_file）
     
     Returns:
         依赖文件列表
@@ -320,12 +500,12 @@ def collect_xgen_dependencies(xgen_file: str, xgen_data_root: str = None) -> Lis
             project_root = os.path.dirname(xgen_file_directory)
             xgen_data_root = os.path.join(project_root, 'xgen')
     
-    if not xgen_data_root or not os.path.exists(xgen_data_root):
+    if not xgen_data_root or not get_stat_cache().exists(xgen_data_root):
         logger.warning(f"找不到 XGen 数据目录: {xgen_data_root}")
         return []
     
     # 解析文件
-    return parse_xgen_file(xgen_file, xgen_data_root)
+    return parse_xgen_file(xgen_file, xgen_data_root, targeted=targeted, skipped=skipped, missing=missing)
 
 
 
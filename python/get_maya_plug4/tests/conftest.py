@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""测试配置：与 main.py 相同，以 get_maya_plug4 目录为模块根目录导入"""
+
+import os
+import sys
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PACKAGE_ROOT not in sys.path:
+    sys.path.insert(0, PACKAGE_ROOT)
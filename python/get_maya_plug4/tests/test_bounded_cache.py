@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""utils.bounded_cache 与使用它的模块级解析缓存"""
+
+import os
+
+import parsers.reference_graph as reference_graph
+import parsers.xgen_parser as xgen_parser
+from parsers.reference_graph import resolve_reference_graph
+from utils.bounded_cache import BoundedCache
+
+
+def test_evicts_least_recently_used():
+    cache = BoundedCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_scene_cache_stays_bounded_when_scene_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(reference_graph, '_SCENE_CACHE', BoundedCache(3))
+    scene = tmp_path / 'shot.ma'
+    for revision in range(10):
+        scene.write_text(f'//Maya ASCII 2022 scene\nsetAttr ".ftn" -type "string" "/proj/tex_{revision}.png";\n',
+                         encoding='utf-8')
+        # 每次修改都是新的缓存键（监视模式中的重建）
+        os.utime(scene, ns=(revision * 10 ** 9, revision * 10 ** 9))
+        graph = resolve_reference_graph(str(scene), workers=1)
+        assert f'/proj/tex_{revision}.png' in graph.dependencies
+    assert len(reference_graph._SCENE_CACHE) == 3
+
+
+def test_palette_cache_stays_bounded_when_xgen_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(xgen_parser, '_PALETTE_CACHE', BoundedCache(3))
+    palette_file = tmp_path / 'hair_coll.xgen'
+    for revision in range(10):
+        palette_file.write_text(f'Palette\n\txgProjectPath\t\t/proj_{revision}/\n', encoding='utf-8')
+        os.utime(palette_file, ns=(revision * 10 ** 9, revision * 10 ** 9))
+        assert xgen_parser.load_xgen_file(str(palette_file)).project_path == f'/proj_{revision}/'
+    assert len(xgen_parser._PALETTE_CACHE) == 3
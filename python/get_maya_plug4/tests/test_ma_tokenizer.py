@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""parsers.ma_tokenizer：流式读取与超长语句"""
+
+from parsers.ma_scanner import KIND_FILE_TEXTURE, KIND_GENERAL, KIND_STRING, scan_ma_bytes
+from parsers.ma_tokenizer import _OVERSIZED_HEAD_SIZE, iter_ma_chunks, iter_ma_statements
+from parsers.scene_document import SceneDocument
+
+BUFFER_SIZE = 1024
+
+
+def _oversized_scene() -> str:
+    """包含多种超过缓冲区大小的语句的场景（含中文路径，记录的偏移是字节偏移）"""
+    # 字面量中的转义引号、分号不影响切分
+    string_array = ' '.join(f'"/proj/sourceimages/tex_{i};v{i}.png" "label \\"{i}\\";"' for i in range(400))
+    numbers = ' '.join(f'{i * 0.5:.3f}' for i in range(3000))
+    long_value = '/proj/notes/' + 'x' * (3 * BUFFER_SIZE) + ';tail.txt'
+    return (
+        '//Maya ASCII 2022 scene\n'
+        'requires maya "2022";\n'
+        'createNode transform -n "pathHolder";\n'
+        f'\tsetAttr -s 800 ".paths" -type "stringArray" 800 {string_array} ;\n'
+        'createNode mesh -n "meshShape";\n'
+        '// comment with "quote; and semicolon\n'
+        f'\tsetAttr -s 3000 ".vt[0:2999]" {numbers} ;\n'
+        f'\tsetAttr ".notes" -type "string" "{long_value}";\n'
+        'createNode file -n "file1";\n'
+        '\tsetAttr ".ftn" -type "string" "/proj/贴图/after.png";\n'
+    )
+
+
+def _write(tmp_path, content: str):
+    path = tmp_path / 'scene.ma'
+    path.write_bytes(content.encode('utf-8'))
+    return str(path)
+
+
+def _all_records(document: SceneDocument):
+    return sorted(record for records in document.scan_records().values() for record in records)
+
+
+def test_oversized_statements_scan_like_mmap(tmp_path):
+    content = _oversized_scene()
+    path = _write(tmp_path, content)
+
+    streamed = _all_records(SceneDocument(path, buffer_size=BUFFER_SIZE, workers=1))
+    mapped = _all_records(SceneDocument(path, buffer_size=BUFFER_SIZE, use_mmap=True, workers=1))
+
+    assert streamed == mapped
+    assert streamed == sorted(scan_ma_bytes(content.encode('utf-8')))
+
+
+def test_oversized_statement_keeps_paths_after_head(tmp_path):
+    path = _write(tmp_path, _oversized_scene())
+    records = SceneDocument(path, buffer_size=BUFFER_SIZE, workers=1).scan_records()
+
+    general = {record.value for record in records[KIND_GENERAL]}
+    # 最后一个数组元素远在开头 _OVERSIZED_HEAD_SIZE 字节之后
+    assert '/proj/sourceimages/tex_399;v399.png' in general
+    assert len([value for value in general if value.startswith('/proj/sourceimages/tex_')]) == 400
+    # 超过缓冲区的字符串属性值完整保留
+    notes = [record for record in records[KIND_STRING] if record.attribute == 'notes']
+    assert len(notes) == 1 and notes[0].value.endswith('tail.txt')
+    # 超长语句之后的节点上下文和偏移不受影响
+    texture, = records[KIND_FILE_TEXTURE]
+    assert texture.value == '/proj/贴图/after.png'
+    assert texture.node_type == 'file'
+
+
+def test_oversized_chunks_stay_bounded(tmp_path):
+    path = _write(tmp_path, _oversized_scene())
+    sizes = [len(text.encode('utf-8')) for _, text in iter_ma_chunks(path, BUFFER_SIZE)]
+    assert max(sizes) <= _OVERSIZED_HEAD_SIZE + 3 * BUFFER_SIZE + 64
+
+
+def test_statements_truncate_oversized_text(tmp_path):
+    content = _oversized_scene().encode('utf-8')
+    path = _write(tmp_path, _oversized_scene())
+    statements = list(iter_ma_statements(path, BUFFER_SIZE))
+
+    assert [statement.keyword for statement in statements] == [
+        'requires', 'createNode', 'setAttr', 'createNode', 'setAttr', 'setAttr', 'createNode', 'setAttr']
+    for statement in statements:
+        assert content.startswith(statement.text.encode('utf-8'), statement.offset)
+    oversized = [statement for statement in statements if statement.truncated]
+    assert len(oversized) == 3
+    assert all(len(statement.text) <= _OVERSIZED_HEAD_SIZE for statement in oversized)
+    assert not statements[-1].truncated
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""parsers.mb_reader：合成的 FOR4 / FOR8 IFF 数据"""
+
+import io
+import struct
+
+import pytest
+
+from parsers.ma_scanner import (
+    KIND_FILE_INFO, KIND_FILE_TEXTURE, KIND_GENERAL, KIND_NODE, KIND_REFERENCE, KIND_REQUIRES, KIND_STRING,
+    NO_NODE_CONTEXT, is_general_path
+)
+from parsers.mb_reader import MbFormatError, is_maya_binary, scan_mb_stream
+
+# 文件头标签 -> (大小字段格式, 标签后的填充, 对齐字节数)
+_FORMATS = {
+    b'FOR4': ('>I', b'', 4),
+    b'FOR8': ('>Q', b'\0' * 4, 8),
+}
+
+
+class _Builder:
+    """按指定格式拼接IFF数据块（大小字段不含填充，数据按对齐字节数补零）"""
+
+    def __init__(self, form: bytes):
+        self.form = form
+        self.size_format, self.tag_padding, self.alignment = _FORMATS[form]
+
+    def _pad(self, data: bytes) -> bytes:
+        return data + b'\0' * ((-len(data)) % self.alignment)
+
+    def chunk(self, tag: bytes, payload: bytes) -> bytes:
+        return tag + self.tag_padding + struct.pack(self.size_format, len(payload)) + self._pad(payload)
+
+    def group(self, group_type: bytes, *children: bytes) -> bytes:
+        # 分组类型字段与块头的大小字段等长（FOR8 为类型 + 4字节填充）
+        body = group_type + self.tag_padding + b''.join(children)
+        return self.form + self.tag_padding + struct.pack(self.size_format, len(body)) + self._pad(body)
+
+
+def _strings(*values: str) -> bytes:
+    return b''.join(value.encode('utf-8') + b'\0' for value in values)
+
+
+def _scene(form: bytes) -> bytes:
+    builder = _Builder(form)
+    return builder.group(
+        b'Maya',
+        builder.chunk(b'FINF', _strings('application', 'maya')),
+        builder.chunk(b'PLUG', _strings('mtoa', '5.1.0')),
+        builder.chunk(b'FREF', _strings('/proj/assets/角色.mb', 'chrRN')),
+        # file 节点：CREA（标志字节 + 节点名）、带标志字节的 STR、需要跳过的奇数长度数据块
+        builder.group(
+            b'RTFT',
+            builder.chunk(b'CREA', b'\x00' + _strings('file1')),
+            builder.chunk(b'DBL2', b'\x01\x02\x03'),
+            builder.chunk(b'STR ', _strings('.ftn') + b'\x01' + _strings('/proj/贴图/diffuse.png')),
+        ),
+        # 插件节点：类型ID不在表中，节点类型为空
+        builder.group(
+            b'\x00\x11\x22\x33',
+            builder.chunk(b'CREA', b'\x00' + _strings('plugin1', 'group1')),
+            builder.chunk(b'STR ', _strings('.notes', 'x')),
+        ),
+        # 分组之外的 STR 不属于任何节点
+        builder.chunk(b'STR ', _strings('.ifp', '<Scene>/<RenderLayer>')),
+    )
+
+
+def _without_general(records):
+    return [record for record in records if record.kind != KIND_GENERAL]
+
+
+@pytest.mark.parametrize('form', [b'FOR4', b'FOR8'])
+def test_scan_records(form):
+    data = _scene(form)
+    assert is_maya_binary(data)
+    records = scan_mb_stream(io.BytesIO(data), buffer_size=2)
+
+    assert [(record.kind, record.attribute, record.value, record.node_type)
+            for record in _without_general(records)] == [
+        (KIND_FILE_INFO, 'application', 'maya', ''),
+        (KIND_REQUIRES, 'mtoa', '5.1.0', ''),
+        (KIND_REFERENCE, '', '/proj/assets/角色.mb', ''),
+        (KIND_NODE, 'file', 'file1', 'file'),
+        (KIND_FILE_TEXTURE, 'ftn', '/proj/贴图/diffuse.png', 'file'),
+        (KIND_NODE, '', 'plugin1', ''),
+        (KIND_STRING, 'notes', 'x', ''),
+        (KIND_STRING, 'ifp', '<Scene>/<RenderLayer>', ''),
+    ]
+
+    # 偏移指向数据块的标签（填充和对齐之后的位置也正确）
+    by_value = {record.value: record for record in _without_general(records)}
+    for value, tag in (('maya', b'FINF'), ('5.1.0', b'PLUG'), ('/proj/assets/角色.mb', b'FREF'),
+                       ('file1', b'CREA'), ('/proj/贴图/diffuse.png', b'STR '), ('plugin1', b'CREA'),
+                       ('<Scene>/<RenderLayer>', b'STR ')):
+        assert data[by_value[value].offset:by_value[value].offset + 4] == tag
+
+    # 节点分组内的记录属于该节点，分组结束后回到不在任何节点中的上下文
+    assert by_value['/proj/贴图/diffuse.png'].node_offset == by_value['file1'].offset
+    assert by_value['x'].node_offset == by_value['plugin1'].offset
+    assert (by_value['<Scene>/<RenderLayer>'].node_type,
+            by_value['<Scene>/<RenderLayer>'].node_offset) == NO_NODE_CONTEXT
+
+    # 通用模式记录与MA扫描的过滤条件一致
+    general = [record.value for record in records if record.kind == KIND_GENERAL]
+    assert general == [value for value in ('/proj/assets/角色.mb', '/proj/贴图/diffuse.png') if is_general_path(value)]
+
+
+def test_for4_and_for8_match():
+    def fields(records):
+        return [(record.kind, record.attribute, record.value, record.node_type) for record in records]
+
+    assert fields(scan_mb_stream(io.BytesIO(_scene(b'FOR4')))) == fields(scan_mb_stream(io.BytesIO(_scene(b'FOR8'))))
+
+
+class _ReadOnlyStream:
+    """只支持 read(size) 的流（如 _HashingReader）"""
+
+    def __init__(self, data: bytes):
+        self._stream = io.BytesIO(data)
+
+    def read(self, size: int) -> bytes:
+        return self._stream.read(size)
+
+
+def test_stream_without_seek():
+    data = _scene(b'FOR8')
+    assert scan_mb_stream(_ReadOnlyStream(data), buffer_size=1) == scan_mb_stream(io.BytesIO(data))
+
+
+def test_not_maya_binary():
+    assert not is_maya_binary(b'//Maya ASCII 2022 scene')
+    with pytest.raises(MbFormatError):
+        scan_mb_stream(io.BytesIO(b'//Maya ASCII 2022 scene\n'))
+
+
+@pytest.mark.parametrize('form', [b'FOR4', b'FOR8'])
+def test_truncated_chunk(form):
+    data = _scene(form)
+    # 在最后一个数据块的内容中、跳过的数据块中、块头中、标签中、数据块边界上（分组不完整）截断
+    skipped = data.index(b'DBL2')
+    for end in (len(data) - 3, skipped + len(_Builder(form).chunk(b'DBL2', b'')) + 1, data.rindex(b'STR ') + 6,
+                data.rindex(b'STR ') + 2, data.index(b'PLUG')):
+        with pytest.raises(MbFormatError):
+            scan_mb_stream(io.BytesIO(data[:end]), buffer_size=2)
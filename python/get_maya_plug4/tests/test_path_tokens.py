@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""utils.path_tokens：UDIM / UV贴片 / 帧号标记的展开"""
+
+import os
+import re
+
+import pytest
+
+from utils import path_tokens
+from utils.path_tokens import compile_sequence_pattern, expand_sequence_path, has_sequence_tokens
+from utils.stat_cache import FileStatCache, set_stat_cache
+from utils.walk_cache import DirectoryWalkCache, set_walk_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    set_stat_cache(FileStatCache(workers=1))
+    set_walk_cache(DirectoryWalkCache())
+
+
+def _expand(directory, file_name):
+    return [os.path.basename(path) for path in expand_sequence_path(os.path.join(str(directory), file_name))]
+
+
+def _write(directory, *names):
+    for name in names:
+        (directory / name).write_bytes(b'x')
+
+
+@pytest.mark.parametrize('file_name, matching, other', [
+    ('body.<UDIM>.exr', ['body.1001.exr', 'body.1012.exr'], ['body.101.exr', 'body.10011.exr', 'body.1001.tif']),
+    ('body_<u>_<v>.tif', ['body_1_1.tif', 'body_12_3.tif'], ['body_1.tif', 'body_a_1.tif']),
+    ('body.<UVTILE>.exr', ['body.u1_v1.exr', 'body.u10_v2.exr'], ['body.1001.exr', 'body.u1v1.exr']),
+    ('body<tile>.exr', ['body_u1_v1.exr'], ['body.u1_v1.exr', 'body_u1.exr']),
+    ('fluid.<f>.vdb', ['fluid.1.vdb', 'fluid.0100.vdb'], ['fluid..vdb', 'fluid.a.vdb']),
+    ('fluid.<frame>.vdb', ['fluid.7.vdb'], ['fluid.x7.vdb']),
+    ('fluid.<f4>.vdb', ['fluid.0001.vdb', 'fluid.12345.vdb'], ['fluid.001.vdb', 'fluid.1.vdb']),
+    ('fluid.####.vdb', ['fluid.0001.vdb', 'fluid.12345.vdb'], ['fluid.001.vdb', 'fluid.1.vdb']),
+    ('fluid.%04d.vdb', ['fluid.0001.vdb', 'fluid.1001.vdb'], ['fluid.001.vdb', 'fluid.1.vdb']),
+    ('fluid.%d.vdb', ['fluid.1.vdb', 'fluid.0001.vdb'], ['fluid.vdb']),
+])
+def test_each_token(tmp_path, file_name, matching, other):
+    _write(tmp_path, *matching, *other)
+    assert has_sequence_tokens(file_name)
+    assert _expand(tmp_path, file_name) == sorted(matching)
+
+
+@pytest.mark.parametrize('file_name, width', [
+    ('fluid.#.vdb', 1), ('fluid.##.vdb', 2), ('fluid.<f2>.vdb', 2), ('fluid.%02d.vdb', 2),
+])
+def test_padding_width(file_name, width):
+    pattern = compile_sequence_pattern(file_name)
+    assert bool(pattern.fullmatch('fluid.5.vdb')) == (width == 1)
+    assert pattern.fullmatch('fluid.05.vdb')
+    # 帧号位数超过补零位数时不截断
+    assert pattern.fullmatch('fluid.12345.vdb')
+
+
+@pytest.mark.parametrize('file_name', ['fluid.####.vdb', 'fluid.<f4>.vdb', 'fluid.%04d.vdb'])
+def test_negative_frames(file_name):
+    pattern = compile_sequence_pattern(file_name)
+    # 与 printf('%04d', -5) 相同，负号计入位数；也接受负号之外补满位数的写法
+    assert pattern.fullmatch('fluid.-005.vdb')
+    assert pattern.fullmatch('fluid.-0005.vdb')
+    assert not pattern.fullmatch('fluid.-05.vdb')
+    assert compile_sequence_pattern('fluid.<f>.vdb').fullmatch('fluid.-5.vdb')
+
+
+def test_space_padded_printf_frames(tmp_path):
+    # %4d 在前面补空格（不是补零）
+    _write(tmp_path, 'fluid.   5.vdb', 'fluid.1001.vdb', 'fluid.0005.vdb')
+    assert _expand(tmp_path, 'fluid.%4d.vdb') == ['fluid.   5.vdb', 'fluid.0005.vdb', 'fluid.1001.vdb']
+    assert _expand(tmp_path, 'fluid.%04d.vdb') == ['fluid.0005.vdb', 'fluid.1001.vdb']
+
+
+def test_token_in_directory_is_not_expanded(tmp_path):
+    tiles = tmp_path / '1001'
+    tiles.mkdir()
+    _write(tiles, 'body.1001.exr')
+    seq = tmp_path / '####'
+    seq.mkdir()
+    _write(seq, 'fluid.0001.vdb')
+    assert expand_sequence_path(os.path.join(str(tmp_path), '<UDIM>', 'body.<UDIM>.exr')) == []
+    assert expand_sequence_path(os.path.join(str(seq), 'fluid.0001.vdb')) == []
+    assert expand_sequence_path(os.path.join(str(seq), 'fluid.####.vdb')) == []
+    assert not has_sequence_tokens(os.path.join('shots', '<UDIM>', 'body.exr'))
+
+
+def test_missing_directory(tmp_path):
+    assert expand_sequence_path(os.path.join(str(tmp_path), 'missing', 'body.<UDIM>.exr')) == []
+
+
+def test_case_sensitivity_follows_platform(monkeypatch):
+    # 标记本身总是不区分大小写
+    assert compile_sequence_pattern('body.<udim>.exr').fullmatch('body.1001.exr')
+    monkeypatch.setattr(path_tokens, '_MATCH_FLAGS', 0)
+    assert not compile_sequence_pattern('Body.<UDIM>.EXR').fullmatch('body.1001.exr')
+    # Windows 文件名不区分大小写
+    monkeypatch.setattr(path_tokens, '_MATCH_FLAGS', re.IGNORECASE)
+    assert compile_sequence_pattern('Body.<UDIM>.EXR').fullmatch('body.1001.exr')
+    assert compile_sequence_pattern('body.<UVTILE>.exr').fullmatch('body.U1_V2.exr')
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""core.processor：步骤5-9共用一个场景文档，MA文件只读取一次"""
+
+import builtins
+import copy
+import hashlib
+import json
+import mmap
+import os
+import sys
+
+import pytest
+
+import core.processor as processor_module
+from core.logger import Logger
+from core.processor import MayaSceneProcessor
+from parsers.render_settings_reader import read_render_settings
+from parsers.scene_document import SceneDocument
+
+
+def _write_project(tmp_path, image_file_prefix: str) -> str:
+    """最小的项目：一个贴图 + 一个快速模式即可读取全部渲染参数的MA场景"""
+    scene_dir = tmp_path / 'scenes'
+    texture_dir = tmp_path / 'sourceimages'
+    scene_dir.mkdir()
+    texture_dir.mkdir()
+    texture = texture_dir / '贴图_diffuse.png'
+    texture.write_bytes(b'png')
+    scene = scene_dir / 'shot.ma'
+    scene.write_bytes((
+        '//Maya ASCII 2022 scene\n'
+        'requires maya "2022";\n'
+        'createNode transform -n "renderCam";\n'
+        'createNode camera -n "renderCamShape" -p "renderCam";\n'
+        'createNode file -n "file1";\n'
+        f'\tsetAttr ".ftn" -type "string" "{texture.as_posix()}";\n'
+        'select -ne :defaultRenderGlobals;\n'
+        '\tsetAttr ".an" yes;\n'
+        '\tsetAttr ".fs" 1001;\n'
+        '\tsetAttr ".ef" 1010;\n'
+        '\tsetAttr ".if" 51;\n'
+        f'\tsetAttr ".ifp" -type "string" "{image_file_prefix.format(scene_dir=scene_dir.as_posix())}";\n'
+        '\tsetAttr ".ofc" 1;\n'
+        'select -ne :defaultResolution;\n'
+        '\tsetAttr ".w" 1920;\n'
+        '\tsetAttr ".h" 1080;\n'
+        '// End of shot.ma\n'
+    ).encode('utf-8'))
+    return str(scene)
+
+
+def _run_steps_5_to_9(scene_path, output_dir, monkeypatch, scene_data=None, **options):
+    """
+    执行 process()（跳过需要本地Maya安装的步骤1-4），统计场景文件的打开次数和内存映射次数
+
+    scene_data 不为None时代替 mayapy 检查脚本的结果，否则使用快速模式（不允许启动mayapy）
+    """
+    # 按调用方统计场景文件的打开次数：
+    # load / rewrite_lines 读取整个文件，node_statements 只读取单个节点块的区间，
+    # zipfile 打开场景是步骤9把场景复制进压缩包
+    opens = {}
+    original_open = builtins.open
+
+    def counting_open(file, *args, **kwargs):
+        if isinstance(file, (str, os.PathLike)) and os.path.abspath(file) == scene_path:
+            frame = sys._getframe(1)
+            caller = f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}"
+            opens[caller] = opens.get(caller, 0) + 1
+        return original_open(file, *args, **kwargs)
+
+    mappings = []
+    original_mmap = mmap.mmap
+
+    def counting_mmap(*args, **kwargs):
+        mappings.append(args)
+        return original_mmap(*args, **kwargs)
+
+    def fake_maya_script(mayapy_path, path):
+        if scene_data is None:
+            raise AssertionError('快速模式下渲染参数齐全，不应启动mayapy')
+        return copy.deepcopy(scene_data)
+
+    monkeypatch.setattr(builtins, 'open', counting_open)
+    monkeypatch.setattr(mmap, 'mmap', counting_mmap)
+    monkeypatch.setattr(processor_module, 'run_maya_script', fake_maya_script)
+
+    processor = MayaSceneProcessor(scene_path, output_dir, logger=Logger(console_output=False),
+                                   fast_mode=scene_data is None, stat_workers=1, use_walk_cache=False,
+                                   relocate_missing=False, use_xgen_cache=False, **options)
+    monkeypatch.setattr(processor, '_step1_validate_scene', lambda: None)
+    monkeypatch.setattr(processor, '_step2_get_maya_version', lambda: 2022)
+    monkeypatch.setattr(processor, '_step3_find_maya_installations', lambda: (None, []))
+    monkeypatch.setattr(processor, '_step4_match_maya_version', lambda *args: None)
+
+    documents = []
+    original_step5 = processor._step5_convert_mb_to_ma
+
+    def recording_step5(temp_files):
+        result = original_step5(temp_files)
+        documents.append(result[1])
+        return result
+
+    monkeypatch.setattr(processor, '_step5_convert_mb_to_ma', recording_step5)
+    processor.process()
+    monkeypatch.undo()
+
+    document, = documents
+    return processor, document, opens, mappings
+
+
+def _full_reads(opens):
+    """读取整个场景文件的打开次数（按调用方）"""
+    return {caller: count for caller, count in opens.items()
+            if caller.startswith('parsers.scene_document.') and not caller.endswith('.node_statements')}
+
+
+def _assert_outputs(processor, scene_path):
+    with open(processor.upload_path, 'r', encoding='utf-8') as f:
+        upload = json.load(f)
+    assert any(asset['local'].endswith('贴图_diffuse.png') for asset in upload['asset'])
+    # 读取时同时计算的hash与（改写后的）场景文件内容一致
+    with open(scene_path, 'rb') as f:
+        assert upload['scene'][0]['hash'] == hashlib.md5(f.read()).hexdigest()
+    assert os.path.isfile(processor.zip_path)
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_render_path_fix_reads_scene_once(tmp_path, monkeypatch, use_mmap):
+    scene_path = _write_project(tmp_path, '{scene_dir}/images/<Scene>')
+    # mayapy 检查脚本的结果：渲染路径为绝对路径，需要在步骤6改写
+    scene_data, _ = read_render_settings(SceneDocument(scene_path))
+    scene_data['render_path']['is_absolute'] = True
+
+    processor, document, opens, mappings = _run_steps_5_to_9(
+        scene_path, str(tmp_path / 'output'), monkeypatch, scene_data=scene_data, use_mmap=use_mmap)
+
+    # 改写与索引在同一遍读取中完成，步骤7-9直接使用改写后的索引（改写时按流读取，不使用内存映射）
+    assert document.read_count == 1
+    assert _full_reads(opens) == {'parsers.scene_document.rewrite_lines': 1}
+    assert not mappings
+    assert sum(count for caller, count in opens.items() if caller.startswith('zipfile.')) == 1
+    with open(scene_path, 'r', encoding='utf-8') as f:
+        assert '"images/<Scene>"' in f.read()
+    _assert_outputs(processor, scene_path)
+
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_fast_mode_reads_scene_once(tmp_path, monkeypatch, use_mmap):
+    scene_path = _write_project(tmp_path, '<Scene>/<RenderLayer>')
+
+    processor, document, opens, mappings = _run_steps_5_to_9(
+        scene_path, str(tmp_path / 'output'), monkeypatch, use_mmap=use_mmap)
+
+    # 渲染参数、路径提取和hash都来自同一次读取；节点块按区间读取（defaultRenderGlobals / defaultResolution / 相机）
+    assert document.read_count == 1
+    assert _full_reads(opens) == {'parsers.scene_document.load': 1}
+    assert len(mappings) == (1 if use_mmap else 0)
+    assert opens.get('parsers.scene_document.node_statements') == 3
+    assert sum(count for caller, count in opens.items() if caller.startswith('zipfile.')) == 1
+    _assert_outputs(processor, scene_path)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""utils.relocation：按文件名重定位的候选选择、项目目录、缺失/重定位报告；默认只报告，打包时上传到原路径对应的服务器位置"""
+
+import pytest
+
+from builders.package_builder import build_upload_mapping, to_server_path
+from utils.path_utils import normalize_path_separators
+from utils.relocation import RelocationIndex, Relocator, find_project_root, set_relocator
+from utils.stat_cache import FileStatCache, set_stat_cache
+from utils.walk_cache import DirectoryWalkCache, set_walk_cache
+from utils.xgen_cache import XGenDependencyCache, set_xgen_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    set_stat_cache(FileStatCache(workers=1))
+    set_walk_cache(DirectoryWalkCache())
+    set_xgen_cache(XGenDependencyCache())
+
+
+_MOVED_TEXTURE = '/old_server/show/sourceimages/wood.png'
+
+
+@pytest.fixture
+def project(tmp_path):
+    """项目目录中有 wood.png，场景引用的是已失效的旧路径"""
+    (tmp_path / 'workspace.mel').write_text('', encoding='utf-8')
+    (tmp_path / 'sourceimages').mkdir()
+    (tmp_path / 'sourceimages' / 'wood.png').write_bytes(b'png')
+    (tmp_path / 'scenes').mkdir()
+    (tmp_path / 'scenes' / 'shot.ma').write_text(
+        '//Maya ASCII 2022 scene\n'
+        'createNode file -n "file1";\n'
+        f'\tsetAttr ".ftn" -type "string" "{_MOVED_TEXTURE}";\n',
+        encoding='utf-8')
+    return tmp_path
+
+
+def _build(project, package: bool):
+    relocator = Relocator(str(project), package=package)
+    set_relocator(relocator)
+    mapping = build_upload_mapping(str(project / 'scenes' / 'shot.ma'), '/input/job')
+    return mapping['asset'], relocator.report()
+
+
+def test_relocated_file_is_only_reported_by_default(project):
+    assets, report = _build(project, package=False)
+    relocated = normalize_path_separators(str(project / 'sourceimages' / 'wood.png'))
+    assert [item['local'] for item in assets] == []
+    assert report['missing'] == []
+    assert report['relocated'] == [{'original': _MOVED_TEXTURE, 'relocated': relocated,
+                                    'candidates': [relocated], 'candidate_count': 1, 'packaged': False}]
+
+
+def test_packaged_relocation_uploads_to_original_server_path(project):
+    assets, report = _build(project, package=True)
+    relocated = normalize_path_separators(str(project / 'sourceimages' / 'wood.png'))
+    # 场景中引用的是原路径：服务器上的文件必须在原路径对应的位置
+    assert assets == [{'local': relocated, 'server': to_server_path(_MOVED_TEXTURE, '/input/job')}]
+    assert report['relocated'][0]['packaged'] is True
+
+
+def _touch(root, *parts):
+    for part in parts:
+        path = root.joinpath(*part.split('/'))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x')
+
+
+def _normalized(root, part):
+    return normalize_path_separators(str(root.joinpath(*part.split('/'))))
+
+
+def test_find_prefers_longest_matching_directory_suffix(tmp_path):
+    _touch(tmp_path, 'wood.png', 'props/tex/wood.png', 'chars/hero/tex/wood.png', 'deep/x/y/z/wood.png')
+    index = RelocationIndex(str(tmp_path))
+    assert len(index.candidates('/old/anything/wood.png')) == 4
+    # 末尾目录相同层数最多的优先，与目录深度无关
+    assert index.find('/old/show/chars/hero/tex/wood.png') == _normalized(tmp_path, 'chars/hero/tex/wood.png')
+    assert index.find('/old/show/props/tex/wood.png') == _normalized(tmp_path, 'props/tex/wood.png')
+    # 层数相同时取路径排序最前的一个
+    assert index.find('/old/show/other/wood.png') == _normalized(tmp_path, 'chars/hero/tex/wood.png')
+    assert index.find('/old/show/other/missing.png') is None
+
+
+def test_find_project_root_without_workspace(tmp_path):
+    scenes = tmp_path / 'shot' / 'scenes'
+    scenes.mkdir(parents=True)
+    other = tmp_path / 'shot' / 'work'
+    other.mkdir()
+    # 没有 workspace.mel：scenes 目录使用其上一级，其他目录使用场景目录本身
+    assert find_project_root(str(scenes)) == str(tmp_path / 'shot')
+    assert find_project_root(str(other)) == str(other)
+    (tmp_path / 'workspace.mel').write_text('', encoding='utf-8')
+    set_stat_cache(FileStatCache(workers=1))
+    assert find_project_root(str(scenes)) == str(tmp_path)
+
+
+def test_missing_project_root_only_records_missing(tmp_path):
+    relocator = Relocator(None)
+    assert relocator.relocate('/old/wood.png') is None
+    relocator = Relocator(str(tmp_path / 'gone'))
+    assert relocator.relocate('/old/stone.png') is None
+    assert relocator.report()['missing'] == ['/old/stone.png']
+
+
+def test_report(tmp_path):
+    _touch(tmp_path, 'a/wood.png', 'b/wood.png', 'stone.png')
+    relocator = Relocator(str(tmp_path))
+    assert relocator.relocate('/old/a/wood.png') == _normalized(tmp_path, 'a/wood.png')
+    assert relocator.relocate('/old/stone.png') == _normalized(tmp_path, 'stone.png')
+    relocator.mark_packaged('/old/stone.png')
+    assert relocator.relocate('/old/leaf.png') is None
+    relocator.record_missing('/old/seq.####.exr')
+    relocator.record_skipped('/xgen/old.ptx', 100)
+    relocator.record_skipped('/xgen/older.ptx', 28)
+    assert relocator.report() == {
+        'project_root': str(tmp_path),
+        'missing': ['/old/leaf.png', '/old/seq.####.exr'],
+        'relocated': [
+            {'original': '/old/a/wood.png', 'relocated': _normalized(tmp_path, 'a/wood.png'),
+             'candidates': [_normalized(tmp_path, 'a/wood.png'), _normalized(tmp_path, 'b/wood.png')],
+             'candidate_count': 2, 'packaged': False},
+            {'original': '/old/stone.png', 'relocated': _normalized(tmp_path, 'stone.png'),
+             'candidates': [_normalized(tmp_path, 'stone.png')], 'candidate_count': 1, 'packaged': True},
+        ],
+        'skipped_files': 2,
+        'skipped_bytes': 128,
+    }
+
+
+def test_record_missing_after_relocation(tmp_path):
+    _touch(tmp_path, 'wood.png')
+    relocator = Relocator(str(tmp_path))
+    assert relocator.relocate('/old/wood.png') is not None
+    # 同一路径之后又被其他流程记为缺失（如引用解析）：已经重定位的不记为缺失
+    relocator.record_missing('/old/wood.png')
+    report = relocator.report()
+    assert report['missing'] == []
+    assert [item['original'] for item in report['relocated']] == ['/old/wood.png']
+    # 再次查找直接返回之前的结果
+    assert relocator.relocate('/old/wood.png') == _normalized(tmp_path, 'wood.png')
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""parsers.render_settings_reader 与 parsers.scene_inspector.fix_ma_render_path：快速模式读取和渲染路径改写"""
+
+import pytest
+
+from parsers.render_settings_reader import FIELD_RENDER_DEVICE, read_render_settings
+from parsers.scene_document import SceneDocument
+from parsers.scene_inspector import fix_ma_render_path
+
+
+def _scene_text(arnold_options: str = '', newline: str = '\n') -> str:
+    lines = [
+        '//Maya ASCII 2022 scene',
+        'requires maya "2022";',
+        'requires -nodeType "aiOptions" "mtoa" "5.1.0";',
+        'createNode transform -n "renderCam";',
+        'createNode camera -n "renderCamShape" -p "renderCam";',
+        'createNode aiOptions -s -n "defaultArnoldRenderOptions";',
+    ]
+    if arnold_options:
+        lines.append(arnold_options)
+    lines.extend([
+        'select -ne :defaultRenderGlobals;',
+        '\tsetAttr ".ren" -type "string" "arnold";',
+        '\tsetAttr ".an" yes;',
+        '\tsetAttr ".if" 51;',
+        '\tsetAttr ".ifp" -type "string" "{prefix}";',
+        '\tsetAttr ".ofc" -type "long" 1;',
+        'select -ne :defaultResolution;',
+        '\tsetAttr ".w" 1920;',
+        '// End of shot.ma',
+    ])
+    return newline.join(lines) + newline
+
+
+def _write(tmp_path, text: str) -> str:
+    path = tmp_path / 'shot.ma'
+    path.write_bytes(text.format(prefix='<Scene>').encode('utf-8'))
+    return str(path)
+
+
+def test_found_values_and_defaults_are_separate(tmp_path):
+    scene_data, missing = read_render_settings(
+        SceneDocument(_write(tmp_path, _scene_text('\tsetAttr ".renderDevice" 1;'))))
+    assert missing == []
+    assert scene_data['render_settings']['render_device'] == 'gpu'
+    assert scene_data['render_settings']['defaultRenderGlobals']['animation'] is True
+    assert scene_data['render_settings']['defaultResolution'] == {'width': 1920, 'height': 480}
+    # 只有未写出的属性记为默认值
+    assert scene_data['defaults'] == {
+        'defaultRenderGlobals': ['startFrame', 'endFrame', 'byFrameStep'],
+        'defaultResolution': ['height'],
+    }
+
+
+def test_unwritten_render_device_is_missing(tmp_path):
+    # 选项节点存在但没有写出 renderDevice：不按默认值推断为CPU，回退到mayapy
+    scene_data, missing = read_render_settings(SceneDocument(_write(tmp_path, _scene_text())))
+    assert missing == [FIELD_RENDER_DEVICE]
+    assert scene_data['render_settings']['render_device'] is None
+    assert 'defaultArnoldRenderOptions' not in scene_data['defaults']
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_fix_render_path_keeps_line_endings(tmp_path, newline):
+    scene_dir = tmp_path / 'scenes'
+    scene_dir.mkdir()
+    path = scene_dir / 'shot.ma'
+    text = _scene_text('\tsetAttr ".renderDevice" 1;', newline)
+    absolute_prefix = f'{scene_dir.as_posix()}/images/<Scene>'
+    path.write_bytes(text.format(prefix=absolute_prefix).encode('utf-8'))
+
+    document = SceneDocument(str(path))
+    assert fix_ma_render_path(str(path), '', True, absolute_prefix, document=document)
+
+    expected = text.format(prefix='images/<Scene>').replace('"long" 1;', '"long" 0;')
+    assert path.read_bytes() == expected.encode('utf-8')
+    # 改写后的索引与重新读取的结果相同（偏移包括 \r 的字节）
+    assert document.scan_records() == SceneDocument(str(path)).scan_records()
+    assert document.string_values('ifp') == ['images/<Scene>']
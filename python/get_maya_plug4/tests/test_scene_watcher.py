@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""core.scene_watcher：引用目录的监视范围"""
+
+from core.scene_watcher import MODE_REBUILD, SceneWatchSession
+from utils.path_utils import normalize_path_separators
+
+
+def test_walk_root_subdirectories_are_watched(tmp_path):
+    textures = tmp_path / 'textures'
+    (textures / 'empty' / 'deeper').mkdir(parents=True)
+    (textures / 'sub').mkdir()
+    (textures / 'sub' / 'a.png').write_bytes(b'png')
+    (tmp_path / 'scenes').mkdir()
+    scene = tmp_path / 'scenes' / 'shot.ma'
+    # 场景引用整个贴图目录（目录中的文件整体收集）
+    scene.write_text(
+        '//Maya ASCII 2022 scene\n'
+        'createNode file -n "file1";\n'
+        f'\tsetAttr ".ftn" -type "string" "{textures.as_posix()}";\n',
+        encoding='utf-8')
+    session = SceneWatchSession(str(scene), str(tmp_path), use_walk_cache=False, use_xgen_cache=False)
+    session.initialize()
+
+    # 启动时没有文件的子目录也要监视，否则其中新建的文件收不到通知
+    directories = {normalize_path_separators(path) for path in session.watch_targets()['directories']}
+    assert {normalize_path_separators(str(textures / part)) for part in ('empty', 'empty/deeper', 'sub')} <= directories
+
+    new_texture = textures / 'empty' / 'deeper' / 'b.png'
+    new_texture.write_bytes(b'png')
+    update = session.apply_changes([str(new_texture)])
+    assert update.mode == MODE_REBUILD
+    assert update.asset_count == 2
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""utils.stat_cache：注入计数的 stat_func / scandir_func，检查系统调用次数"""
+
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.stat_cache import FileStatCache
+
+
+class _CountingFs:
+    """统计每个路径的 os.stat / os.scandir 调用次数"""
+
+    def __init__(self, latency: float = 0.0):
+        self.stats = Counter()
+        self.scandirs = Counter()
+        # 模拟网络共享的延迟（sleep 期间释放GIL，其他线程可以同时检查）
+        self.latency = latency
+        self._lock = threading.Lock()
+
+    def stat(self, path):
+        with self._lock:
+            self.stats[os.path.normpath(path)] += 1
+        time.sleep(self.latency)
+        return os.stat(path)
+
+    def scandir(self, path):
+        with self._lock:
+            self.scandirs[os.path.normpath(path)] += 1
+        time.sleep(self.latency)
+        return os.scandir(path)
+
+    def cache(self, workers: int = 1) -> FileStatCache:
+        return FileStatCache(stat_func=self.stat, scandir_func=self.scandir, workers=workers)
+
+
+@pytest.fixture
+def project(tmp_path):
+    textures = tmp_path / 'sourceimages'
+    caches = tmp_path / 'cache'
+    textures.mkdir()
+    caches.mkdir()
+    for name in ('a.png', 'b.png', 'c.png'):
+        (textures / name).write_bytes(b'x' * 3)
+    (caches / 'fluid.xml').write_bytes(b'<xml/>')
+    return tmp_path
+
+
+def test_one_stat_per_unique_path(project):
+    fs = _CountingFs()
+    cache = fs.cache()
+    texture = str(project / 'sourceimages' / 'a.png')
+    missing = str(project / 'sourceimages' / 'missing.png')
+    # 同一路径的不同写法共用一个缓存项
+    spellings = [texture, str(project / 'sourceimages' / '.' / 'a.png'),
+                 str(project / 'cache' / '..' / 'sourceimages' / 'a.png')]
+
+    for path in spellings * 3:
+        assert cache.exists(path)
+        assert cache.isfile(path)
+        assert not cache.isdir(path)
+        assert cache.getsize(path) == 3
+    for _ in range(3):
+        assert not cache.exists(missing)
+        assert cache.stat(missing) is None
+    assert cache.isdir(str(project / 'cache'))
+
+    assert fs.stats == Counter({texture: 1, missing: 1, str(project / 'cache'): 1})
+    assert cache.stat_calls == 3
+    assert not fs.scandirs
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_prefetch_lists_each_directory_once(project, workers):
+    fs = _CountingFs()
+    cache = fs.cache(workers)
+    textures = project / 'sourceimages'
+    candidates = [str(textures / name) for name in ('a.png', 'b.png', 'c.png', 'missing.png')]
+    missing_dir = [str(project / 'gone' / name) for name in ('x.abc', 'y.abc')]
+    single = str(project / 'cache' / 'fluid.xml')
+
+    assert cache.prefetch(candidates + missing_dir + [single] + candidates) == 2
+    assert fs.scandirs == Counter({str(textures): 1, str(project / 'gone'): 1})
+    # 只有一个候选路径的目录直接 stat
+    assert fs.stats == Counter({single: 1})
+
+    # 目录列表直接回答存在性和类型，不再 stat
+    assert [cache.isfile(path) for path in candidates] == [True, True, True, False]
+    assert not any(cache.exists(path) for path in missing_dir)
+    assert cache.exists(single)
+    assert fs.stats == Counter({single: 1})
+
+    # 已读取的目录不再读取
+    assert cache.prefetch(candidates + missing_dir) == 0
+    assert sum(fs.scandirs.values()) == 2
+    # 大小来自目录项的 stat（不经过 stat_func），之后从缓存读取
+    assert cache.getsize(candidates[0]) == 3 and cache.getsize(candidates[0]) == 3
+    assert fs.stats == Counter({single: 1})
+
+
+def test_invalidate(project):
+    fs = _CountingFs()
+    cache = fs.cache()
+    textures = project / 'sourceimages'
+    a, b = str(textures / 'a.png'), str(textures / 'b.png')
+    output = str(project / 'upload.json')
+
+    assert not cache.exists(output)
+    assert cache.exists(a) and cache.exists(b)
+    # 处理流程写出文件后清除该路径，下次检查重新 stat
+    with open(output, 'w') as f:
+        f.write('{}')
+    assert not cache.exists(output)
+    cache.invalidate(output)
+    assert cache.exists(output)
+    assert fs.stats[output] == 2
+    # 其他路径的缓存不受影响
+    assert cache.exists(a)
+    assert fs.stats[a] == 1
+
+    # 清除已读取目录中的路径：目录列表也被丢弃，该路径重新 stat，同目录的其他路径改为单独 stat（不再读取目录）
+    cache.prefetch([str(textures / 'c.png'), str(textures / 'new.png')])
+    (textures / 'new.png').write_bytes(b'')
+    assert not cache.exists(str(textures / 'new.png'))
+    cache.invalidate(str(textures / 'new.png'))
+    assert cache.exists(str(textures / 'new.png'))
+    assert cache.exists(str(textures / 'c.png'))
+    assert fs.stats[str(textures / 'new.png')] == 1 and fs.stats[str(textures / 'c.png')] == 1
+    assert fs.scandirs[str(textures)] == 1
+
+    # 清除全部：所有路径重新 stat
+    cache.invalidate()
+    assert len(cache) == 0
+    assert cache.exists(a) and cache.exists(output)
+    assert fs.stats[a] == 2 and fs.stats[output] == 3
+
+
+def test_concurrent_checks_and_prefetch(tmp_path):
+    fs = _CountingFs(latency=0.001)
+    cache = fs.cache(workers=4)
+    directories = [tmp_path / f'desc{index}' for index in range(8)]
+    expected = {}
+    for directory in directories:
+        directory.mkdir()
+        for name in ('a.ptx', 'b.ptx', 'c.ptx'):
+            (directory / name).write_bytes(b'')
+            expected[str(directory / name)] = True
+        expected[str(directory / 'missing.ptx')] = False
+    paths = sorted(expected)
+
+    def check(offset):
+        # 各线程从不同位置开始检查，与 prefetch 交错
+        ordered = paths[offset:] + paths[:offset]
+        return {path: (cache.exists(path), cache.isfile(path)) for path in ordered}
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        checks = [executor.submit(check, offset * 5) for offset in range(5)]
+        prefetch = executor.submit(cache.prefetch, paths)
+        results = [future.result() for future in checks]
+        prefetch.result()
+
+    for result in results:
+        assert result == {path: (exists, exists) for path, exists in expected.items()}
+    # 计数没有在并发更新中丢失（stat_calls 还包括目录项的 stat，不经过 stat_func）
+    assert cache.stat_calls >= sum(fs.stats.values())
+    assert cache.scandir_calls == sum(fs.scandirs.values())
+    # 之后的检查全部来自缓存
+    calls = sum(fs.stats.values()) + sum(fs.scandirs.values())
+    assert check(0) == results[0]
+    assert sum(fs.stats.values()) + sum(fs.scandirs.values()) == calls
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""utils.walk_cache：磁盘缓存命中时收集目录文件的系统调用次数，按路径分片读写"""
+
+import os
+from collections import Counter
+
+from parsers.file_path_extractor import _collect_directory_files
+from utils.path_store import PathStore
+from utils.path_utils import normalize_path_separators
+from utils.stat_cache import FileStatCache, set_stat_cache
+from utils import walk_cache as walk_cache_module
+from utils.walk_cache import DirectoryWalkCache, set_walk_cache
+
+
+def _age_tree(root, timestamp: int = 1_600_000_000) -> None:
+    """把目录的修改时间改到过去（刚修改的目录不写入缓存）"""
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (timestamp, timestamp))
+
+
+def _collect(cache_dir, root):
+    stats = Counter()
+
+    def counting_stat(path):
+        stats[os.path.normpath(path)] += 1
+        return os.stat(path)
+
+    set_stat_cache(FileStatCache(stat_func=counting_stat, workers=1))
+    walk_cache = DirectoryWalkCache(str(cache_dir))
+    set_walk_cache(walk_cache)
+    collected = PathStore()
+    _collect_directory_files(str(root), collected)
+    walk_cache.save()
+    return set(collected), stats, walk_cache
+
+
+def test_warm_cache_only_stats_directories_and_links(tmp_path):
+    root = tmp_path / 'textures'
+    (root / 'sub').mkdir(parents=True)
+    for index in range(100):
+        (root / f'map_{index:03d}.tx').write_bytes(b'tx')
+        (root / 'sub' / f'mask_{index:03d}.tx').write_bytes(b'tx')
+    os.symlink(root / 'map_000.tx', root / 'linked.tx')
+    os.symlink(root / 'gone.tx', root / 'broken.tx')
+    _age_tree(root)
+    cache_dir = tmp_path / 'walk'
+
+    first, _, cold = _collect(cache_dir, root)
+    second, stats, warm = _collect(cache_dir, root)
+
+    assert cold.misses == 2 and warm.hits == 2
+    assert second == first
+    assert len(first) == 201
+    assert normalize_path_separators(str(root / 'linked.tx')) in first
+    assert normalize_path_separators(str(root / 'broken.tx')) not in first
+    # 只 stat 两个目录和两个符号链接，不再逐个 stat 普通文件
+    assert set(stats) == {os.path.normpath(str(path)) for path in
+                          (root, root / 'sub', root / 'linked.tx', root / 'broken.tx')}
+
+
+def test_only_used_shards_are_loaded_and_written(tmp_path, monkeypatch):
+    # tmp_path 下的每个项目目录各为一个分片
+    monkeypatch.setattr(walk_cache_module, '_SHARD_DEPTH', len(os.path.normcase(str(tmp_path)).split(os.sep)) + 1)
+    for project in ('show_a', 'show_b'):
+        (tmp_path / project / 'textures').mkdir(parents=True)
+        (tmp_path / project / 'textures' / 'map.tx').write_bytes(b'tx')
+    _age_tree(tmp_path)
+    cache_dir = tmp_path / 'cache'
+    _collect(cache_dir, tmp_path / 'show_a')
+    _collect(cache_dir, tmp_path / 'show_b')
+    shard_files = sorted(cache_dir.iterdir())
+    assert len(shard_files) == 2
+    written = {path: path.stat().st_mtime_ns for path in shard_files}
+
+    # 只遍历 show_a：只读取它的分片；目录没有变化，不写入任何分片
+    _, _, walk_cache = _collect(cache_dir, tmp_path / 'show_a')
+    assert walk_cache.hits == 2 and len(walk_cache._shards) == 1
+    assert {path: path.stat().st_mtime_ns for path in shard_files} == written
+
+    # show_a 中新增贴图：只重写 show_a 的分片
+    (tmp_path / 'show_a' / 'textures' / 'mask.tx').write_bytes(b'tx')
+    _age_tree(tmp_path / 'show_a', 1_600_000_100)
+    collected, _, _ = _collect(cache_dir, tmp_path / 'show_a')
+    assert normalize_path_separators(str(tmp_path / 'show_a' / 'textures' / 'mask.tx')) in collected
+    changed = [path for path in shard_files if path.stat().st_mtime_ns != written[path]]
+    assert len(changed) == 1
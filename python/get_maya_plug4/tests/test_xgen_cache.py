@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""utils.xgen_cache：缓存命中的校验（依赖文件所在目录和缺失候选路径所在目录），并发解析时的缓存写入"""
+
+import os
+import threading
+
+import parsers.file_path_extractor as file_path_extractor
+from parsers.file_path_extractor import _resolve_single_xgen_file
+from utils.path_utils import normalize_path_separators
+from utils.relocation import Relocator, get_relocator, set_relocator
+from utils.stat_cache import FileStatCache, set_stat_cache
+from utils.walk_cache import DirectoryWalkCache, set_walk_cache
+from utils.xgen_cache import XGenDependencyCache, set_xgen_cache
+
+
+def _age_tree(root) -> None:
+    """把目录的修改时间改到过去（刚修改的目录不写入缓存）"""
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (1_600_000_000, 1_600_000_000))
+
+
+def _resolve(cache_dir, xgen_file, data_dir):
+    # 每次都是一次新的处理流程：状态缓存、目录缓存和重定位器重新建立，磁盘缓存共用
+    set_stat_cache(FileStatCache(workers=1))
+    set_walk_cache(DirectoryWalkCache())
+    set_relocator(Relocator())
+    cache = XGenDependencyCache(str(cache_dir))
+    set_xgen_cache(cache)
+    return _resolve_single_xgen_file(xgen_file, [data_dir]), cache
+
+
+def test_missing_reference_invalidates_entry(tmp_path):
+    project = tmp_path / 'proj'
+    data_dir = project / 'xgen' / 'collections' / 'hair_coll'
+    data_dir.mkdir(parents=True)
+    (data_dir / 'hair_coll.xgc').write_bytes(b'xgc')
+    textures = project / 'sourceimages'
+    textures.mkdir()
+    scenes = project / 'scenes'
+    scenes.mkdir()
+    xgen_file = scenes / 'shot__hair_coll.xgen'
+    # MapTextures 中的相对路径按 xgDataPath、xgProjectPath、palette 所在目录依次查找，目前都不存在
+    xgen_file.write_text(
+        'Palette\n'
+        f'\txgDataPath\t\t{normalize_path_separators(str(data_dir))}\n'
+        f'\txgProjectPath\t\t{normalize_path_separators(str(project))}/\n'
+        '\n'
+        'MapTextures\n'
+        '\tClumping1\tmask\tsourceimages/mask.iff\n'
+        'endAttrs\n',
+        encoding='utf-8')
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    _age_tree(tmp_path)
+    data_dir = normalize_path_separators(str(data_dir))
+    mask = normalize_path_separators(str(textures / 'mask.iff'))
+
+    first, _ = _resolve(cache_dir, str(xgen_file), data_dir)
+    assert not first.cached and mask not in first.paths
+    second, cache = _resolve(cache_dir, str(xgen_file), data_dir)
+    assert second.cached and cache.hits == 1
+    assert sorted(second.paths) == sorted(first.paths)
+
+    # 补上缺失的贴图：所在目录的修改时间变化，缓存不再命中
+    (textures / 'mask.iff').write_bytes(b'iff')
+    third, cache = _resolve(cache_dir, str(xgen_file), data_dir)
+    assert not third.cached and cache.misses == 1
+    assert mask in third.paths
+
+
+def test_other_threads_lookups_do_not_block_cache_write(tmp_path, monkeypatch):
+    data_dir = tmp_path / 'proj' / 'xgen' / 'collections' / 'hair_coll'
+    data_dir.mkdir(parents=True)
+    (data_dir / 'hair_coll.xgc').write_bytes(b'xgc')
+    xgen_file = tmp_path / 'proj' / 'scenes' / 'shot__hair_coll.xgen'
+    xgen_file.parent.mkdir()
+    xgen_file.write_text(
+        'Palette\n'
+        f'\txgDataPath\t\t{normalize_path_separators(str(data_dir))}\n',
+        encoding='utf-8')
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    _age_tree(tmp_path)
+
+    # 解析本 palette 的过程中，另一个线程（线程池中的其他 palette）查找了缺失文件
+    collect = file_path_extractor.collect_xgen_dependencies
+
+    def collect_while_other_thread_relocates(*args, **kwargs):
+        other = threading.Thread(target=get_relocator().relocate, args=('/old/missing.ptx', str(data_dir)))
+        other.start()
+        other.join()
+        return collect(*args, **kwargs)
+
+    monkeypatch.setattr(file_path_extractor, 'collect_xgen_dependencies', collect_while_other_thread_relocates)
+    first, _ = _resolve(cache_dir, str(xgen_file), normalize_path_separators(str(data_dir)))
+    assert not first.cached and get_relocator().report()['missing'] == ['/old/missing.ptx']
+    # 本 palette 没有遇到缺失文件，结果已写入缓存
+    second, cache = _resolve(cache_dir, str(xgen_file), normalize_path_separators(str(data_dir)))
+    assert second.cached and cache.hits == 1
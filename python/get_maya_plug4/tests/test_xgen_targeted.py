@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""parsers.file_path_extractor.collect_existing_absolute_paths：XGen 按引用收集时数据目录（xgDataPath）的处理"""
+
+import pytest
+
+from parsers.file_path_extractor import collect_existing_absolute_paths
+from utils.path_utils import normalize_path_separators
+from utils.relocation import Relocator, set_relocator
+from utils.stat_cache import FileStatCache, set_stat_cache
+from utils.walk_cache import DirectoryWalkCache, set_walk_cache
+from utils.xgen_cache import XGenDependencyCache, set_xgen_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    set_stat_cache(FileStatCache(workers=1))
+    set_walk_cache(DirectoryWalkCache())
+    set_relocator(Relocator())
+    set_xgen_cache(XGenDependencyCache())
+
+
+@pytest.fixture
+def project(tmp_path):
+    data_dir = tmp_path / 'xgen' / 'collections' / 'hair_coll'
+    density = data_dir / 'desc' / 'paintmaps' / 'density'
+    density.mkdir(parents=True)
+    (density / 'region.ptx').write_bytes(b'ptx')
+    (data_dir / 'hair_coll.xgc').write_bytes(b'xgc')
+    (data_dir / 'old').mkdir()
+    (data_dir / 'old' / 'unused.png').write_bytes(b'png')
+    scenes = tmp_path / 'scenes'
+    scenes.mkdir()
+    data_path = normalize_path_separators(str(data_dir))
+    (scenes / 'shot.ma').write_text(
+        '//Maya ASCII 2022 scene\n'
+        'createNode xgmPalette -n "hair_coll";\n'
+        f'\tsetAttr ".xgDataPath" -type "string" "{data_path}";\n',
+        encoding='utf-8')
+    return tmp_path
+
+
+def _files(project, *parts):
+    return {normalize_path_separators(str(project.joinpath(*part.split('/')))) for part in parts}
+
+
+def _write_palette(project, text: str) -> None:
+    (project / 'scenes' / 'shot__hair_coll.xgen').write_text(text, encoding='utf-8')
+
+
+def test_data_dir_collected_by_reference(project):
+    _write_palette(project, (
+        'Palette\n'
+        '\tname\t\thair_coll\n'
+        f'\txgDataPath\t\t{normalize_path_separators(str(project))}/xgen/collections/hair_coll\n'
+        '\n'
+        'Description\n'
+        '\tname\t\tdesc\n'
+        "\tdensity\t\t$a=map('${DESC}/paintmaps/density');\n"
+    ))
+    collected = set(collect_existing_absolute_paths(str(project / 'scenes' / 'shot.ma'), xgen_targeted=True))
+
+    data = 'xgen/collections/hair_coll'
+    assert _files(project, f'{data}/desc/paintmaps/density/region.ptx', f'{data}/hair_coll.xgc') <= collected
+    # 数据目录中未引用的贴图不收集
+    assert not _files(project, f'{data}/old/unused.png') & collected
+
+
+def test_data_dir_collected_when_palette_fails(project):
+    # palette 中没有任何可解析的内容：不能跳过数据目录，整体收集其中的文件
+    _write_palette(project, 'Palette\n\tname\t\thair_coll\n')
+    collected = set(collect_existing_absolute_paths(str(project / 'scenes' / 'shot.ma'), xgen_targeted=True))
+
+    data = 'xgen/collections/hair_coll'
+    assert _files(project, f'{data}/desc/paintmaps/density/region.ptx', f'{data}/hair_coll.xgc',
+                  f'{data}/old/unused.png') <= collected
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+有上限的内存缓存模块
+按文件 (路径, 大小, 修改时间) 缓存解析结果的模块级缓存（引用场景、XGen palette）在监视模式等长时间运行的进程中
+会不断产生新的键（文件每次修改都是新键），本模块按最近使用顺序淘汰超出上限的条目（与 canonical_path 的 LRU 缓存相同）
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+_V = TypeVar('_V')
+
+
+class BoundedCache(Generic[_V]):
+    """
+    LRU 缓存：超过 max_entries 时淘汰最久未使用的条目
+
+    各方法可以在多个线程中同时调用（XGen palette 在线程池中解析，见 parsers.file_path_extractor）
+    """
+
+    def __init__(self, max_entries: int):
+        """
+        Args:
+            max_entries: 最大条目数
+        """
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, _V]' = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[_V]:
+        """读取条目（不存在时返回None），并标记为最近使用"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: _V) -> None:
+        """写入条目，超过上限时淘汰最久未使用的条目"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件变化监视模块
+watch 模式需要知道哪些文件被创建、删除、重命名或写入。Linux 上通过 ctypes 调用 inotify，
+其他平台（或 inotify 不可用、监视数超过系统上限）时定期检查目录和文件的修改时间。
+两种实现都只监视指定目录的直接子项（不递归），wait() 返回变化的完整路径
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+# 导入全局logger
+from core.logger import logger
+
+
+# 同一批变化的合并时间：最后一个事件之后这么久没有新事件才返回（Maya 保存大场景会分多次写入）
+DEFAULT_DEBOUNCE_SECONDS = 0.2
+
+# 轮询间隔
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify 事件（见 <sys/inotify.h>）
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+# 目录内容变化（不关心 IN_MODIFY：大文件写入过程中会产生大量事件，只在写入完成时处理）
+_WATCH_MASK = (_IN_CLOSE_WRITE | _IN_ATTRIB | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+               | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class WatcherError(OSError):
+    """无法监视（inotify 不可用或超过系统监视数上限）"""
+
+
+class InotifyWatcher:
+    """基于 inotify 的监视（仅 Linux）"""
+
+    def __init__(self, debounce: float = DEFAULT_DEBOUNCE_SECONDS):
+        if not sys.platform.startswith('linux'):
+            raise WatcherError(errno.ENOSYS, "inotify 仅在 Linux 上可用")
+        library = ctypes.util.find_library('c') or 'libc.so.6'
+        try:
+            self._libc = ctypes.CDLL(library, use_errno=True)
+            self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        except (OSError, AttributeError) as e:
+            raise WatcherError(errno.ENOSYS, f"无法加载 inotify: {e}")
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise WatcherError(error, f"inotify_init1 失败: {os.strerror(error)}")
+        self.debounce = debounce
+        # 监视描述符 -> 目录
+        self._directories: Dict[int, str] = {}
+        self._watched: Dict[str, int] = {}
+
+    def set_watches(self, directories: Iterable[str], files: Iterable[str] = ()) -> None:
+        """
+        设置监视的目录（替换之前的设置）
+
+        files 中的文件通过监视其所在目录实现（IN_CLOSE_WRITE / IN_MOVED_TO 覆盖编辑器的直接写入和先写临时文件再替换）
+        """
+        wanted = set(directories) | {os.path.dirname(os.path.abspath(path)) for path in files}
+        for directory in set(self._watched) - wanted:
+            self._libc.inotify_rm_watch(self._fd, self._watched.pop(directory))
+        for directory in wanted - set(self._watched):
+            descriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+            if descriptor < 0:
+                error = ctypes.get_errno()
+                if error in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                    continue
+                raise WatcherError(error, f"无法监视目录 {directory}: {os.strerror(error)}")
+            self._watched[directory] = descriptor
+            self._directories[descriptor] = directory
+
+    def _read_events(self) -> Set[str]:
+        changed: Set[str] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                descriptor, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_length].rstrip(b'\0')
+                offset += name_length
+                if mask & _IN_Q_OVERFLOW:
+                    # 事件队列溢出：无法知道哪些文件变化，报告所有监视的目录
+                    changed.update(self._watched)
+                    continue
+                directory = self._directories.get(descriptor)
+                if directory is None:
+                    continue
+                if mask & _IN_IGNORED:
+                    # 目录被删除或移动，监视已失效
+                    self._directories.pop(descriptor, None)
+                    self._watched.pop(directory, None)
+                    continue
+                changed.add(os.path.join(directory, os.fsdecode(name)) if name else directory)
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """等待变化，返回变化的路径（超时时返回空集合）"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = self._read_events()
+        # 合并紧接着的后续事件
+        while select.select([self._fd], [], [], self.debounce)[0]:
+            changed |= self._read_events()
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """定期检查目录列表和文件修改时间的监视（所有平台）"""
+
+    def __init__(self, interval: float = DEFAULT_POLL_INTERVAL, debounce: float = DEFAULT_DEBOUNCE_SECONDS):
+        self.interval = interval
+        self.debounce = debounce
+        # 目录 -> (修改时间, 条目名)
+        self._directories: Dict[str, Optional[Tuple[int, FrozenSet[str]]]] = {}
+        # 文件 -> (大小, 修改时间)
+        self._files: Dict[str, Optional[Tuple[int, int]]] = {}
+
+    @staticmethod
+    def _snapshot_directory(directory: str) -> Optional[Tuple[int, FrozenSet[str]]]:
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                return mtime_ns, frozenset(entry.name for entry in entries)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _snapshot_file(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            result = os.stat(path)
+        except OSError:
+            return None
+        return result.st_size, result.st_mtime_ns
+
+    def set_watches(self, directories: Iterable[str], files: Iterable[str] = ()) -> None:
+        """设置监视的目录和文件（替换之前的设置；目录只检测条目的增删和重命名，文件检测写入）"""
+        directories = set(directories)
+        self._directories = {
+            directory: self._directories.get(directory) or self._snapshot_directory(directory)
+            for directory in directories
+        }
+        self._files = {path: self._files.get(path) or self._snapshot_file(path) for path in files}
+
+    def _poll(self) -> Set[str]:
+        changed: Set[str] = set()
+        for directory, previous in list(self._directories.items()):
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if (previous[0] if previous is not None else None) == mtime_ns:
+                continue
+            current = self._snapshot_directory(directory) if mtime_ns is not None else None
+            self._directories[directory] = current
+            if previous is None or current is None:
+                changed.add(directory)
+                continue
+            changed.update(os.path.join(directory, name) for name in previous[1] ^ current[1])
+        for path, previous in list(self._files.items()):
+            current = self._snapshot_file(path)
+            if current != previous:
+                self._files[path] = current
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> Set[str]:
+        """等待变化，返回变化的路径（超时时返回空集合）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self._poll()
+            if changed:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval if deadline is None else max(0.0, min(self.interval, deadline - time.monotonic())))
+        # 合并紧接着的后续变化
+        while True:
+            time.sleep(self.debounce)
+            more = self._poll()
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self) -> None:
+        pass
+
+
+def create_watcher(use_polling: bool = False, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                   debounce: float = DEFAULT_DEBOUNCE_SECONDS):
+    """创建监视器：优先使用 inotify，不可用时使用轮询"""
+    if not use_polling:
+        try:
+            return InotifyWatcher(debounce=debounce)
+        except WatcherError as e:
+            logger.print_with_time(f"  inotify 不可用（{e}），改用轮询检查文件变化")
+    return PollingWatcher(interval=poll_interval, debounce=debounce)
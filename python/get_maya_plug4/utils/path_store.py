@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑路径集合模块
+大型群集、毛发场景的依赖文件有几十万到上百万个，以完整路径字符串保存在集合中时每个路径约占 150~200 字节。
+PathStore 按目录前缀保存路径：每个目录前缀只保存一次，同一目录下的文件名按添加顺序拼接为一个字符串，
+每个路径只占文件名长度加几个字节。小目录直接在拼接的字符串中查找子串；
+大目录另外保存按文件名哈希排序的索引（每个文件名8字节），用 bisect 查找（C 实现），查找耗时与目录大小基本无关。
+新文件名先放在集合中，积累到一定数量后批量追加，追加只处理新文件名（索引用 C 实现的排序合并），
+构建耗时与路径数成正比；排序只在迭代时进行
+"""
+
+import heapq
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, chain
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+# 文件名之间的分隔符（路径中不会出现 NUL）
+_SEPARATOR = '\0'
+
+# 未合并的新文件名达到此数量（或已合并数量的 1/8，取较大者）时，追加到各目录的拼接字符串中；
+# 随总数增大的阈值使每个文件名平均只参与常数次合并
+PENDING_LIMIT = 1 << 16
+
+# 拼接字符串不超过此长度的目录直接做子串查找，不建立哈希索引（子串查找耗时与字符串长度成正比）
+_SCAN_LIMIT = 1 << 10
+
+# 哈希索引的每一项为 (文件名哈希的低32位 << 32) | 文件名在拼接字符串中的起始位置
+# （不同文件名哈希相同时逐个比较文件名）
+_HASH_MASK = 0xFFFFFFFF
+_HASH_SHIFT = 1 << 32
+
+
+def split_prefix(path: str) -> Tuple[str, str]:
+    """把路径拆分为 (目录前缀（包含末尾的分隔符）, 文件名)，两者直接拼接即为原路径"""
+    index = max(path.rfind('/'), path.rfind('\\'))
+    return path[:index + 1], path[index + 1:]
+
+
+class _Directory:
+    """单个目录前缀下的文件名"""
+    __slots__ = ('names', 'index', 'pending')
+
+    def __init__(self):
+        # 已合并的文件名：按合并顺序拼接（只追加），每个文件名前后都有 NUL
+        self.names = _SEPARATOR
+        # 哈希索引（只有拼接字符串超过 _SCAN_LIMIT 的目录才有），见 _HASH_SHIFT
+        self.index: Optional[array] = None
+        # 尚未合并的新文件名
+        self.pending: Optional[Set[str]] = None
+
+    def __contains__(self, name: str) -> bool:
+        if self.pending is not None and name in self.pending:
+            return True
+        names, index = self.names, self.index
+        if index is None:
+            return f'{_SEPARATOR}{name}{_SEPARATOR}' in names
+        key = (hash(name) & _HASH_MASK) * _HASH_SHIFT
+        end = key + _HASH_SHIFT
+        terminated = name + _SEPARATOR
+        position = bisect_left(index, key)
+        while position < len(index) and index[position] < end:
+            if names.startswith(terminated, index[position] & _HASH_MASK):
+                return True
+            position += 1
+        return False
+
+    def merge(self) -> None:
+        """把新文件名追加到拼接字符串中，只为新文件名计算索引项"""
+        if not self.pending:
+            return
+        added = list(self.pending)
+        self.pending = None
+        start = len(self.names)
+        self.names = f'{self.names}{_SEPARATOR.join(added)}{_SEPARATOR}'
+        if len(self.names) <= _SCAN_LIMIT:
+            return
+        if self.index is None:
+            # 刚超过 _SCAN_LIMIT：为全部文件名建立索引
+            added, start = self.names[1:-1].split(_SEPARATOR), 1
+        # 逐个文件名的计算都用 map（C 实现的迭代）；原索引已排序，排序耗时主要在新增的部分
+        starts = accumulate(map((1).__add__, map(len, added)), initial=start)
+        keys = map(_HASH_SHIFT.__mul__, map(_HASH_MASK.__and__, map(hash, added)))
+        self.index = array('Q', sorted(chain(self.index or (), map(int.__or__, keys, starts))))
+
+    def sorted_names(self) -> List[str]:
+        """排序后的文件名（需要先 merge）"""
+        return sorted(self.names[1:-1].split(_SEPARATOR)) if len(self.names) > 1 else []
+
+
+class PathStore:
+    """
+    按目录前缀压缩保存的路径集合
+
+    与 set 相同按字符串精确比较（不做路径规范化），迭代顺序与 sorted() 相同。
+    迭代过程中添加的路径不会出现在本次迭代中
+    """
+
+    def __init__(self, paths: Iterable[str] = ()):
+        # 目录前缀 -> 文件名
+        self._directories: Dict[str, _Directory] = {}
+        # 有新文件名的目录
+        self._pending_directories: List[_Directory] = []
+        self._pending_count = 0
+        self._count = 0
+        self.update(paths)
+
+    def add(self, path: str) -> bool:
+        """添加路径，返回是否为新路径"""
+        prefix, name = split_prefix(path)
+        directory = self._directories.get(prefix)
+        if directory is None:
+            directory = self._directories[sys.intern(prefix)] = _Directory()
+        elif name in directory:
+            return False
+        if directory.pending is None:
+            directory.pending = {name}
+            self._pending_directories.append(directory)
+        else:
+            directory.pending.add(name)
+        self._count += 1
+        self._pending_count += 1
+        if self._pending_count >= max(PENDING_LIMIT, self._count >> 2):
+            self._merge()
+        return True
+
+    def update(self, paths: Iterable[str]) -> None:
+        """添加多个路径"""
+        for path in paths:
+            self.add(path)
+
+    def _merge(self) -> None:
+        for directory in self._pending_directories:
+            directory.merge()
+        self._pending_directories = []
+        self._pending_count = 0
+
+    def __contains__(self, path: object) -> bool:
+        if not isinstance(path, str):
+            return False
+        prefix, name = split_prefix(path)
+        directory = self._directories.get(prefix)
+        return directory is not None and name in directory
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _prefix_groups(self) -> Iterator[List[str]]:
+        """
+        按排序顺序产出目录前缀分组：排序后的完整路径只会在一个前缀和以它开头的前缀（子目录）之间交错，
+        每组为一个前缀和紧随其后、以它开头的所有前缀
+        """
+        group: List[str] = []
+        for prefix in sorted(self._directories):
+            if group and not prefix.startswith(group[0]):
+                yield group
+                group = []
+            group.append(prefix)
+        if group:
+            yield group
+
+    def __iter__(self) -> Iterator[str]:
+        """按 sorted() 的顺序迭代完整路径"""
+        self._merge()
+        for group in self._prefix_groups():
+            streams = [self._iter_directory(prefix) for prefix in group]
+            yield from streams[0] if len(streams) == 1 else heapq.merge(*streams)
+
+    def _iter_directory(self, prefix: str) -> Iterator[str]:
+        return (prefix + name for name in self._directories[prefix].sorted_names())
+
+    def mapped(self, func: Callable[[str], str]) -> Iterator[Tuple[str, str]]:
+        """
+        按 sorted() 的顺序产出 (路径, func(目录前缀) + 文件名)
+
+        func 对每个目录前缀只调用一次，用于按目录转换的映射（如 to_server_path 转换为服务器路径）
+        """
+        self._merge()
+        for group in self._prefix_groups():
+            streams = [self._iter_mapped_directory(prefix, func(prefix)) for prefix in group]
+            yield from streams[0] if len(streams) == 1 else heapq.merge(*streams)
+
+    def _iter_mapped_directory(self, prefix: str, mapped_prefix: str) -> Iterator[Tuple[str, str]]:
+        return ((prefix + name, mapped_prefix + name) for name in self._directories[prefix].sorted_names())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+序列路径展开模块
+贴图和缓存路径中可能包含UDIM、UV贴片和帧号标记（如 tex.<UDIM>.exr、fluid.####.vdb），
+这类路径本身不存在，需要展开为目录中实际存在的文件。
+每个路径的文件名部分编译为一个正则表达式，与所在目录的一次目录列表匹配（目录列表来自目录遍历缓存），
+不逐个探测候选文件名，几千个UDIM贴片或几万帧的序列也只读取一次目录
+"""
+
+import os
+import re
+from typing import List, Match, Pattern
+
+from utils.walk_cache import get_walk_cache
+
+
+# 标记 -> 匹配的正则表达式（不区分大小写）
+#   <UDIM>                 Mari / Maya UDIM 贴片号（1001起）
+#   <u> <v> <U> <V>        UV贴片坐标（Mudbox / ZBrush 风格，如 tex_<u>_<v>.tif）
+#   <UVTILE> <tile>        Maya / Arnold 的 u1_v1 形式贴片
+#   <f> <frame> <f4>       帧号（<fN> 为N位补零）
+#   ####                   帧号（#的个数为补零位数，帧号位数更多时不截断）
+#   %04d %4d %d            帧号（printf 风格：%0Nd 补零，%Nd 在前面补空格）
+# 补零的负帧号与 printf 相同，负号计入位数（%04d / #### 的 -5 为 -005，也接受 -0005）
+_TOKEN = re.compile(
+    r'<udim>'
+    r'|<[uv]>'
+    r'|<uvtile>|<tile>'
+    r'|<f(\d*)>|<frame>'
+    r'|(#+)'
+    r'|%(0?\d*)d',
+    re.IGNORECASE
+)
+
+# Windows 文件名不区分大小写
+_MATCH_FLAGS = re.IGNORECASE if os.name == 'nt' else 0
+
+
+def has_sequence_tokens(path: str) -> bool:
+    """路径的文件名部分是否包含序列标记"""
+    return bool(path) and _TOKEN.search(os.path.basename(path)) is not None
+
+
+def _token_regex(match: Match) -> str:
+    token = match.group(0).lower()
+    if token == '<udim>':
+        return r'\d{4}'
+    if token in ('<u>', '<v>'):
+        return r'\d+'
+    if token == '<uvtile>':
+        return r'u\d+_v\d+'
+    if token == '<tile>':
+        return r'_u\d+_v\d+'
+    # 帧号：补零位数来自 <fN> / #的个数 / %0Nd
+    if match.group(2) is not None:
+        padding = len(match.group(2))
+    elif match.group(3) and not match.group(3).startswith('0'):
+        # %Nd：宽度不足时补空格
+        return r' *-?\d+'
+    else:
+        padding = int(match.group(1) or match.group(3) or 0)
+    return r'(?:\d{%d,}|-\d{%d,})' % (padding, padding - 1) if padding > 1 else r'-?\d+'
+
+
+def compile_sequence_pattern(file_name: str) -> Pattern:
+    """把包含序列标记的文件名编译为正则表达式（标记以外的部分按字面匹配）"""
+    parts = []
+    position = 0
+    for match in _TOKEN.finditer(file_name):
+        parts.append(re.escape(file_name[position:match.start()]))
+        parts.append(_token_regex(match))
+        position = match.end()
+    parts.append(re.escape(file_name[position:]))
+    return re.compile(''.join(parts), _MATCH_FLAGS)
+
+
+def expand_sequence_path(path: str) -> List[str]:
+    """
+    把包含序列标记的路径展开为目录中匹配的文件
+
+    只展开文件名部分的标记（目录部分包含标记时不展开）
+
+    Args:
+        path: 文件路径（如 D:/tex/body.<UDIM>.exr）
+
+    Returns:
+        匹配的文件路径列表（按文件名排序；目录不存在或没有匹配时为空列表）
+    """
+    directory, file_name = os.path.split(path)
+    if not has_sequence_tokens(file_name) or _TOKEN.search(directory):
+        return []
+    listing = get_walk_cache().listing(directory or os.curdir)
+    if listing is None:
+        return []
+    pattern = compile_sequence_pattern(file_name)
+    return [os.path.join(directory, name) for name in sorted(listing.files) if pattern.fullmatch(name)]
@@ -3,8 +3,22 @@
 """
 路径工具模块
 提供路径标准化等工具函数
+
+同一个路径在一次处理中会被转换为绝对路径多次（提取、存在性检查、打包），
+canonical_path 的结果按输入缓存（LRU，有上限）并驻留（sys.intern），各阶段共用同一个字符串对象
 """
 
+import os
+import re
+import sys
+from functools import lru_cache
+
+
+# canonical_path 缓存的最大条目数（超出时淘汰最久未使用的路径）
+PATH_CACHE_SIZE = 1 << 14
+
+_REPEATED_SLASHES = re.compile(r'/{2,}')
+
 
 def normalize_path_separators(path: str) -> str:
     """规范化路径分隔符：统一为正斜杠，去除所有双斜杠和多斜杠
@@ -19,8 +33,44 @@ def normalize_path_separators(path: str) -> str:
         return path
     # 1. 统一为正斜杠（所有反斜杠转正斜杠）
     normalized = path.replace('\\', '/')
-    # 2. 去除所有双斜杠和多斜杠（循环处理直到没有连续斜杠）
-    while '//' in normalized:
-        normalized = normalized.replace('//', '/')
+    # 2. 连续的斜杠合并为一个
+    if '//' in normalized:
+        normalized = _REPEATED_SLASHES.sub('/', normalized)
     return normalized
 
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def canonical_path(path: str, base_dir: str = '') -> str:
+    """
+    规范的绝对路径：相对路径按 base_dir 拼接，再 normpath + abspath，统一为正斜杠（见 normalize_path_separators）
+
+    Args:
+        path: 路径
+        base_dir: 相对路径的基准目录（空字符串表示当前工作目录）
+    """
+    return sys.intern(normalize_path_separators(os.path.abspath(os.path.join(base_dir, path))))
+
+
+def path_key(path: str) -> str:
+    """比较和缓存用的路径键：normpath + normcase（Windows 上不区分大小写，分隔符统一为反斜杠）"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def clear_path_caches() -> None:
+    """清除 canonical_path 的缓存（工作目录变化后调用）"""
+    canonical_path.cache_clear()
+
+
+def get_cache_dir() -> str:
+    """
+    本地缓存目录（目录遍历缓存等跨次提交复用的数据）
+
+    优先使用环境变量 GET_MAYA_PLUG4_CACHE_DIR，否则为
+    Windows: %LOCALAPPDATA%/get_maya_plug4，其他系统: $XDG_CACHE_HOME 或 ~/.cache 下的 get_maya_plug4
+    """
+    cache_dir = os.environ.get('GET_MAYA_PLUG4_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    base_dir = (os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+                or os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base_dir, 'get_maya_plug4')
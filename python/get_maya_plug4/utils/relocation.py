@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缺失文件重定位模块
+场景从其他机器拷贝过来时，贴图等依赖的绝对路径经常已经失效，但文件本身还在项目目录中的其他位置。
+本模块为项目目录建立一次 文件名 -> 候选路径 的索引（目录列表来自目录遍历缓存，重复提交时只需 stat 各目录），
+之后每个缺失文件按文件名 O(1) 查找；同时记录缺失、重定位和有意跳过的文件，作为报告输出。
+同名文件不一定是原来的文件，项目目录中找到的文件默认只写入报告（列出所有同名候选），不打包；
+打包时上传到原路径对应的服务器位置（场景中引用的仍是原路径）
+"""
+
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.path_utils import normalize_path_separators
+from utils.stat_cache import get_stat_cache
+from utils.walk_cache import cached_walk
+# 导入全局logger
+from core.logger import logger
+
+
+# Maya 项目目录的标记文件
+_WORKSPACE_FILE = 'workspace.mel'
+
+# 报告中每个重定位文件最多列出的同名候选数
+_REPORT_CANDIDATES = 20
+
+
+def find_project_root(scene_dir: str) -> str:
+    """
+    场景所在的 Maya 项目目录
+
+    从场景目录向上查找包含 workspace.mel 的目录；找不到时，场景在 scenes 目录中则使用其上一级，否则使用场景目录
+    """
+    scene_dir = os.path.abspath(scene_dir)
+    directory = scene_dir
+    while True:
+        if get_stat_cache().isfile(os.path.join(directory, _WORKSPACE_FILE)):
+            return directory
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    if os.path.basename(scene_dir).lower() == 'scenes':
+        return os.path.dirname(scene_dir)
+    return scene_dir
+
+
+def _path_parts(path: str) -> List[str]:
+    return [part for part in os.path.normcase(normalize_path_separators(path)).split('/') if part]
+
+
+def _common_suffix_length(parts: List[str], other: List[str]) -> int:
+    """两个路径从文件名往上相同的目录层数"""
+    count = 0
+    for part, other_part in zip(reversed(parts[:-1]), reversed(other[:-1])):
+        if part != other_part:
+            break
+        count += 1
+    return count
+
+
+class RelocationIndex:
+    """单个根目录的 文件名 -> 候选路径 索引（第一次查找时才遍历目录；可以在多个线程中同时查找）"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._paths: Optional[Dict[str, List[str]]] = None
+        self._lock = threading.Lock()
+
+    def _build(self) -> Dict[str, List[str]]:
+        if self._paths is not None:
+            return self._paths
+        with self._lock:
+            if self._paths is not None:
+                return self._paths
+            paths: Dict[str, List[str]] = {}
+            file_count = 0
+            try:
+                for directory, dirs, files in cached_walk(self.root):
+                    # 跳过 .git 等隐藏目录
+                    dirs[:] = [name for name in dirs if not name.startswith('.')]
+                    for name in files:
+                        paths.setdefault(os.path.normcase(name), []).append(
+                            normalize_path_separators(os.path.join(directory, name)))
+                    file_count += len(files)
+            except Exception as e:
+                logger.warning(f"建立重定位索引失败: {self.root}, 错误: {e}")
+            logger.print_with_time(f"    重定位索引: {self.root}（{file_count} 个文件）")
+            self._paths = paths
+        return paths
+
+    def candidates(self, path: str) -> List[str]:
+        """与路径文件名相同的文件（Windows 上不区分大小写）"""
+        return self._build().get(os.path.normcase(os.path.basename(normalize_path_separators(path))), [])
+
+    def find(self, path: str) -> Optional[str]:
+        """
+        按文件名查找缺失文件的新位置
+
+        有多个同名文件时选择与原路径末尾目录相同层数最多的一个，层数相同时取路径排序最前的一个，结果与遍历顺序无关
+        """
+        candidates = self.candidates(path)
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+        parts = _path_parts(path)
+        return min(candidates, key=lambda candidate: (-_common_suffix_length(parts, _path_parts(candidate)), candidate))
+
+
+class Relocator:
+    """
+    缺失文件重定位：每个根目录的索引只建立一次，并记录缺失、重定位和有意跳过的文件
+
+    project_root 为None时不重定位，只记录缺失文件；
+    package 为 True 时调用方打包项目目录中找到的文件（见 mark_packaged），否则只写入报告
+    """
+
+    def __init__(self, project_root: Optional[str] = None, package: bool = False):
+        self.project_root = project_root
+        self.package = package
+        self._indexes: Dict[str, RelocationIndex] = {}
+        # 原路径 -> (新路径, 同名候选文件)
+        self.relocated: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        # 打包的重定位文件：原路径 -> 新路径（上传到原路径对应的服务器位置）
+        self.packaged: Dict[str, str] = {}
+        # 在原位置打包的重定位文件（XGen 数据目录中找到的贴图，与数据目录一起收集）
+        self._packaged_in_place: Dict[str, None] = {}
+        self.missing: Dict[str, None] = {}
+        # XGen 按引用收集时没有收集的文件 -> 文件大小
+        self.skipped: Dict[str, int] = {}
+        # 每个线程查找或记录缺失文件的次数（调用方据此判断本线程的一段处理是否遇到了缺失文件；
+        # XGen 文件在线程池中并发解析，全局计数会计入其他线程的查找）
+        self._local = threading.local()
+
+    def index(self, root: str) -> RelocationIndex:
+        """根目录的重定位索引"""
+        key = os.path.normcase(os.path.abspath(root))
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes.setdefault(key, RelocationIndex(root))
+        return index
+
+    def relocate(self, path: str, root: Optional[str] = None) -> Optional[str]:
+        """
+        在 root（默认项目目录）中查找缺失文件的新位置
+
+        Args:
+            path: 不存在的文件路径
+            root: 查找的根目录（None 表示项目目录）
+
+        Returns:
+            新路径（找不到时返回None，并记为缺失）
+        """
+        root = root or self.project_root
+        self._count_lookup()
+        if path in self.relocated:
+            return self.relocated[path][0]
+        found = None
+        if root and get_stat_cache().isdir(root):
+            index = self.index(root)
+            found = index.find(path)
+        if found is None:
+            self.record_missing(path)
+            return None
+        self.relocated[path] = (found, tuple(sorted(index.candidates(path))))
+        self.missing.pop(path, None)
+        return found
+
+    def mark_packaged(self, path: str, in_place: bool = False) -> None:
+        """
+        记录已重定位的文件会被打包
+
+        Args:
+            path: 原路径
+            in_place: 调用方按新路径收集（不需要上传到原路径对应的服务器位置）
+        """
+        if in_place:
+            self._packaged_in_place[path] = None
+        else:
+            self.packaged[path] = self.relocated[path][0]
+
+    def record_missing(self, path: str) -> None:
+        """记录缺失文件（不尝试重定位）"""
+        self._count_lookup()
+        if path not in self.relocated:
+            self.missing[path] = None
+
+    def _count_lookup(self) -> None:
+        self._local.lookups = self.thread_lookups() + 1
+
+    def thread_lookups(self) -> int:
+        """当前线程查找或记录缺失文件的次数"""
+        return getattr(self._local, 'lookups', 0)
+
+    def record_skipped(self, path: str, size: int) -> None:
+        """记录有意没有收集的文件（XGen 按引用收集时数据目录中未引用的文件）"""
+        self.skipped[path] = size
+
+    def report(self) -> Dict[str, Any]:
+        """缺失/重定位报告（写入 CLI 输出的 JSON）"""
+        return {
+            'project_root': self.project_root,
+            'missing': sorted(self.missing),
+            'relocated': [
+                {'original': original, 'relocated': found, 'candidates': list(candidates[:_REPORT_CANDIDATES]),
+                 'candidate_count': len(candidates),
+                 'packaged': original in self.packaged or original in self._packaged_in_place}
+                for original, (found, candidates) in sorted(self.relocated.items())
+            ],
+            'skipped_files': len(self.skipped),
+            'skipped_bytes': sum(self.skipped.values()),
+        }
+
+
+# 全局实例（每次处理流程开始时由 MayaSceneProcessor 重新设置）
+_default_relocator: Optional[Relocator] = None
+
+
+def get_relocator() -> Relocator:
+    """获取当前的重定位器"""
+    global _default_relocator
+    if _default_relocator is None:
+        _default_relocator = Relocator()
+    return _default_relocator
+
+
+def set_relocator(relocator: Relocator) -> None:
+    """设置当前的重定位器"""
+    global _default_relocator
+    _default_relocator = relocator
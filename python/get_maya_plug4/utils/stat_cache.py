@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件状态缓存模块
+一次处理流程中，同一路径只调用一次 os.stat，存在性、类型、大小和修改时间都从缓存中读取；
+资源在网络共享上时，每次检查都是一次网络往返，缓存可以省掉重复的检查。
+
+大量候选路径通常集中在几百个目录中（贴图目录、缓存目录），prefetch() 按父目录分组，
+每个目录只用 os.scandir 读取一次，目录中候选路径的存在性和类型直接从目录列表中回答
+（Windows 上目录列表还带有文件大小，不需要再单独 stat）。
+目录读取和单独的 stat 在线程池中并发执行（系统调用期间释放GIL），
+网络共享上每次调用的延迟可以相互重叠；结果在主线程中按候选顺序写入缓存，与串行执行相同。
+
+缓存本身也会在多个线程中同时使用（XGen palette 在线程池中解析），缓存项和目录列表的读写都在锁内进行；
+系统调用在锁外执行，两个线程同时检查同一个未缓存的路径时可能各 stat 一次，结果相同
+"""
+
+import os
+import stat
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
+
+from utils.path_utils import path_key
+
+
+# 默认并发数：网络共享上单次 stat 为毫秒级，8 个并发可以掩盖大部分延迟，又不会压垮文件服务器
+DEFAULT_STAT_WORKERS = 8
+
+_T = TypeVar('_T')
+_R = TypeVar('_R')
+
+# prefetch 中目录无法读取（非不存在）时的标记
+_UNREADABLE = object()
+
+
+class StatInfo(NamedTuple):
+    """
+    缓存的文件状态（只保留用到的字段，字段名与 os.stat_result 相同）
+
+    os.stat_result 每个约占 0.5KB，20万个资源时仅状态缓存就有上百MB。
+    缓存中保存的是普通元组 (st_mode, st_size, st_mtime_ns)：普通元组只包含整数时会被垃圾回收器取消跟踪，
+    NamedTuple 实例则一直被跟踪，每次完整回收都要遍历全部缓存项；stat() 返回时才包装为 StatInfo
+    """
+    st_mode: int
+    st_size: int
+    st_mtime_ns: int
+
+    @property
+    def st_mtime(self) -> float:
+        return self.st_mtime_ns / 1e9
+
+
+# 缓存中的文件状态：(st_mode, st_size, st_mtime_ns)
+_StatTuple = Tuple[int, int, int]
+
+
+def _stat_tuple(result: os.stat_result) -> _StatTuple:
+    return result.st_mode, result.st_size, result.st_mtime_ns
+
+
+class FileStatCache:
+    """
+    文件状态缓存（不存在的路径也会被缓存）
+
+    只用于处理过程中不会变化的文件（贴图、缓存等资源文件）；
+    处理流程自己写出的文件（zip、upload.json 等）应直接检查，或在写出后调用 invalidate()
+    """
+
+    def __init__(self, stat_func: Callable[[str], os.stat_result] = os.stat,
+                 scandir_func: Callable[[str], Iterator[os.DirEntry]] = os.scandir,
+                 workers: int = DEFAULT_STAT_WORKERS):
+        """
+        Args:
+            stat_func: 获取文件状态的函数（默认 os.stat，可替换以统计或模拟系统调用）
+            scandir_func: 读取目录列表的函数（默认 os.scandir，prefetch 使用）
+            workers: prefetch 的并发数（1 表示串行）
+        """
+        self._stat_func = stat_func
+        self._scandir_func = scandir_func
+        self._workers = max(1, workers)
+        self._entries: Dict[str, Optional[_StatTuple]] = {}
+        # 已读取的目录：规范化目录路径 -> {规范化文件名: 目录项}
+        self._listings: Dict[str, Dict[str, os.DirEntry]] = {}
+        # 保护 _entries、_listings 和调用计数
+        self._lock = threading.Lock()
+        self.stat_calls = 0
+        self.scandir_calls = 0
+
+    @property
+    def workers(self) -> int:
+        """并发数"""
+        return self._workers
+
+    def _lookup(self, path: str) -> Tuple[str, Optional[os.DirEntry]]:
+        """
+        计算路径键并在已读取的目录列表中查找（父目录已读取但其中没有该路径时直接记为不存在）
+
+        Returns:
+            (路径键, 目录项（未读取父目录、不在目录中或已有stat结果时为None）)
+        """
+        key = path_key(path)
+        with self._lock:
+            if key in self._entries:
+                return key, None
+            entry = None
+            if self._listings:
+                parent, name = os.path.split(key)
+                listing = self._listings.get(parent)
+                if listing is not None and name:
+                    entry = listing.get(name)
+                    if entry is None:
+                        self._entries[key] = None
+        return key, entry
+
+    def _map(self, func: Callable[[_T], _R], items: List[_T]) -> List[_R]:
+        """在线程池中执行，按 items 的顺序返回结果"""
+        if self._workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self._workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+    def _safe_stat(self, path: str) -> Optional[_StatTuple]:
+        try:
+            return _stat_tuple(self._stat_func(path))
+        except (OSError, ValueError):
+            return None
+
+    def _read_listing(self, directory: str):
+        """读取目录列表：返回 {规范化文件名: 目录项}，目录不存在时返回None，无法读取时返回 _UNREADABLE"""
+        try:
+            with self._scandir_func(directory or os.curdir) as entries:
+                return {os.path.normcase(entry.name): entry for entry in entries}
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        except (OSError, ValueError):
+            return _UNREADABLE
+
+    def prefetch(self, paths: Iterable[str], min_group_size: int = 2) -> int:
+        """
+        按父目录分组，每个目录读取一次目录列表，之后这些路径的存在性和类型检查不再单独 stat
+
+        只有一个候选路径的目录直接 stat（大目录的列表比单次 stat 更慢）；
+        目录不存在时其中的候选路径都记为不存在，目录无法读取时回退为逐个 stat。
+        目录读取和 stat 按 workers 并发执行
+
+        Args:
+            paths: 候选路径
+            min_group_size: 目录中至少有多少个未缓存的候选路径才读取目录列表
+
+        Returns:
+            读取的目录数
+        """
+        # 父目录键 -> {路径键: 路径}
+        groups: Dict[str, Dict[str, str]] = defaultdict(dict)
+        group_dirs: Dict[str, str] = {}
+        with self._lock:
+            for path in paths:
+                if not path:
+                    continue
+                key = path_key(path)
+                if key in self._entries:
+                    continue
+                parent = os.path.split(key)[0]
+                if parent in self._listings:
+                    continue
+                groups[parent][key] = path
+                if parent not in group_dirs:
+                    group_dirs[parent] = os.path.dirname(os.path.normpath(path))
+
+        listing_parents: List[str] = []
+        single_paths: Dict[str, str] = {}
+        for parent, candidates in groups.items():
+            if len(candidates) >= min_group_size:
+                listing_parents.append(parent)
+            else:
+                single_paths.update(candidates)
+
+        listings = self._map(self._read_listing, [group_dirs[parent] for parent in listing_parents])
+        listed = 0
+        with self._lock:
+            self.scandir_calls += len(listing_parents)
+            for parent, listing in zip(listing_parents, listings):
+                if listing is _UNREADABLE:
+                    # 无权限列目录等情况：逐个 stat
+                    single_paths.update(groups[parent])
+                    continue
+                if listing is None:
+                    # 父目录不存在，其中的候选路径都不存在
+                    self._entries.update(dict.fromkeys(groups[parent]))
+                else:
+                    self._listings[parent] = listing
+                listed += 1
+
+        stat_results = self._map(self._safe_stat, list(single_paths.values()))
+        with self._lock:
+            self.stat_calls += len(single_paths)
+            self._entries.update(zip(single_paths.keys(), stat_results))
+        return listed
+
+    def _stat(self, key: str, path: str, entry: Optional[os.DirEntry]) -> Optional[_StatTuple]:
+        with self._lock:
+            try:
+                return self._entries[key]
+            except KeyError:
+                pass
+            self.stat_calls += 1
+        # 系统调用在锁外执行（其他线程的检查不需要等待网络往返）
+        try:
+            # 目录项的 stat 在 Windows 上直接使用目录列表中的数据
+            result = _stat_tuple(entry.stat() if entry is not None else self._stat_func(path))
+        except (OSError, ValueError):
+            result = None
+        with self._lock:
+            self._entries[key] = result
+            if entry is not None:
+                # 目录项会一直持有自己的 stat 结果，已缓存状态的路径不再保留目录项
+                parent, name = os.path.split(key)
+                self._listings.get(parent, {}).pop(name, None)
+        return result
+
+    def stat(self, path: str) -> Optional[StatInfo]:
+        """文件状态（路径不存在或无法访问时返回None）"""
+        key, entry = self._lookup(path)
+        result = self._stat(key, path, entry)
+        return StatInfo._make(result) if result is not None else None
+
+    def exists(self, path: str) -> bool:
+        """与 os.path.exists 相同"""
+        if not path:
+            return False
+        key, entry = self._lookup(path)
+        # 符号链接需要 stat 才能判断目标是否存在
+        if entry is not None and not entry.is_symlink():
+            return True
+        return self._stat(key, path, entry) is not None
+
+    def isfile(self, path: str) -> bool:
+        """与 os.path.isfile 相同"""
+        if not path:
+            return False
+        key, entry = self._lookup(path)
+        if entry is not None and not entry.is_symlink():
+            return entry.is_file()
+        result = self._stat(key, path, entry)
+        return result is not None and stat.S_ISREG(result[0])
+
+    def isdir(self, path: str) -> bool:
+        """与 os.path.isdir 相同"""
+        if not path:
+            return False
+        key, entry = self._lookup(path)
+        if entry is not None and not entry.is_symlink():
+            return entry.is_dir()
+        result = self._stat(key, path, entry)
+        return result is not None and stat.S_ISDIR(result[0])
+
+    def getsize(self, path: str) -> int:
+        """与 os.path.getsize 相同（路径不存在时抛出 OSError）"""
+        result = self.stat(path)
+        if result is None:
+            raise FileNotFoundError(f"文件不存在: {path}")
+        return result.st_size
+
+    def getmtime(self, path: str) -> float:
+        """与 os.path.getmtime 相同（路径不存在时抛出 OSError）"""
+        result = self.stat(path)
+        if result is None:
+            raise FileNotFoundError(f"文件不存在: {path}")
+        return result.st_mtime
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """清除指定路径的缓存（path 为None时清除全部）"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._listings.clear()
+            else:
+                key = path_key(path)
+                self._entries.pop(key, None)
+                self._listings.pop(os.path.split(key)[0], None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# 全局缓存实例（每次处理流程开始时由 MayaSceneProcessor 重新设置）
+_default_stat_cache: Optional[FileStatCache] = None
+
+
+def get_stat_cache() -> FileStatCache:
+    """获取当前的文件状态缓存"""
+    global _default_stat_cache
+    if _default_stat_cache is None:
+        _default_stat_cache = FileStatCache()
+    return _default_stat_cache
+
+
+def set_stat_cache(cache: FileStatCache) -> None:
+    """设置当前的文件状态缓存"""
+    global _default_stat_cache
+    _default_stat_cache = cache
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录遍历缓存模块
+XGen、OCIO和场景引用的目录在每次提交时都会被完整遍历，同一个镜头一天可能提交十几次。
+本模块按目录路径把 os.walk 的目录列表（子目录名和文件名）保存到磁盘，
+按路径的前几级分片保存为多个文件，每次只读取和写入本次用到的分片；
+每个目录用自身的修改时间校验：目录中增删或重命名条目时修改时间会变化，只有变化的目录重新读取，
+未变化的目录树只需要逐个 stat 目录，不再读取目录列表。
+目录列表同时记录哪些文件不是普通文件（符号链接等），普通文件被删除或替换时目录的修改时间会变化，
+使用缓存的列表时只有这些条目需要再 stat 确认
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from utils.path_utils import get_cache_dir, path_key
+from utils.stat_cache import get_stat_cache
+# 导入全局logger
+from core.logger import logger
+
+
+# 缓存文件格式版本（格式变化时旧缓存直接丢弃）
+_CACHE_VERSION = 2
+
+# 按路径键的前几段分片（如 /projects/show/assets/crowd，Windows 共享路径为 \\nas01\projects\show），
+# 同一个项目的目录在同一分片中，其他项目的分片不读取也不写入
+_SHARD_DEPTH = 5
+
+# 修改时间在此秒数之内的目录不写入缓存：部分文件系统（FAT、SMB）的修改时间精度只有1~2秒，
+# 同一时间单位内的后续改动不会改变修改时间
+_RACY_SECONDS = 2.0
+
+
+class DirectoryListing(NamedTuple):
+    """单个目录的列表"""
+    mtime_ns: int             # 读取时目录的修改时间
+    dirs: Tuple[str, ...]     # 子目录名（与 os.walk 相同，包含指向目录的符号链接）
+    links: Tuple[str, ...]    # 指向目录的符号链接（与 os.walk 的默认行为相同，不进入）
+    files: Tuple[str, ...]    # 其他条目名
+    special: Tuple[str, ...]  # files 中不是普通文件的条目（指向文件的符号链接、失效的链接等），使用时需要 stat 确认
+
+
+def default_walk_cache_dir() -> str:
+    """默认的目录遍历缓存目录"""
+    return os.path.join(get_cache_dir(), 'walk')
+
+
+class DirectoryWalkCache:
+    """
+    按目录修改时间校验的目录遍历缓存
+
+    walk() 的结果与 os.walk(top) 相同（自上而下，忽略无法读取的目录，可以修改 dirs 跳过子目录）
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 scandir_func: Callable[[str], Iterator[os.DirEntry]] = os.scandir):
+        """
+        Args:
+            cache_dir: 缓存目录，每个分片一个文件（None 表示只在内存中缓存，不读写磁盘）
+            scandir_func: 读取目录列表的函数（默认 os.scandir）
+        """
+        self.cache_dir = cache_dir
+        self._scandir_func = scandir_func
+        # 分片 -> (路径键 -> 目录列表)，第一次用到分片时读取
+        self._shards: Dict[str, Dict[str, DirectoryListing]] = {}
+        # 有变化、需要写入的分片
+        self._dirty: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _shard_path(self, shard: str) -> str:
+        digest = hashlib.sha256(shard.encode('utf-8', 'surrogateescape')).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _load(self, shard: str) -> Dict[str, DirectoryListing]:
+        listings = self._shards.get(shard)
+        if listings is not None:
+            return listings
+        listings = {}
+        shard_path = self._shard_path(shard) if self.cache_dir else None
+        if shard_path and os.path.isfile(shard_path):
+            try:
+                with open(shard_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                # 分片文件名是哈希值，同时核对分片本身
+                if data.get('version') == _CACHE_VERSION and data.get('shard') == shard:
+                    listings = {
+                        key: DirectoryListing(value[0], tuple(value[1]), tuple(value[2]), tuple(value[3]),
+                                              tuple(value[4]))
+                        for key, value in data.get('dirs', {}).items()
+                    }
+            except (OSError, ValueError, TypeError, IndexError) as e:
+                logger.warning(f"读取目录遍历缓存失败，将重新遍历: {shard_path}, 错误: {e}")
+        # 多个线程同时第一次读取时只保留一份
+        return self._shards.setdefault(shard, listings)
+
+    def _read_directory(self, directory: str, mtime_ns: int) -> Optional[DirectoryListing]:
+        """读取目录列表（无法读取时返回None）"""
+        dirs: List[str] = []
+        links: List[str] = []
+        files: List[str] = []
+        special: List[str] = []
+        try:
+            with self._scandir_func(directory) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        dirs.append(entry.name)
+                        if entry.is_symlink():
+                            links.append(entry.name)
+                    else:
+                        files.append(entry.name)
+                        try:
+                            is_file = entry.is_file(follow_symlinks=False)
+                        except OSError:
+                            is_file = False
+                        if not is_file:
+                            special.append(entry.name)
+        except OSError:
+            return None
+        return DirectoryListing(mtime_ns, tuple(dirs), tuple(links), tuple(files), tuple(special))
+
+    def listing(self, directory: str) -> Optional[DirectoryListing]:
+        """目录列表（修改时间未变化时直接使用缓存；目录不存在或无法读取时返回None）"""
+        result = get_stat_cache().stat(directory)
+        if result is None:
+            return None
+        key = path_key(directory)
+        shard = os.sep.join(key.split(os.sep)[:_SHARD_DEPTH])
+        listings = self._load(shard)
+        cached = listings.get(key)
+        if cached is not None and cached.mtime_ns == result.st_mtime_ns:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        current = self._read_directory(directory, result.st_mtime_ns)
+        if current is None:
+            return None
+        if time.time() - result.st_mtime > _RACY_SECONDS:
+            listings[key] = current
+            self._dirty.add(shard)
+        elif cached is not None:
+            listings.pop(key, None)
+            self._dirty.add(shard)
+        return current
+
+    def walk(self, top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """与 os.walk(top) 相同：产出 (目录, 子目录名列表, 文件名列表)"""
+        for directory, dirs, current in self.walk_listings(top):
+            yield directory, dirs, list(current.files)
+
+    def walk_listings(self, top: str) -> Iterator[Tuple[str, List[str], DirectoryListing]]:
+        """与 walk() 相同，但产出 (目录, 子目录名列表, 目录列表)，可以用 special 区分需要 stat 确认的文件"""
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            current = self.listing(directory)
+            if current is None:
+                continue
+            dirs = list(current.dirs)
+            yield directory, dirs, current
+            # 调用方可能修改了 dirs；按原顺序深度优先遍历，不进入指向目录的符号链接
+            stack.extend(os.path.join(directory, name) for name in reversed(dirs) if name not in current.links)
+
+    def save(self) -> None:
+        """把有变化的分片写入磁盘（先写临时文件再替换，中断时不会留下损坏的缓存）"""
+        if not self.cache_dir:
+            return
+        for shard in sorted(self._dirty):
+            shard_path = self._shard_path(shard)
+            temp_path = f"{shard_path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump({
+                        'version': _CACHE_VERSION,
+                        'shard': shard,
+                        'dirs': {key: list(value) for key, value in self._shards[shard].items()},
+                    }, f, ensure_ascii=False)
+                os.replace(temp_path, shard_path)
+                self._dirty.discard(shard)
+            except OSError as e:
+                logger.warning(f"保存目录遍历缓存失败: {shard_path}, 错误: {e}")
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+
+# 全局缓存实例（默认只在内存中缓存，MayaSceneProcessor 使用磁盘缓存）
+_default_walk_cache: Optional[DirectoryWalkCache] = None
+
+
+def get_walk_cache() -> DirectoryWalkCache:
+    """获取当前的目录遍历缓存"""
+    global _default_walk_cache
+    if _default_walk_cache is None:
+        _default_walk_cache = DirectoryWalkCache()
+    return _default_walk_cache
+
+
+def set_walk_cache(cache: DirectoryWalkCache) -> None:
+    """设置当前的目录遍历缓存"""
+    global _default_walk_cache
+    _default_walk_cache = cache
+
+
+def cached_walk(top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+    """使用当前的目录遍历缓存遍历目录（与 os.walk(top) 相同）"""
+    return get_walk_cache().walk(top)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+XGen 依赖缓存模块
+每个 XGen 文件（palette）都要解析、展开变量路径并遍历贴图目录，重复提交同一个镜头时结果通常完全相同。
+本模块把每个 palette 解析出的依赖列表保存到磁盘（每个条目一个文件），键由以下内容计算：
+palette 文件内容的哈希、XGen 数据目录的列表签名（所有子目录名和文件名，通过目录遍历缓存读取，
+未变化的目录只需要 stat）以及解析选项。命中时还要校验依赖文件所在目录的修改时间
+（数据目录之外的贴图目录增删文件时失效），以及解析时检查过但不存在的候选路径所在的最近一级存在的目录
+（xgProjectPath 下或其他位置的缺失贴图补上后，解析结果会变化），校验通过则不再解析 palette、不再遍历贴图目录。
+缓存总大小超过上限时按最近使用时间删除最旧的条目
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from utils.path_utils import get_cache_dir, path_key
+from utils.stat_cache import get_stat_cache
+from utils.walk_cache import get_walk_cache
+# 导入全局logger
+from core.logger import logger
+
+
+# 缓存格式版本（格式或解析规则变化时旧缓存直接失效）
+_CACHE_VERSION = 2
+
+# 缓存目录的默认大小上限
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# 修改时间在此秒数之内的目录不写入缓存（与目录遍历缓存相同，见 utils.walk_cache）
+_RACY_SECONDS = 2.0
+
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+class CachedResolution(NamedTuple):
+    """缓存的单个 palette 解析结果"""
+    paths: List[str]      # 依赖文件（已规范化）
+    parsed: bool          # 是否通过 xgen_parser 解析到依赖
+    skipped: List[str]    # 按引用收集时没有收集的数据目录文件
+
+
+def default_xgen_cache_dir() -> str:
+    """默认的 XGen 依赖缓存目录"""
+    return os.path.join(get_cache_dir(), 'xgen')
+
+
+class XGenDependencyCache:
+    """
+    按 palette 内容哈希和数据目录列表签名保存的 XGen 依赖缓存
+
+    key() 计算缓存键，get() 读取并校验，put() 写入并按大小上限淘汰旧条目；
+    各方法可以在多个线程中同时调用（每个 palette 在线程池中解析，见 parsers.file_path_extractor）
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir: 缓存目录（None 表示不使用缓存）
+            max_bytes: 缓存目录的大小上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 数据目录 -> 列表签名（同一场景的 palette 共用数据目录，每次处理只计算一次；
+        # 多个线程同时需要时由第一个线程计算，其他线程等待）
+        self._signature_lock = threading.Lock()
+        self._signatures: Dict[Tuple[str, ...], bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.cache_dir)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def key(self, xgen_file: str, data_dirs: Iterable[str], targeted: bool = False) -> Optional[str]:
+        """
+        计算缓存键（未启用缓存或 palette 无法读取时返回None）
+
+        Args:
+            xgen_file: palette 文件路径（路径本身也参与计算：相对路径按 palette 所在目录解析）
+            data_dirs: 场景的 XGen 数据目录
+            targeted: 是否按引用收集
+        """
+        if not self.enabled:
+            return None
+        digest = hashlib.sha256()
+        digest.update(f"{_CACHE_VERSION}\0{path_key(xgen_file)}\0{int(targeted)}\0".encode('utf-8'))
+        try:
+            with open(xgen_file, 'rb') as f:
+                for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        digest.update(self._listing_signature(data_dirs))
+        return digest.hexdigest()
+
+    def _listing_signature(self, data_dirs: Iterable[str]) -> bytes:
+        """
+        数据目录的列表签名：增删、重命名任何子目录或文件都会改变签名（文件内容变化不影响依赖列表）；
+        不存在的目录没有任何条目，与空目录的签名不同
+        """
+        data_dirs = tuple(sorted(data_dirs, key=path_key))
+        with self._signature_lock:
+            signature = self._signatures.get(data_dirs)
+            if signature is None:
+                digest = hashlib.sha256()
+                for data_dir in data_dirs:
+                    digest.update(f"\0{path_key(data_dir)}\0".encode('utf-8'))
+                    self._update_listing_digest(digest, data_dir)
+                signature = self._signatures[data_dirs] = digest.digest()
+        return signature
+
+    @staticmethod
+    def _update_listing_digest(digest, data_dir: str) -> None:
+        """
+        逐层遍历目录（不进入指向目录的符号链接，与 os.walk 相同），把目录列表加入签名；
+        每层目录的修改时间先并发预取（未变化的目录只需要 stat，网络共享上逐个 stat 的延迟相互重叠）
+        """
+        stat_cache = get_stat_cache()
+        walk_cache = get_walk_cache()
+        level = [data_dir]
+        while level:
+            stat_cache.prefetch(level)
+            next_level = []
+            for directory in level:
+                listing = walk_cache.listing(directory)
+                if listing is None:
+                    continue
+                dirs = sorted(listing.dirs)
+                # 目录都以 data_dir 开头，只记录相对部分
+                digest.update(f"{directory[len(data_dir):]}\0{'/'.join(dirs)}\0"
+                              f"{'/'.join(sorted(listing.files))}\n".encode('utf-8'))
+                next_level.extend(os.path.join(directory, name) for name in dirs if name not in listing.links)
+            level = next_level
+
+    def get(self, key: Optional[str]) -> Optional[CachedResolution]:
+        """读取缓存的解析结果（不存在或依赖文件所在目录有变化时返回None）"""
+        if not key or not self.enabled:
+            return None
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取XGen依赖缓存失败，将重新解析: {entry_path}, 错误: {e}")
+            self.misses += 1
+            return None
+
+        try:
+            if data.get('version') != _CACHE_VERSION:
+                self.misses += 1
+                return None
+            directories: Dict[str, int] = data['directories']
+            result = CachedResolution(list(data['paths']), bool(data['parsed']), list(data['skipped']))
+        except (KeyError, TypeError, AttributeError):
+            self.misses += 1
+            return None
+
+        # 依赖文件所在目录的修改时间未变化，说明其中的文件没有被删除或重命名
+        stat_cache = get_stat_cache()
+        stat_cache.prefetch(directories)
+        for directory, mtime_ns in directories.items():
+            current = stat_cache.stat(directory)
+            if current is None or current.st_mtime_ns != mtime_ns:
+                self.misses += 1
+                return None
+
+        self.hits += 1
+        try:
+            # 更新最近使用时间（淘汰时按修改时间排序）
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return result
+
+    @staticmethod
+    def _existing_ancestor(path: str) -> Optional[str]:
+        """路径所在的最近一级存在的目录（在其中创建缺失路径的第一级时，该目录的修改时间会变化）"""
+        stat_cache = get_stat_cache()
+        directory = os.path.dirname(path)
+        while directory:
+            if stat_cache.isdir(directory):
+                return directory
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+        return None
+
+    def put(self, key: Optional[str], paths: List[str], parsed: bool, skipped: Iterable[str],
+            missing: Iterable[str] = ()) -> None:
+        """
+        写入解析结果（需要校验的目录刚被修改时不写入）
+
+        Args:
+            key: 缓存键
+            paths: 依赖文件
+            parsed: 是否通过 xgen_parser 解析到依赖
+            skipped: 按引用收集时没有收集的数据目录文件
+            missing: 解析时检查过但不存在的候选路径（校验其所在的最近一级存在的目录）
+        """
+        if not key or not self.enabled:
+            return
+        stat_cache = get_stat_cache()
+        watched = {os.path.dirname(path) for path in paths}
+        for path in missing:
+            ancestor = self._existing_ancestor(path)
+            if ancestor is None:
+                # 找不到可以校验的目录（如其他盘符不可用），无法确定缓存何时失效
+                return
+            watched.add(ancestor)
+        directories: Dict[str, int] = {}
+        now = time.time()
+        for directory in sorted(watched):
+            current = stat_cache.stat(directory)
+            if current is None or now - current.st_mtime <= _RACY_SECONDS:
+                return
+            directories[directory] = current.st_mtime_ns
+
+        entry_path = self._entry_path(key)
+        temp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': _CACHE_VERSION,
+                    'paths': paths,
+                    'parsed': parsed,
+                    'skipped': sorted(skipped),
+                    'directories': directories,
+                }, f, ensure_ascii=False)
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            logger.warning(f"保存XGen依赖缓存失败: {entry_path}, 错误: {e}")
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        """缓存目录超过大小上限时，按最近使用时间从旧到新删除条目"""
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                with os.scandir(self.cache_dir) as iterator:
+                    for entry in iterator:
+                        if not entry.name.endswith('.json'):
+                            continue
+                        try:
+                            result = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((result.st_mtime_ns, result.st_size, entry.path))
+                        total += result.st_size
+            except OSError:
+                return
+            if total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+
+# 全局缓存实例（默认不使用缓存，MayaSceneProcessor 使用磁盘缓存）
+_default_xgen_cache: Optional[XGenDependencyCache] = None
+
+
+def get_xgen_cache() -> XGenDependencyCache:
+    """获取当前的 XGen 依赖缓存"""
+    global _default_xgen_cache
+    if _default_xgen_cache is None:
+        _default_xgen_cache = XGenDependencyCache()
+    return _default_xgen_cache
+
+
+def set_xgen_cache(cache: XGenDependencyCache) -> None:
+    """设置当前的 XGen 依赖缓存"""
+    global _default_xgen_cache
+    _default_xgen_cache = cache